@@ -0,0 +1,60 @@
+"""
+Microbenchmark de los checksums de las tramas RESP
+==================================================
+
+Compara, sobre una trama RESP típica, la suma del firmware anterior (legacy),
+el CRC-16 y el CRC-32 por tabla, el CRC-16 nativo (binascii.crc_hqx) y el CRC-32
+nativo (binascii.crc32), los nativos si el port los trae, y el costo de
+DSRNode.verify_checksum con cada modo.
+
+Corre igual en CPython y en MicroPython (copiar este archivo junto a las
+librerías en la placa):
+    python benchmarks/checksum_bench.py
+    mpremote run benchmarks/checksum_bench.py
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import sys
+
+try:
+    HERE = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+    sys.path.insert(0, HERE + "/../libraries")
+    sys.path.insert(0, HERE + "/../simulator")  # machine emulado en CPython
+except NameError:
+    pass
+
+import DSRChecksum  # noqa: E402
+import DSRNode as dsr_module  # noqa: E402
+from parse_bench import BenchRadio, BenchRTC, BenchTimer, measure  # noqa: E402
+
+FRAME = "RESP:N9:N1:1767225602:N5-N4-N3-N2:-65.212345/-26.808285/24.5:"
+PAYLOAD = FRAME[:-1].encode()
+
+
+def main(count=20000):
+    dsr_module.print = lambda *args, **kwargs: None
+    view = memoryview(PAYLOAD)
+    rows = [
+        ("legacy", lambda: DSRChecksum.legacy(view)),
+        ("crc16 tabla", lambda: DSRChecksum.crc16_table(view)),
+    ]
+    if DSRChecksum.crc_hqx is not None:
+        rows.append(("crc16 nativo", lambda: DSRChecksum.crc16(view)))
+    rows.append(("crc32 tabla", lambda: DSRChecksum.crc32_table(view)))
+    if DSRChecksum.crc32_native is not None:
+        rows.append(("crc32 nativo", lambda: DSRChecksum.crc32(view)))
+    for name, function in rows:
+        print("%-22s %8d checksums/s" % (name, measure(function, count)))
+
+    node = dsr_module.DSRNode("N1", BenchRadio([FRAME]), BenchRTC(), BenchTimer())
+    for mode in sorted(DSRChecksum.ALGORITHMS):
+        node.CHECKSUM_MODE = mode
+        frame = FRAME + str(node.calculate_checksum(FRAME[:-1]))
+        assert node.verify_checksum(frame)
+        print("%-22s %8d tramas/s" % ("verify_checksum " + mode, measure(lambda: node.verify_checksum(frame), count)))
+
+
+if __name__ == "__main__":
+    main()
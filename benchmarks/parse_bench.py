@@ -0,0 +1,120 @@
+"""
+Microbenchmark del procesamiento de tramas
+==========================================
+
+Mide cuántas tramas por segundo procesa DSRNode.receive_message con una mezcla
+típica de tráfico (HELLO, RREQ, RREP, DATA, RESP, ACK) que el nodo recibe pero
+no tiene que reenviar, de modo que el tiempo medido es el de decodificar y
+despachar. También mide DSRMessage.decode por separado.
+
+Corre igual en CPython y en MicroPython (copiar este archivo junto a las
+librerías en la placa):
+    python benchmarks/parse_bench.py
+    mpremote run benchmarks/parse_bench.py
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import sys
+import time
+
+try:
+    HERE = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+    sys.path.insert(0, HERE + "/../libraries")
+    sys.path.insert(0, HERE + "/../simulator")  # machine emulado en CPython
+except NameError:
+    pass
+
+import DSRNode as dsr_module  # noqa: E402
+
+try:
+    import DSRMessage  # noqa: E402
+except ImportError:
+    DSRMessage = None
+
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+except AttributeError:
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(new, old):
+        return new - old
+
+FRAMES = [
+    "HELLO:N7",
+    "RREQ:N1:N9:1767225601:N2:8",
+    "RREP:N9:N1:1767225601:N5-N4-N3-N2",
+    "DATA:N1:N9:1767225602:N2-N3-N4-N5",
+    "RESP:N9:N1:1767225602:N5-N4-N3-N2:71.5,40.25:12345",
+    "ACK:N3:N2:DATA:1767225602:N1",
+]
+
+
+class BenchRadio:
+    """Radio que entrega la siguiente trama de la lista cada vez que se marca `ready`."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+        self.ready = False
+
+    def is_packet_received(self):
+        return self.ready
+
+    def get_packet(self, rssi=False):
+        self.ready = False
+        payload = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        return {"payload": payload, "rssi": -50}
+
+    def send(self, data):
+        pass
+
+
+class BenchTimer:
+    def init(self, period=1000, mode=0, callback=None):
+        pass
+
+
+class BenchRTC:
+    def datetime(self):
+        return (2026, 1, 1, 3, 0, 0, 0, 0)
+
+
+def measure(function, count):
+    start = ticks_us()
+    for _ in range(count):
+        function()
+    elapsed = ticks_diff(ticks_us(), start)
+    return count * 1000000 / max(elapsed, 1)
+
+
+def main(count=20000):
+    # Los print de DSRNode dominarían la medición
+    dsr_module.print = lambda *args, **kwargs: None
+    radio = BenchRadio(FRAMES)
+    node = dsr_module.DSRNode("N0", radio, BenchRTC(), BenchTimer())
+    node.neighbors.update(("N1", "N2", "N7"))
+    node.timestamp_message = 1767225600
+
+    def receive_next():
+        radio.ready = True
+        node.receive_message()
+
+    print("receive_message: %d tramas/s" % measure(receive_next, count))
+    if DSRMessage is not None:
+        frames = FRAMES
+        state = [0]
+
+        def decode_next():
+            state[0] = (state[0] + 1) % len(frames)
+            DSRMessage.decode(frames[state[0]], -50)
+
+        print("DSRMessage.decode: %d tramas/s" % measure(decode_next, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark del protocolo sobre el simulador
+==========================================
+
+Corre escenarios fijos con instancias reales de DSRNode sobre simulator/mesh_sim.py
+y guarda sus métricas en JSON, para comparar un cambio de DSRNode o de LoRa
+contra una línea base guardada:
+
+- linea: A <-> B <-> C <-> D del README; A pide datos a D (DATA/RESP), 5% de pérdida.
+- multicamino: grilla de 4x4 con varios caminos mínimos entre esquinas opuestas.
+- falla: la misma grilla; a mitad de la prueba cae el relay central de la ruta.
+  Sin hop_ack (por defecto) la falla se ve recién a los NEIGHBOR_TIMEOUT s sin
+  HELLO del relay, y eso acota recovery_s.
+- grilla10 / grilla50 / grilla100: grillas de 2x5, 5x10 y 10x10 con colisiones en
+  las que todos empujan (con TACK) una lectura cada 30 s al gateway del centro.
+
+Métricas de cada escenario:
+- pdr: lecturas entregadas / ofrecidas (respuestas / solicitudes en los de DATA).
+- latency_p50_ms / p90 / p99: de la solicitud a la respuesta, o de la lectura a su
+  llegada al gateway.
+- control_overhead: fracción del tiempo en el aire que no es de datos (HELLO, RREQ,
+  RREP, RERR, ACK, TACK...), y control_frames: cuántas tramas de control salieron.
+- airtime_per_reading_ms: tiempo en el aire total / lecturas entregadas.
+- recovery_s: en falla, de la caída del relay a la primera respuesta.
+
+La simulación es determinista con la misma semilla: dos corridas del mismo código
+dan los mismos números, y cualquier diferencia con la línea base es del cambio.
+
+Uso (CPython; el simulador no corre en la placa):
+    python benchmarks/protocol_bench.py                     # corre todo y compara con baseline.json
+    python benchmarks/protocol_bench.py --scenarios linea falla
+    python benchmarks/protocol_bench.py --save-baseline     # acepta los resultados como nueva base
+
+Sale con código 1 si alguna métrica empeora más que --tolerance respecto de la base.
+Con --profile cronometra además los caminos calientes de todos los nodos
+(libraries/Profiler.py) e imprime dónde se fue el tiempo del host; no cambia
+las métricas del protocolo.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "simulator"))
+
+import mesh_sim  # noqa: E402
+from mesh_sim import MeshSimulation, percentile, gps_readings  # noqa: E402
+from Profiler import Profiler  # noqa: E402
+
+DATA_KINDS = ("DATA", "RESP", "TELE", "FRAG")   # El resto del aire es control
+BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS = os.path.join(HERE, "results.json")
+PROFILER = None     # Con --profile, un Profiler compartido por los nodos de todos los escenarios
+
+# Sentido de cada métrica: +1 mayor es mejor, -1 menor es mejor
+DIRECTIONS = {
+    "pdr": 1,
+    "latency_p50_ms": -1,
+    "latency_p90_ms": -1,
+    "latency_p99_ms": -1,
+    "control_overhead": -1,
+    "control_frames": -1,
+    "airtime_per_reading_ms": -1,
+    "recovery_s": -1,
+}
+
+
+def grid(rows, cols):
+    """{nodo: {vecino: rssi}} de una grilla rectangular, como build_topology("grid")."""
+    links = {}
+    for row in range(rows):
+        for col in range(cols):
+            node = f"N{row}_{col}"
+            links.setdefault(node, {})
+            for other in ((row, col + 1), (row + 1, col)):
+                if other[0] < rows and other[1] < cols:
+                    neighbor = f"N{other[0]}_{other[1]}"
+                    links[node][neighbor] = -60
+                    links.setdefault(neighbor, {})[node] = -60
+    return links
+
+
+def air_metrics(sim, delivered, air_before=None):
+    """control_overhead, control_frames y airtime_per_reading_ms desde air_before ({tipo: (tramas, ms)})."""
+    air_before = air_before or {}
+    total = control = 0.0
+    frames = 0
+    for kind, ms in sim.medium.airtime_by_kind.items():
+        ms -= air_before.get(kind, (0, 0.0))[1]
+        total += ms
+        if kind not in DATA_KINDS:
+            control += ms
+            frames += sim.medium.tx_counts[kind] - air_before.get(kind, (0, 0.0))[0]
+    return {
+        "control_overhead": round(control / total, 4) if total else None,
+        "control_frames": frames,
+        "airtime_per_reading_ms": round(total / delivered, 1) if delivered else None,
+    }
+
+
+def latency_metrics(latencies):
+    if not latencies:
+        return {"latency_p50_ms": None, "latency_p90_ms": None, "latency_p99_ms": None}
+    return {
+        "latency_p50_ms": round(percentile(latencies, 0.5)),
+        "latency_p90_ms": round(percentile(latencies, 0.9)),
+        "latency_p99_ms": round(percentile(latencies, 0.99)),
+    }
+
+
+def request_scenario(links, source, destination, requests=30, loss=0.05, fail_relay=False, seed=1):
+    """Solicitudes DATA/RESP de source a destination; con fail_relay cae el relay central a la mitad."""
+    sim = MeshSimulation(links, seed=seed, loss=loss, profiler=PROFILER)
+    sim.run(30000)
+    latencies = []
+    recovery = None
+    for index in range(requests):
+        if fail_relay and index == requests // 2:
+            route = sim.nodes[source].routes.get(destination)
+            if route:
+                sim.fail(route[len(route) // 2])
+                recovery = sim.request(source, destination, timeout_ms=120000)
+                if recovery is not None:
+                    latencies.append(recovery)
+                continue
+        latency = sim.request(source, destination, timeout_ms=70000)
+        if latency is not None:
+            latencies.append(latency)
+        sim.run(1000)
+    metrics = {"pdr": round(len(latencies) / requests, 4)}
+    metrics.update(latency_metrics(latencies))
+    metrics.update(air_metrics(sim, len(latencies)))
+    if fail_relay:
+        metrics["recovery_s"] = round(recovery / 1000, 1) if recovery is not None else None
+    return metrics
+
+
+def telemetry_scenario(rows, cols, minutes=10, sample_ms=30000, seed=1):
+    """Todos los nodos de la grilla empujan con TACK al gateway del centro, con colisiones."""
+    links = grid(rows, cols)
+    gateway = f"N{rows // 2}_{cols // 2}"
+    sensors = [node for node in links if node != gateway]
+
+    def configure(node):
+        node.lora = mesh_sim.fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+        node.sensor_schema = "G"
+        if node.node_id == gateway:
+            node.role = "master"
+
+    sim = MeshSimulation(links, seed=seed, configure=configure, collisions=True, profiler=PROFILER)
+    sampled = {}     # (nodo, secuencia) -> ms de la lectura
+    arrived = {}     # (nodo, secuencia) -> ms de llegada al gateway
+
+    def on_tele(message):
+        if message.destination != gateway:
+            return
+        for sample in sim.nodes[gateway].readings.get(message.source, []):
+            arrived.setdefault((message.source, sample[0]), sim.clock.now_ms)
+
+    sim.nodes[gateway].subscribe("bench", ("TELE",), on_tele)
+    sim.run(60000)
+    readings = gps_readings(minutes * 60000 // sample_ms + 100, seed)
+    rng = random.Random(seed)
+    sampling = [True]
+
+    def sample(node):
+        if sampling[0]:
+            node.update_sensor(readings[node.sample_seq % len(readings)])
+            sampled[(node.node_id, node.sample_seq)] = sim.clock.now_ms
+            sim.clock.schedule(sample_ms, sample, node)
+
+    with sim.output():
+        for node_id in sensors:
+            sim.nodes[node_id].start_push(gateway, interval=sample_ms // 1000, ack=True)
+    for node_id in sensors:
+        sim.clock.schedule(rng.randint(0, sample_ms), sample, sim.nodes[node_id])
+    # Las rutas al gateway se descubren antes de medir
+    sim.run(60000)
+    measured_from = sim.clock.now_ms
+    air_before = {kind: (sim.medium.tx_counts[kind], ms) for kind, ms in sim.medium.airtime_by_kind.items()}
+    sim.run(minutes * 60000)
+    sampling[0] = False
+    sim.run(60000)
+    offered = [key for key, ms in sampled.items() if measured_from <= ms < measured_from + minutes * 60000]
+    latencies = [arrived[key] - sampled[key] for key in offered if key in arrived]
+    metrics = {"pdr": round(len(latencies) / len(offered), 4) if offered else None}
+    metrics.update(latency_metrics(latencies))
+    metrics.update(air_metrics(sim, len(latencies), air_before))
+    return metrics
+
+
+README_LINE = {"A": {"B": -60}, "B": {"A": -60, "C": -60}, "C": {"B": -60, "D": -60}, "D": {"C": -60}}
+
+SCENARIOS = {
+    "linea": lambda seed: request_scenario(README_LINE, "A", "D", seed=seed),
+    "multicamino": lambda seed: request_scenario(grid(4, 4), "N0_0", "N3_3", seed=seed),
+    "falla": lambda seed: request_scenario(grid(4, 4), "N0_0", "N3_3", fail_relay=True, seed=seed),
+    "grilla10": lambda seed: telemetry_scenario(2, 5, seed=seed),
+    "grilla50": lambda seed: telemetry_scenario(5, 10, seed=seed),
+    "grilla100": lambda seed: telemetry_scenario(10, 10, seed=seed),
+}
+
+
+def compare(results, baseline, tolerance):
+    """Imprime cada métrica contra la base; devuelve las que empeoraron más que tolerance."""
+    regressions = []
+    print(f"{'escenario':<13}{'métrica':<24}{'base':>12}{'actual':>12}{'cambio':>10}")
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<13}(sin línea base)")
+            continue
+        for metric, value in metrics.items():
+            old = base.get(metric)
+            if old == value:
+                change, verdict = "=", ""
+            elif old is None or value is None:
+                # Una métrica que deja de poder medirse (p. ej. sin entregas) es una regresión
+                change, verdict = "-", "" if value is not None else "  EMPEORA"
+            else:
+                relative = (value - old) / abs(old) if old else float("inf")
+                change = f"{relative:+.1%}"
+                worse = relative * DIRECTIONS[metric] < 0
+                verdict = "  EMPEORA" if worse and abs(relative) > tolerance else ("  mejora" if not worse else "")
+            if verdict == "  EMPEORA":
+                regressions.append((name, metric, old, value))
+            print(f"{name:<13}{metric:<24}{str(old):>12}{str(value):>12}{change:>10}{verdict}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del protocolo DSR sobre el simulador")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=RESULTS, help="archivo JSON con los resultados")
+    parser.add_argument("--baseline", default=BASELINE, help="línea base con la que se compara")
+    parser.add_argument("--save-baseline", action="store_true", help="guarda los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="empeoramiento relativo tolerado")
+    parser.add_argument("--profile", action="store_true", help="tiempo del host por función del nodo y de la radio")
+    args = parser.parse_args(argv)
+
+    global PROFILER
+    PROFILER = Profiler() if args.profile else None
+
+    results, wall = {}, {}
+    for name in args.scenarios:
+        started = time.perf_counter()
+        results[name] = SCENARIOS[name](args.seed)
+        wall[name] = round(time.perf_counter() - started, 1)
+        print(f"{name:<13}{wall[name]:>6.1f} s  {results[name]}")
+    report = {"seed": args.seed, "scenarios": results, "wall_s": wall}
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print(f"Resultados en {args.output}")
+    if PROFILER is not None:
+        print()
+        print(PROFILER.report())
+
+    if args.save_baseline:
+        baseline = {"seed": args.seed, "scenarios": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as previous:
+                baseline = json.load(previous)
+        baseline["seed"] = args.seed
+        baseline["scenarios"].update(results)
+        with open(args.baseline, "w") as output:
+            json.dump(baseline, output, indent=2, sort_keys=True)
+        print(f"Línea base actualizada en {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Sin línea base en {args.baseline}: correr con --save-baseline para crearla")
+        return 0
+    with open(args.baseline) as stored:
+        baseline = json.load(stored)
+    if baseline.get("seed") != args.seed:
+        print(f"La línea base es de la semilla {baseline.get('seed')}: los números no son comparables")
+        return 0
+    print()
+    regressions = compare(results, baseline["scenarios"], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} métricas empeoran más de {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -81,5 +81,48 @@ DSR_RETRY_INTERVAL = 30
 # Número máximo de intentos de reenvío
 DSR_MAX_ATTEMPTS = 2
 
-# Tiempo de vida de entradas en caché (en segundos)
-DSR_CACHE_TIMEOUT = 180
+# Confirmación por salto de DATA/RESP: None, "explicit" o "passive" (igual en
+# todos los nodos). Sin ella un relay caído se detecta recién cuando deja de
+# enviar HELLO (NEIGHBOR_TIMEOUT, 35 s), y el origen se entera del RERR o del
+# TIMEOUT mucho después; con ella, en pocos segundos
+HOP_ACK = None
+
+# Responder un RREQ desde la caché de rutas en nombre del destino (RREP con el
+# campo replier). Los nodos de firmware anterior no entienden ese RREP: activarlo
+# recién con toda la red actualizada. En redes grandes ahorra muchas inundaciones
+REPLY_FROM_CACHE = False
+
+# Segundos en que la última lectura de un nodo se responde desde la caché del
+# gateway (ReadingCache) sin un DATA/RESP por la mesh
+READING_CACHE_TTL = 30
+
+# Cronograma de slots TDMA (SlotScheduler): el gateway lo arma y lo difunde, y
+# los nodos con SLOT_SCHEDULE transmiten sólo en la contienda y en sus slots
+SLOT_SCHEDULE = False
+
+# Segundos entre anuncios GATE del gateway (0 = gateway único). Con varios
+# gateways, los esclavos con PUSH_GATEWAY = "*" empujan sus lecturas al más cercano
+GATEWAY_ADVERT_INTERVAL = 0
+
+# Puerto del servidor HTTP con la topología de la red (GET /topologia, /ruta/A/B,
+# /cuellos, /particiones), las métricas (/estadisticas), el perfil (/perfil) y el
+# registro del nodo (/log); None lo desactiva
+HTTP_PORT = 80
+
+# Cronometrar los caminos calientes del nodo y de la radio (Profiler); el
+# informe se consulta en GET /perfil. Desactivado no cuesta nada
+PROFILE = False
+
+# ================================================================
+# REGISTRO
+# ================================================================
+
+# Nivel del registro del nodo (NodeLog): DEBUG, INFO, WARNING o ERROR. Las
+# entradas se guardan en memoria y el bucle principal las escribe por consola
+# de a LOG_BATCH por segundo; GET /log devuelve las últimas
+LOG_LEVEL = "INFO"
+LOG_BATCH = 16
+
+# Archivo de la flash donde se guardan además las entradas de nivel WARNING o
+# mayor (se rota al pasar 16 KB); None no escribe en la flash
+LOG_FILE = None
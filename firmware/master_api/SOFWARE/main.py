@@ -11,6 +11,9 @@ Características principales:
 - Comunicación LoRa bidireccional con nodos esclavos
 - Configuración modular via archivo config.py
 - Manejo robusto de errores y reconexión automática
+- Un único hilo dueño del nodo DSR (NodeOwner); los demás hilos le envían comandos
+- API HTTP con la topología que informan los esclavos (TopologyGraph) y las
+  métricas del nodo (NodeMetrics)
 
 Autores: Francisco Fernández & Nahuel Ontivero
 Universidad: UTN - Facultad Regional Tucumán
@@ -19,12 +22,21 @@ Licencia: MIT
 """
 
 import time
+import json
+import socket
 from machine import Pin, RTC, SoftSPI, Timer # type: ignore
-from firmware.master_api.SOFWARE.DSRNode import DSRNode # type: ignore
+from DSRNode import DSRNode # type: ignore
+from NodeOwner import NodeOwner # type: ignore
+from ReadingCache import ReadingCache # type: ignore
+from TopologyGraph import TopologyGraph # type: ignore
+from Profiler import Profiler # type: ignore
+from NodeLog import LEVELS, WARNING, FileSink # type: ignore
+from SlotScheduler import SlotScheduler # type: ignore
 import network # type: ignore
 import _thread
 import urequests # type: ignore
 from LoRa import LoRa # type: ignore
+from FragmentLink import FragmentLink # type: ignore
 from config import * # Importa todas las constantes de configuración
 
 # ================================================================
@@ -125,65 +137,41 @@ def sync_system_time():
 # FUNCIONES DE COMUNICACIÓN LORA
 # ================================================================
 
-def handle_lora_messages():
+def handle_response(msg):
     """
-    Procesa mensajes LoRa entrantes y salientes de forma coordinada.
-    
-    Esta función maneja tanto la recepción de mensajes nuevos como 
-    el procesamiento de respuestas pendientes. Es llamada periódicamente
-    desde el bucle principal.
+    Recibe cada respuesta que completa una solicitud de datos (DSRNode.on_response).
     
+    Args:
+        msg: Message del RESP (source, extra = datos de sensores, raw = trama)
+        
     Returns:
         None
         
     Note:
-        Utiliza el objeto global dsr_node para el manejo de protocolos
+        Corre en el hilo dueño del nodo: si tarda (p. ej. un POST a una API
+        externa) conviene pasarla a otro hilo para no demorar la radio
     """
-    try:
-        # Procesar mensajes entrantes
-        dsr_node.receive_message()
-        
-        # Verificar respuestas pendientes
-        msg = dsr_node.waiting_for_response()
-        if msg is not None:
-            print(f'📨 Mensaje recibido: {msg}')
-            # Aquí se podría procesar el mensaje recibido
-            # por ejemplo, enviarlo a una API externa
-            
-    except Exception as e:
-        print(f"✗ Error procesando mensajes LoRa: {e}")
+    dsr_node.log.info("Mensaje recibido de %s: %s", msg.source, msg.extra)
+    # Aquí se podría procesar el mensaje recibido
+    # por ejemplo, enviarlo a una API externa
 
 def send_periodic_messages():
     """
-    Hilo dedicado para el envío periódico de mensajes y mantenimiento de la red.
+    Hilo dueño del nodo DSR y de la radio.
     
     Este hilo corre continuamente y se encarga de:
+    - Ejecutar los comandos que envían otros hilos y el temporizador de vecinos
     - Procesar mensajes LoRa de forma regular
-    - Mantener la comunicación con nodos vecinos
-    - Actualizar datos de sensores (si están configurados)
+    - Llevar el reloj del nodo (timestamp y limpieza de cachés cada segundo)
     
     Returns:
         None
         
     Note:
-        Ejecuta en un hilo separado para no bloquear el programa principal
+        Es el único hilo que toca dsr_node; el resto usa node_owner.submit()
     """
     print("🔄 Iniciando hilo de mensajes periódicos...")
-    
-    while True:
-        try:
-            # Si hay sensores conectados, actualizar sus valores
-            # dsr_node.update_sensor('')  # Descomentar si se implementan sensores
-            
-            # Procesar comunicaciones LoRa
-            handle_lora_messages()
-            
-            # Pausa corta para permitir otros procesos
-            time.sleep(0.1)
-            
-        except Exception as e:
-            print(f"✗ Error en hilo de mensajes periódicos: {e}")
-            time.sleep(1)  # Pausa más larga en caso de error
+    node_owner.loop()
 
 def send_neighbor_announcement(timer):
     """
@@ -192,6 +180,7 @@ def send_neighbor_announcement(timer):
     Esta función es llamada automáticamente por el temporizador para
     mantener la conectividad con nodos vecinos. Los mensajes HELLO
     permiten el descubrimiento automático de la topología de red.
+    El envío se encola para el hilo dueño: el callback no toca la radio.
     
     Args:
         timer: Objeto Timer que ejecuta esta función
@@ -202,11 +191,78 @@ def send_neighbor_announcement(timer):
     Note:
         La frecuencia está definida por PERIODIC_VECINOS_INTERVAL en config.py
     """
-    try:
-        dsr_node.send_hello()
-        print(f"📡 HELLO enviado desde nodo {NODE_ID}")
-    except Exception as e:
-        print(f"✗ Error enviando HELLO: {e}")
+    node_owner.submit(dsr_node.send_hello)
+
+# ================================================================
+# API HTTP DE TOPOLOGÍA
+# ================================================================
+
+def topology_query(path):
+    """
+    Resuelve una consulta de la API en el hilo dueño del nodo.
+    
+    Args:
+        path (str): /topologia, /ruta/<origen>/<destino>, /cuellos, /particiones, /estadisticas,
+            /perfil o /log
+        
+    Returns:
+        tuple: (código HTTP, objeto para JSON)
+    """
+    parts = path.strip("/").split("/")
+    if parts == ["topologia"]:
+        topology.expire()
+        return 200, topology.snapshot()
+    if parts[0] == "ruta" and len(parts) == 3:
+        route = topology.shortest_path(parts[1], parts[2])
+        return (200, route) if route is not None else (404, {"error": "sin camino"})
+    if parts == ["cuellos"]:
+        return 200, topology.bottlenecks()
+    if parts == ["particiones"]:
+        return 200, topology.partitions()
+    if parts == ["estadisticas"]:
+        return 200, dsr_node.stats()
+    if parts == ["log"]:
+        return 200, {"entries": dsr_node.log.dump(), **dsr_node.log.stats()}
+    if parts == ["perfil"]:
+        if profiler is None:
+            return 404, {"error": "perfilado desactivado (PROFILE = False)"}
+        return 200, [{"funcion": name, "llamadas": calls, "total_us": total, "max_us": longest}
+                     for name, calls, total, longest in profiler.results()]
+    return 404, {"error": "consulta desconocida"}
+
+def serve_http():
+    """
+    Hilo del servidor HTTP: atiende un pedido GET por conexión.
+    
+    Returns:
+        None
+        
+    Note:
+        Las consultas corren en el hilo dueño vía node_owner.call(); este hilo
+        sólo lee el pedido y escribe la respuesta
+    """
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(socket.getaddrinfo("0.0.0.0", HTTP_PORT)[0][-1])
+    server.listen(2)
+    print(f"🌐 API HTTP escuchando en el puerto {HTTP_PORT}")
+    while True:
+        client, _ = server.accept()
+        try:
+            request = client.recv(512).decode()
+            method, path = request.split(" ")[:2]
+            if method != "GET":
+                status, body = 405, {"error": "sólo GET"}
+            else:
+                status, body = node_owner.call(lambda: topology_query(path), timeout=5)
+            payload = json.dumps(body)
+            client.send(f"HTTP/1.0 {status} OK\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n\r\n".encode())
+            client.send(payload.encode())
+        except Exception as e:
+            print(f"✗ Error atendiendo pedido HTTP: {e}")
+        finally:
+            client.close()
 
 # ================================================================
 # CONFIGURACIÓN E INICIALIZACIÓN DEL SISTEMA
@@ -237,6 +293,7 @@ lora = LoRa(
     reset_pin=Pin(LORA_RST_PIN), # Pin de Reset
     dio0_pin=Pin(LORA_DIO0_PIN)  # Pin de interrupción DIO0
 )
+lora = FragmentLink(lora, NODE_ID)  # Tramas de más de 255 bytes viajan fragmentadas
 
 # Inicialización del RTC para timestamps
 rtc = RTC()
@@ -245,14 +302,42 @@ print(f"✓ Módulo LoRa configurado (CS: GPIO{LORA_CS_PIN}, RST: GPIO{LORA_RST_
 print("=" * 30)
 
 print("=== INICIALIZACIÓN DSR ===")
+# Parámetros del protocolo definidos en config.py
+DSRNode.TIMEOUT = DSR_TIMEOUT
+DSRNode.RETRY_INTERVAL = DSR_RETRY_INTERVAL
+DSRNode.MAX_ATTEMPTS = DSR_MAX_ATTEMPTS
+
 # Inicialización del nodo DSR con protocolo de enrutamiento
 dsr_node = DSRNode(
     NODE_ID,                    # ID único del nodo
     lora,                       # Instancia del módulo LoRa
     rtc,                        # Reloj de tiempo real
-    Timer(TIMER_ID_LORA),       # Temporizador para operaciones DSR
-    qos=LORA_QOS               # Umbral de calidad de señal
+    None,                       # Sin Timer: el reloj lo lleva el hilo dueño
+    qos=LORA_QOS,              # Umbral de calidad de señal
+    role="master"              # Referencia de TimeSync, cronograma TDMA y anuncios GATE
 )
+lora.transmit = dsr_node.send  # FNACK y retransmisiones por la cola de salida del nodo
+lora.log = dsr_node.log  # Descartes por tamaño (FragmentLink y driver) al registro del nodo
+dsr_node.hop_ack = HOP_ACK  # Confirmación por salto (None: fallas detectadas por NEIGHBOR_TIMEOUT)
+dsr_node.reply_from_cache = REPLY_FROM_CACHE  # RREP desde la caché de rutas de los nodos intermedios
+# Registro en memoria: el bucle principal lo escribe por consola (y en la flash con LOG_FILE)
+dsr_node.log.level = LEVELS[LOG_LEVEL]
+dsr_node.log.add_sink(print)
+if LOG_FILE is not None:
+    dsr_node.log.add_sink(FileSink(LOG_FILE), WARNING)
+# Última lectura de cada nodo: node_owner.read(nodo, callback) no consulta la mesh mientras esté fresca
+reading_cache = ReadingCache(dsr_node, ttl=READING_CACHE_TTL)
+# Tablas de vecinos que informan los esclavos (TOPO o dentro del TELE): la consulta la API HTTP
+topology = TopologyGraph(dsr_node)
+# Cronograma TDMA: lo atiende el hilo dueño en cada pasada
+slot_scheduler = SlotScheduler(dsr_node) if SLOT_SCHEDULE else None
+# Perfilado de los caminos calientes (GET /perfil); sin PROFILE los métodos quedan intactos
+profiler = Profiler() if PROFILE else None
+if profiler is not None:
+    profiler.attach(dsr_node)
+node_owner = NodeOwner(dsr_node, on_response=handle_response, cache=reading_cache, scheduler=slot_scheduler)
+if GATEWAY_ADVERT_INTERVAL:
+    dsr_node.start_advertising(GATEWAY_ADVERT_INTERVAL)
 
 print(f"✓ Nodo DSR inicializado (ID: {NODE_ID}, QoS: {LORA_QOS} dBm)")
 
@@ -277,10 +362,15 @@ try:
     _thread.start_new_thread(send_periodic_messages, ())
     print("✓ Hilo de mensajes periódicos iniciado")
     
+    if HTTP_PORT is not None:
+        _thread.start_new_thread(serve_http, ())
+        print("✓ Hilo de la API HTTP iniciado")
+    
     # Aquí se pueden agregar otros hilos según necesidades:
     # - Hilo MQTT para comunicación con broker
-    # - Hilo de API web para servidor HTTP
     # - Hilo de procesamiento de datos de sensores
+    # Ninguno llama a dsr_node directamente: usan node_owner.submit() / call(),
+    # y para leer sensores node_owner.read() (caché con TTL y pedidos compartidos)
     
 except Exception as e:
     print(f"✗ Error al iniciar hilos: {e}")
@@ -296,5 +386,10 @@ print("📡 Nodo maestro listo para comunicación")
 print("=" * 50)
 
 while True:
-    handle_lora_messages()
-    time.sleep(0.1)
\ No newline at end of file
+    # La radio la atiende sólo el hilo de mensajes periódicos: él saca las entradas del registro
+    # (NodeLog no usa locks) y este hilo las escribe
+    try:
+        dsr_node.log.deliver(node_owner.call(dsr_node.log.take, LOG_BATCH, timeout=5))
+    except OSError as e:
+        print(f"✗ Error al leer el registro del nodo: {e}")
+    time.sleep(1)
\ No newline at end of file
@@ -1,11 +1,19 @@
 import time
+import json
 from umqtt.simple import MQTTClient # type: ignore
 from machine import Pin, RTC, SoftSPI, Timer # type: ignore
 from DSRNode import DSRNode # type: ignore
+from NodeOwner import NodeOwner # type: ignore
+from ReadingCache import ReadingCache # type: ignore
+from TopologyGraph import TopologyGraph # type: ignore
+from SlotScheduler import SlotScheduler # type: ignore
+from Profiler import Profiler # type: ignore
+from NodeLog import LEVELS # type: ignore
 import network # type: ignore
 import _thread
 import urequests # type: ignore
 from LoRa import LoRa # type: ignore
+from FragmentLink import FragmentLink # type: ignore
 
 # Configuración de nodos y red
 NODE_ID = "A"
@@ -20,6 +28,20 @@ MQTT_PASSWORD = 'carpincho'
 MQTT_TOPIC_RESULT = f"{NODE_ID}/data"
 MQTT_TOPIC_COMMANDS = f"{NODE_ID}/commands"
 MQTT_TOPIC_REPORTS = f"{NODE_ID}/reports"
+MQTT_TOPIC_MARKS = "mesh/marks"  # Compartido por todos los gateways: última lectura guardada de cada nodo
+MQTT_TOPIC_LOG = f"{NODE_ID}/log"  # Entradas del registro del nodo de nivel LOG_MQTT_LEVEL o mayor
+
+READING_CACHE_TTL = 30  # Segundos en que DATOS/<id> responde con la última lectura sin consultar la mesh
+SLOT_SCHEDULE = False   # Armar y difundir el cronograma de slots TDMA (SlotScheduler)
+GATEWAY_ADVERT_INTERVAL = 0  # Segundos entre anuncios GATE para esclavos con PUSH_GATEWAY = "*" (0 = gateway único)
+MARKS_INTERVAL = 10     # Segundos entre publicaciones de marcas a los demás gateways
+PROFILE = False         # Cronometrar los caminos calientes del nodo y de la radio (comando PERFIL)
+LOG_LEVEL = "INFO"      # Nivel del registro del nodo: DEBUG, INFO, WARNING o ERROR (comando NIVEL/<nivel>)
+LOG_MQTT_LEVEL = "WARNING"  # Nivel mínimo de las entradas que se publican en MQTT_TOPIC_LOG
+LOG_BATCH = 8           # Entradas del registro que drena el hilo MQTT por pasada
+
+# Lecturas que llegan en el hilo dueño y publica el hilo MQTT: [(nodo, (valor, antigüedad) o None)]
+readings_to_publish = []
 
 
 def connect_to_wifi():
@@ -64,20 +86,65 @@ def process_command(command):
             destination = command.split("/")[1]
             message = f"Solicitando caminos: {destination}"
             mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
-            dsr_node.broadcast_rreq(destination)
+            node_owner.submit(dsr_node.broadcast_rreq, destination)
         elif command == 'CAMINOS':
-            message = str(dsr_node.routes)
+            message = str(node_owner.call(lambda: dict(dsr_node.routes), timeout=5))
             mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
         elif command.startswith('DATOS'):
             data_request = command.split("/")[1]
-            message = "Solicitando datos"
+            # Lectura fresca: se publica ya; si no, un único DATA aunque lleguen varios DATOS del mismo nodo
+            if not node_owner.read(data_request, lambda reading: readings_to_publish.append((data_request, reading))):
+                message = "Solicitando datos"
+                mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+            publish_readings()
+        elif command.startswith('LECTURAS'):
+            data_request = command.split("/")[1]
+            message = "Solicitando lecturas"
             mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
-            dsr_node.request_data(data_request)
+            node_owner.submit(dsr_node.request_samples, data_request)
         elif command == 'VECINOS':
-            message = str(dsr_node.neighbors)
+            message = str(node_owner.call(lambda: set(dsr_node.neighbors), timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command == 'CACHE':
+            message = str(node_owner.call(lambda: dict(reading_cache.stats), timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command == 'TOPOLOGIA':
+            message = json.dumps(node_owner.call(topology_snapshot, timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command.startswith('RUTA'):
+            _, source, destination = command.split("/")
+            message = json.dumps(node_owner.call(lambda: topology.shortest_path(source, destination), timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command == 'CUELLOS':
+            message = json.dumps(node_owner.call(topology.bottlenecks, timeout=5))
             mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command == 'PARTICIONES':
+            message = json.dumps(node_owner.call(topology.partitions, timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command == 'ESTADISTICAS':
+            message = json.dumps(node_owner.call(dsr_node.stats, timeout=5))
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command.startswith('PERFIL'):
+            if profiler is None:
+                message = "Perfilado desactivado (PROFILE = False)"
+            elif command == 'PERFIL/REINICIAR':
+                node_owner.call(profiler.reset, timeout=5)
+                message = "Perfil reiniciado"
+            else:
+                message = node_owner.call(profiler.report, timeout=5)
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
+        elif command.startswith('LOG'):
+            # LOG o LOG/<n>: últimas entradas del registro en memoria, ya drenadas o no
+            parts = command.split("/")
+            count = int(parts[1]) if len(parts) > 1 else 20
+            lines = node_owner.call(lambda: dsr_node.log.dump(count), timeout=5)
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, "\n".join(lines) if lines else "Registro vacío")
+        elif command.startswith('NIVEL'):
+            level = LEVELS[command.split("/")[1]]
+            node_owner.call(lambda: setattr(dsr_node.log, "level", level), timeout=5)
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, f"Nivel del registro: {command.split('/')[1]}")
         elif command == 'TIEMPO':
-            message = str(dsr_node.timestamp_message)
+            message = str(node_owner.call(lambda: dsr_node.timestamp_message, timeout=5))
             mqtt_client.publish(MQTT_TOPIC_REPORTS, message)
         else:
             message = f"Comando desconocido: {command}"
@@ -86,47 +153,91 @@ def process_command(command):
         print(f"Error al procesar comando {command}: {e}")
 
 
+def topology_snapshot():
+    """Grafo de la red (en el hilo dueño): descarta antes las filas de nodos que ya no informan."""
+    topology.expire()
+    return topology.snapshot()
+
+
+def publish_readings():
+    """Publica en MQTT_TOPIC_RESULT las lecturas que entregó la caché."""
+    while readings_to_publish:
+        node, reading = readings_to_publish.pop(0)
+        if reading is None:
+            mqtt_client.publish(MQTT_TOPIC_REPORTS, f"Sin respuesta de {node}")
+        else:
+            mqtt_client.publish(MQTT_TOPIC_RESULT, f"{node}:{reading[0]}:{reading[1]}")
+
+
+def publish_marks():
+    """Publica la última secuencia guardada de cada nodo: 'gateway|nodo=secuencia,...'."""
+    marks = node_owner.call(dsr_node.reading_marks, timeout=5)
+    if marks:
+        mqtt_client.publish(MQTT_TOPIC_MARKS, NODE_ID + "|" + ",".join(f"{node}={seq}" for node, seq in marks.items()))
+
+
+def merge_marks(text):
+    """Marcas de otro gateway: sus lecturas no se vuelven a guardar si el esclavo las reenvía acá."""
+    gateway, _, entries = text.partition("|")
+    if gateway == NODE_ID or not entries:
+        return
+    marks = {}
+    for entry in entries.split(","):
+        node, _, seq = entry.partition("=")
+        marks[node] = int(seq)
+    node_owner.submit(dsr_node.merge_marks, marks)
+
+
 def on_mqtt_message(topic, msg):
     """Callback para manejar mensajes MQTT."""
     topic_decoded = topic.decode()
+    if topic_decoded == MQTT_TOPIC_MARKS:
+        merge_marks(msg.decode())
+        return
     command = msg.decode()
     print(f"Mensaje recibido en {topic_decoded}: {command}")
     process_command(command)
 
 
-def handle_lora_messages():
-    """Procesa mensajes LoRa."""
-    dsr_node.waiting_for_response()
-    dsr_node.receive_message()
+def subscribe_topics():
+    """Suscribe a los comandos y, con varios gateways, a las marcas; al conectar y al reconectar."""
+    print(f"Subscribiéndose a: {MQTT_TOPIC_COMMANDS}")
+    mqtt_client.subscribe(MQTT_TOPIC_COMMANDS)
+    if GATEWAY_ADVERT_INTERVAL:
+        mqtt_client.subscribe(MQTT_TOPIC_MARKS)
 
 
 def send_periodic_messages():
-    """Envía mensajes periódicos a través de LoRa."""
-    while True:
-        dsr_node.update_sensor('')
-        handle_lora_messages()
-        time.sleep(0.1)
+    """Hilo dueño del nodo: el único que toca dsr_node y la radio; los demás hilos usan node_owner."""
+    node_owner.loop()
 
 
 def receive_mqtt_messages():
+    marks_at = time.time()
     while True:
         try:
             mqtt_client.check_msg()
+            publish_readings()
+            # El hilo dueño saca las entradas del registro (NodeLog no usa locks) y este las escribe:
+            # la radio no espera a la consola ni al broker
+            dsr_node.log.deliver(node_owner.call(dsr_node.log.take, LOG_BATCH, timeout=5))
+            if GATEWAY_ADVERT_INTERVAL and time.time() - marks_at >= MARKS_INTERVAL:
+                marks_at = time.time()
+                publish_marks()
         except Exception as e:
             print("Error al recibir mensaje MQTT:", e)
             try:
                 print("Reconectando al broker MQTT...")
                 mqtt_client.connect()
-                mqtt_client.subscribe(MQTT_NODE)
-                print("Re-suscrito al tema:", MQTT_NODE)
+                subscribe_topics()
             except Exception as reconnection_error:
                 print("Error al reconectar al broker MQTT:", reconnection_error)
         time.sleep(0.1)
 
 
 def send_neighbor_announcement(timer):
-    """Envia un anuncio periódico a los vecinos."""
-    dsr_node.send_hello()
+    """Envia un anuncio periódico a los vecinos (lo transmite el hilo dueño)."""
+    node_owner.submit(dsr_node.send_hello)
 
 
 # Configuración inicial
@@ -147,10 +258,26 @@ mqtt_client.set_callback(on_mqtt_message)
 # Configuración de LoRa
 spi = SoftSPI(baudrate=3000000, polarity=0, phase=0, sck=Pin(5), mosi=Pin(27), miso=Pin(19))
 lora = LoRa(spi, cs_pin=Pin(18), reset_pin=Pin(14), dio0_pin=Pin(26))
+lora = FragmentLink(lora, NODE_ID)  # Tramas de más de 255 bytes viajan fragmentadas
 rtc = RTC()
 
 # Inicialización de nodos y temporizadores
-dsr_node = DSRNode(NODE_ID, lora, rtc, Timer(1), mqtt_client, MQTT_TOPIC_RESULT, qos=-90)
+dsr_node = DSRNode(NODE_ID, lora, rtc, None, qos=-90, role="master")
+lora.transmit = dsr_node.send  # FNACK y retransmisiones por la cola de salida del nodo
+lora.log = dsr_node.log  # Descartes por tamaño (FragmentLink y driver) al registro del nodo
+dsr_node.log.level = LEVELS[LOG_LEVEL]
+dsr_node.log.add_sink(print)
+dsr_node.log.add_sink(lambda line: mqtt_client.publish(MQTT_TOPIC_LOG, line), LEVELS[LOG_MQTT_LEVEL])
+reading_cache = ReadingCache(dsr_node, ttl=READING_CACHE_TTL)
+topology = TopologyGraph(dsr_node)  # Tablas de vecinos que informan los esclavos (TOPO o dentro del TELE)
+slot_scheduler = SlotScheduler(dsr_node) if SLOT_SCHEDULE else None
+profiler = Profiler() if PROFILE else None
+if profiler is not None:
+    profiler.attach(dsr_node)
+node_owner = NodeOwner(dsr_node, cache=reading_cache, scheduler=slot_scheduler)
+if GATEWAY_ADVERT_INTERVAL:
+    # Varios gateways: los esclavos con PUSH_GATEWAY = "*" empujan al más cercano
+    dsr_node.start_advertising(GATEWAY_ADVERT_INTERVAL)
 neighbor_timer = Timer(0)
 neighbor_timer.init(period=10000, mode=Timer.PERIODIC, callback=send_neighbor_announcement)
 
@@ -158,8 +285,7 @@ neighbor_timer.init(period=10000, mode=Timer.PERIODIC, callback=send_neighbor_an
 try:
     print("Conectando al broker MQTT...")
     mqtt_client.connect()
-    print(f"Subscribiéndose a: {MQTT_TOPIC_COMMANDS}")
-    mqtt_client.subscribe(MQTT_TOPIC_COMMANDS)
+    subscribe_topics()
     print("Conexión MQTT establecida!")
 except Exception as e:
     print(f"No se pudo conectar o subscribir al broker MQTT: {e}")
@@ -171,7 +297,6 @@ try:
 except Exception as e:
     print(f"Error al iniciar hilos: {e}")
 
-# Bucle principal
+# Bucle principal: el nodo y la radio los atiende sólo el hilo send_periodic_messages
 while True:
-    handle_lora_messages()
-    time.sleep(0.1)
+    time.sleep(1)
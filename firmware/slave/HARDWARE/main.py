@@ -1,10 +1,11 @@
-from machine import Pin, UART, Timer, RTC, SPI # type: ignore
-import time
+from machine import Pin, UART, RTC, SPI # type: ignore
 from MicropyGPS import MicropyGPS # type: ignore
 import onewire # type: ignore
 import ds18x20 # type: ignore
 from LoRa import LoRa # type: ignore
+from FragmentLink import FragmentLink # type: ignore
 from DSRNode import DSRNode # type: ignore
+from NodeRuntime import NodeRuntime, asyncio # type: ignore
 
 # Configuración del módulo GPS
 modulo_gps = UART(1, baudrate=9600, rx=9)
@@ -38,8 +39,8 @@ def convertir(secciones):
 
 latitud_send = 0
 longitud_send = 0
-# Función para leer datos GPS y temperatura
-def gps_y_temperatura(timer):
+# Función para leer datos GPS y temperatura (corrutina del runtime)
+async def gps_y_temperatura():
     # Lectura del GPS
     largo = modulo_gps.any()
     if largo > 0:
@@ -48,7 +49,7 @@ def gps_y_temperatura(timer):
             gps.update(chr(x))
     latitud = convertir(gps.latitude)
     longitud = convertir(gps.longitude)
-    print(f"GPS -> Longitud: {longitud}, Latitud: {latitud}")
+    nodo.log.info("GPS -> Longitud: %s, Latitud: %s", longitud, latitud)
 
     # Configuración de la fecha y hora del RTC
     actual_time = gps.timestamp
@@ -59,10 +60,10 @@ def gps_y_temperatura(timer):
     # Lectura del sensor de temperatura
     if roms:
         ds_sensor.convert_temp()  # Inicia la conversión de temperatura
-        time.sleep_ms(750)  # Esperar conversión
+        await asyncio.sleep(0.75)  # Esperar conversión sin bloquear la radio
         for rom in roms:
             temp = ds_sensor.read_temp(rom)
-            print(f"DS18B20 -> Temperatura: {temp:.2f} °C")
+            nodo.log.info("DS18B20 -> Temperatura: %.2f °C", temp)
     global longitud_send
     global latitud_send
     if longitud is not None or latitud is not None:
@@ -71,24 +72,16 @@ def gps_y_temperatura(timer):
     msg = str(longitud_send)+"/"+str(latitud_send)+"/"+str(temp)
     nodo.update_sensor(msg)
 
-def hello(timer):
-    nodo.send_hello()
-
 spi = SPI(2,baudrate=3000000, polarity=0, phase=0, sck=Pin(18), mosi=Pin(23), miso=Pin(19))
 lora = LoRa(spi, cs_pin=Pin(5), reset_pin=Pin(4), dio0_pin=Pin(2))
+lora = FragmentLink(lora, "B")  # Tramas de más de 255 bytes viajan fragmentadas
 
-tim0 = Timer(0)
-tim1 = Timer(1)
-tim2 = Timer(2)
 rtc = RTC()
 
-nodo = DSRNode("B", lora, rtc, tim0, qos=-95)
-tim1.init(period=5000, mode=Timer.PERIODIC, callback=hello)
-tim2.init(period=10000, mode=Timer.PERIODIC, callback=gps_y_temperatura)
-
-while True:
-    nodo.waiting_for_response()
-    nodo.receive_message()
-    time.sleep(1)
-
-
+nodo = DSRNode("B", lora, rtc, None, qos=-95)
+lora.transmit = nodo.send  # FNACK y retransmisiones por la cola de salida del nodo
+lora.log = nodo.log  # Descartes por tamaño (FragmentLink y driver) al registro del nodo
+nodo.sensor_schema = "G"  # Lotes compactos (SensorCodec): longitud/latitud/temperatura
+# Registro en memoria: lo escribe por consola la tarea log de NodeRuntime, no el manejo de cada trama
+nodo.log.add_sink(print)
+NodeRuntime(nodo, hello_ms=5000, sampler=gps_y_temperatura, sample_ms=10000).run()
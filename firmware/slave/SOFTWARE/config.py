@@ -76,8 +76,16 @@ DSR_RETRY_INTERVAL = 30
 # Número máximo de intentos de reenvío
 DSR_MAX_ATTEMPTS = 2
 
-# Tiempo de vida de entradas en caché (en segundos)
-DSR_CACHE_TIMEOUT = 180
+# Confirmación por salto de DATA/RESP: None, "explicit" o "passive" (igual en
+# todos los nodos). Sin ella un relay caído se detecta recién cuando deja de
+# enviar HELLO (NEIGHBOR_TIMEOUT, 35 s), y el origen se entera del RERR o del
+# TIMEOUT mucho después; con ella, en pocos segundos
+HOP_ACK = None
+
+# Responder un RREQ desde la caché de rutas en nombre del destino (RREP con el
+# campo replier). Los nodos de firmware anterior no entienden ese RREP: activarlo
+# recién con toda la red actualizada. En redes grandes ahorra muchas inundaciones
+REPLY_FROM_CACHE = False
 
 # ================================================================
 # CONFIGURACIÓN DE DATOS DE SENSORES
@@ -92,3 +100,51 @@ TEMP_MAX_RANGE = 85.0   # Temperatura máxima esperada (°C)
 
 # Formato de datos de sensores para transmisión
 SENSOR_DATA_FORMAT = "temp:{temp:.1f},gps_lat:{lat},gps_lon:{lon}"
+
+# ================================================================
+# TELEMETRÍA PUSH
+# ================================================================
+
+# ID del gateway al que se envían las lecturas sin esperar un DATA
+# (None = el nodo sólo responde las solicitudes del maestro; "*" = el gateway
+# más cercano de los que se anuncian con GATEWAY_ADVERT_INTERVAL)
+PUSH_GATEWAY = None
+
+# Intervalo entre envíos (en segundos); cada envío lleva las lecturas nuevas
+PUSH_INTERVAL = 60
+
+# Enviar también apenas cambia la lectura
+PUSH_ON_CHANGE = False
+
+# Esperar la confirmación (TACK) del gateway y reenviar lo no confirmado
+PUSH_ACK = True
+
+# Segundos máximos entre informes de la tabla de vecinos a PUSH_GATEWAY (0 = no
+# informar). Un cambio de vecinos se informa enseguida, dentro del próximo TELE
+TOPOLOGY_REPORT_INTERVAL = 600
+
+# Segundos mínimos entre resúmenes de métricas del nodo (tramas, reenvíos,
+# reintentos...) agregados a las respuestas RESP al maestro (0 = no enviarlos).
+# Desactivado por defecto: los maestros de firmware anterior descartan esos RESP;
+# activarlo (p. ej. 300) cuando todos los maestros estén actualizados
+STATS_PIGGYBACK = 0
+
+# Cronometrar los caminos calientes del nodo y de la radio (Profiler) e imprimir
+# el informe cada PROFILE_REPORT_INTERVAL segundos. Desactivado no cuesta nada
+PROFILE = False
+PROFILE_REPORT_INTERVAL = 60
+
+# Nivel del registro del nodo (NodeLog): DEBUG, INFO, WARNING o ERROR. Se guarda
+# en memoria y la tarea log del runtime lo escribe por consola entre tramas
+LOG_LEVEL = "WARNING"
+
+# Archivo de la flash para las entradas de nivel WARNING o mayor (None = sólo consola)
+LOG_FILE = None
+
+# ================================================================
+# SLOTS TDMA
+# ================================================================
+
+# Transmitir en los slots que asigna el gateway (SlotScheduler) y dormir la
+# radio fuera de ellos; el gateway también debe tenerlo activo
+SLOT_SCHEDULE = False
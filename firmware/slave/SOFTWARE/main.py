@@ -10,6 +10,8 @@ Características principales:
 - Sensor de temperatura DS18B20 integrado
 - Módulo GPS para geolocalización
 - Respuesta automática a solicitudes de datos
+- Runtime asíncrono (NodeRuntime): la radio se atiende por interrupción y
+  la lectura de sensores no bloquea el reenvío de tramas
 - Configuración de hardware optimizada para ESP32
 
 Sensores soportados:
@@ -22,13 +24,17 @@ Fecha: 2024
 Licencia: MIT
 """
 
-from machine import Pin, UART, Timer, RTC, SoftSPI # type: ignore
-import time
+from machine import Pin, UART, RTC, SoftSPI # type: ignore
 from MicropyGPS import MicropyGPS # type: ignore
 import onewire # type: ignore
 import ds18x20 # type: ignore
 from LoRa import LoRa # type: ignore
+from FragmentLink import FragmentLink # type: ignore
 from DSRNode import DSRNode # type: ignore
+from NodeRuntime import NodeRuntime, asyncio # type: ignore
+from SlotScheduler import SlotScheduler # type: ignore
+from Profiler import Profiler # type: ignore
+from NodeLog import LEVELS, WARNING, FileSink # type: ignore
 from config import * # Importa todas las constantes de configuración
 
 # ================================================================
@@ -43,15 +49,23 @@ gps = MicropyGPS(GPS_TIMEZONE)
 spi = SoftSPI(baudrate=3000000, polarity=0, phase=0, 
               sck=Pin(SPI_SCK_PIN), mosi=Pin(SPI_MOSI_PIN), miso=Pin(SPI_MISO_PIN))
 lora = LoRa(spi, cs_pin=Pin(LORA_CS_PIN), reset_pin=Pin(LORA_RST_PIN), dio0_pin=Pin(LORA_DIO0_PIN))
+lora = FragmentLink(lora, NODE_ID)  # Tramas de más de 255 bytes viajan fragmentadas
 
-# Inicialización de temporizadores y RTC usando constantes de config.py
-tim0 = Timer(TIMER_ID_DSR)      # Timer para DSR
-tim1 = Timer(TIMER_ID_SENSORS)  # Timer para lecturas de sensores
-tim2 = Timer(TIMER_ID_GPS)      # Timer para GPS
 rtc = RTC()
 
-# Crear nodo DSR usando constantes de config.py
-nodo = DSRNode(NODE_ID, lora, rtc, tim0, qos=LORA_QOS)
+# Crear nodo DSR usando constantes de config.py; sin Timer: el reloj lo lleva NodeRuntime
+nodo = DSRNode(NODE_ID, lora, rtc, None, qos=LORA_QOS)
+lora.transmit = nodo.send  # FNACK y retransmisiones por la cola de salida del nodo
+lora.log = nodo.log  # Descartes por tamaño (FragmentLink y driver) al registro del nodo
+nodo.sensor_schema = "G"  # Lotes compactos (SensorCodec): longitud/latitud/temperatura
+nodo.stats_piggyback = STATS_PIGGYBACK  # Métricas del nodo en los RESP, para el maestro
+nodo.hop_ack = HOP_ACK  # Confirmación por salto (None: fallas detectadas por NEIGHBOR_TIMEOUT)
+nodo.reply_from_cache = REPLY_FROM_CACHE  # RREP desde la caché de rutas de los nodos intermedios
+# Registro en memoria: lo escribe la tarea log de NodeRuntime, no el manejo de cada trama
+nodo.log.level = LEVELS[LOG_LEVEL]
+nodo.log.add_sink(print)
+if LOG_FILE is not None:
+    nodo.log.add_sink(FileSink(LOG_FILE), WARNING)
 
 # ================================================================
 # CONFIGURACIÓN DE SENSORES
@@ -110,8 +124,8 @@ def convertir(secciones):
 longitud_send = 0  # Valor por defecto
 latitud_send = 0   # Valor por defecto
 
-# Función para leer datos GPS y temperatura
-def gps_y_temperatura(timer):
+# Función para leer datos GPS y temperatura (corrutina del runtime)
+async def gps_y_temperatura():
     # Lectura del GPS
     largo = modulo_gps.any()
     if largo > 0:
@@ -132,7 +146,7 @@ def gps_y_temperatura(timer):
     temp = None  # Valor por defecto
     if roms:
         ds_sensor.convert_temp()  # Inicia la conversión de temperatura
-        time.sleep_ms(750)  # Esperar conversión
+        await asyncio.sleep(0.75)  # Esperar conversión sin bloquear la radio
         for rom in roms:
             temp = ds_sensor.read_temp(rom)
     
@@ -151,19 +165,32 @@ def gps_y_temperatura(timer):
     nodo.update_sensor(msg)
 
 
-def hello(timer):
-    nodo.send_hello()
+# Telemetría push: las lecturas viajan al gateway sin esperar un DATA
+if PUSH_GATEWAY is not None:
+    nodo.start_push(PUSH_GATEWAY, PUSH_INTERVAL, on_change=PUSH_ON_CHANGE, ack=PUSH_ACK)
+    if TOPOLOGY_REPORT_INTERVAL:
+        # Tabla de vecinos para el grafo de la red del gateway (TopologyGraph)
+        nodo.start_reports(PUSH_GATEWAY, TOPOLOGY_REPORT_INTERVAL)
 
+# Slots TDMA: el nodo transmite en la contienda y en sus slots, y duerme la radio el resto
+slots = SlotScheduler(nodo) if SLOT_SCHEDULE else None
 
-tim1.init(period=5000, mode=Timer.PERIODIC, callback=hello)
+# HELLO cada 5 s y sensores cada 10 s; recepción, reenvíos y reloj del nodo en el mismo loop
+runtime = NodeRuntime(nodo, hello_ms=5000, sampler=gps_y_temperatura, sample_ms=10000, scheduler=slots)
 
+if PROFILE:
+    profiler = Profiler()
+    profiler.attach(nodo)
 
-tim2.init(period=10000, mode=Timer.PERIODIC, callback=gps_y_temperatura)
+    async def informe_perfil():
+        runtime.start()
+        while True:
+            await asyncio.sleep(PROFILE_REPORT_INTERVAL)
+            print(profiler.report())
 
-while True:
-    nodo.waiting_for_response()
-    nodo.receive_message()
-    time.sleep(1)
+    asyncio.run(informe_perfil())
+else:
+    runtime.run()
 
 
 
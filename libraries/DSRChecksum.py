@@ -0,0 +1,117 @@
+"""
+Checksums de integridad de las tramas RESP
+==========================================
+
+- crc16:  CRC-16/CCITT-FALSE (polinomio 0x1021, valor inicial 0xFFFF). Usa
+          binascii.crc_hqx cuando el port lo trae (CPython, simulador) y si no
+          una tabla precalculada de 256 entradas; ambos dan el mismo valor.
+- crc32:  CRC-32 de binascii.crc32, rutina en C en CPython y en los ports de
+          MicroPython que la incluyen (ESP32): el modo más rápido en la placa,
+          a costa de un campo de checksum de hasta 10 dígitos en vez de 5. En
+          los ports sin crc32, una tabla de 256 entradas con el mismo valor.
+- legacy: suma de palabras de 16 bits en complemento a uno, la del firmware
+          anterior, para redes con nodos sin actualizar.
+
+DEFAULT_MODE es parte del protocolo y no depende del port: crc32, nativo en
+CPython (simulador) y en la ESP32. La tabla de crc16 en Python es más lenta
+que la suma legacy en la placa, y un modo elegido por port haría que nodos de
+ports distintos rechacen en silencio las tramas de los otros.
+
+Las funciones reciben bytes, bytearray o memoryview: verificar una trama no
+requiere copiar el payload sin el checksum, alcanza con una vista.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+from array import array
+
+try:
+    from binascii import crc_hqx
+except ImportError:
+    crc_hqx = None  # MicroPython: se usa la tabla
+
+try:
+    from binascii import crc32 as crc32_native
+except ImportError:
+    crc32_native = None  # Port sin crc32: se usa la tabla
+
+CRC16_POLY = 0x1021
+CRC16_INIT = 0xFFFF
+CRC32_POLY = 0xEDB88320  # Reflejado, el de binascii.crc32
+
+
+def make_crc16_table():
+    table = array("H", [0] * 256)
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC16_POLY) if crc & 0x8000 else (crc << 1)
+        table[byte] = crc & 0xFFFF
+    return table
+
+
+CRC16_TABLE = make_crc16_table()
+
+
+def crc16_table(data, crc=CRC16_INIT):
+    table = CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc16(data, crc=CRC16_INIT):
+    if crc_hqx is not None:
+        return crc_hqx(data, crc)
+    return crc16_table(data, crc)
+
+
+def make_crc32_table():
+    table = array("L", [0] * 256)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ CRC32_POLY if crc & 1 else crc >> 1
+        table[byte] = crc
+    return table
+
+
+CRC32_TABLE = None  # Se arma sólo si el port no trae crc32
+
+
+def crc32_table(data, crc=0):
+    global CRC32_TABLE
+    if CRC32_TABLE is None:
+        CRC32_TABLE = make_crc32_table()
+    table = CRC32_TABLE
+    crc ^= 0xFFFFFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc ^ 0xFFFFFFFF
+
+
+def crc32(data, crc=0):
+    if crc32_native is not None:
+        return crc32_native(data, crc)
+    return crc32_table(data, crc)
+
+
+def legacy(data):
+    checksum = 0
+    for i in range(0, len(data), 2):
+        word = data[i]
+        if i + 1 < len(data):
+            word = (word << 8) + data[i + 1]
+        checksum += word
+        checksum = (checksum & 0xFFFF) + (checksum >> 16)
+    return ~checksum & 0xFFFF
+
+
+ALGORITHMS = {
+    "crc16": crc16,
+    "crc32": crc32,
+    "legacy": legacy,
+}
+
+DEFAULT_MODE = "crc32"
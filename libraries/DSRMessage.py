@@ -0,0 +1,181 @@
+"""
+Decodificador de tramas de la red mesh
+======================================
+
+Convierte el texto de una trama LoRa (campos separados por ':') en un objeto
+Message en una sola pasada, para que los manejadores de DSRNode no vuelvan a
+partir el mismo payload. Una trama mal formada levanta ValueError.
+
+Campos de Message según el tipo de trama:
+- HELLO: source, extra = (hora global en ms, nivel) de TimeSync o None, msg_id = versión del
+         cronograma de SlotScheduler que sigue el emisor (int) o None
+- RREQ:  source, destination, msg_id, route, ttl (None en los RREQ de firmware anterior)
+- RREP:  source, destination, msg_id, route, extra = nodo que respondió desde la caché o None
+- DATA:  source, destination, msg_id, route, extra = desde qué muestra se piden
+         ("s{secuencia}" o "t{timestamp}") o None para la lectura actual
+- RESP:  source, destination, msg_id, route, extra = datos de sensores (una lectura o
+         un lote de encode_batch), stats = resumen de métricas del emisor (NodeMetrics.encode) o None
+- TELE:  source, destination, msg_id, route, extra = (pide TACK, lote de lecturas, tabla de
+         vecinos de encode_table o None) que un esclavo empuja a su gateway sin pedido
+- TOPO:  source, destination = gateway, msg_id, route, extra = tabla de vecinos (encode_table)
+- TACK:  source = gateway, destination = esclavo, msg_id, route, extra = (última secuencia recibida,
+         si el gateway guarda esa lectura: False si sólo la guardó otro gateway y no sirve de referencia)
+- RERR:  source, destination, msg_id, route, extra = (desde, hasta) del enlace caído
+- GATE:  source = gateway que se anuncia, msg_id, route = nodos que reenviaron el anuncio, ttl
+- JOIN:  source = nodo que pide slot, destination = siguiente salto hacia el gateway, route = relays recorridos
+- SLOTS: source = gateway, msg_id = versión (int), extra = (frame_ms, slot_ms, contienda_ms, lista de slots)
+         de SlotScheduler
+- ACK:   source = quien confirma, destination = salto anterior, msg_id,
+         extra = (tipo, origen) de la trama confirmada
+
+Con ACK pasivo (DSRNode.hop_ack = "passive") las tramas con ruta de origen llevan al final
+'>{nodo que la transmite}' (HOP_MARK), fuera de los campos y del checksum: split_hop lo separa
+antes de decode y queda en Message.hop.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+
+class Message:
+    __slots__ = ("kind", "source", "destination", "msg_id", "route", "ttl", "extra", "raw", "rssi", "rx_ms", "stats", "hop")
+
+    def __init__(self, kind, source, destination=None, msg_id=None, route=None, ttl=None, extra=None, raw="", rssi=None, rx_ms=None, stats=None, hop=None):
+        self.kind = kind
+        self.source = source
+        self.destination = destination
+        self.msg_id = msg_id
+        self.route = route if route is not None else []
+        self.ttl = ttl
+        self.extra = extra
+        self.raw = raw
+        self.rssi = rssi
+        self.rx_ms = rx_ms      # ticks_ms de la recepción (interrupción de la radio), si el driver lo informa
+        self.stats = stats
+        self.hop = hop          # Nodo que transmitió esta copia (HOP_MARK) o None
+
+    def __repr__(self):
+        return "Message(%s)" % self.raw
+
+
+HOP_MARK = ">"
+
+
+def split_hop(payload):
+    """Separa la marca de quien transmite la trama: (trama, nodo) o (trama, None) si no la lleva."""
+    mark = payload.rfind(HOP_MARK)
+    # La marca va después del último campo; un '>' anterior es parte de los datos
+    if mark < 0 or mark < payload.rfind(":"):
+        return payload, None
+    return payload[:mark], payload[mark + 1:]
+
+
+ROUTED_KINDS = ("DATA", "RESP", "TELE", "TOPO", "TACK")   # Tramas que viajan por ruta de origen (forward_routed)
+
+
+def next_hop(payload, node_id):
+    """Siguiente salto de una trama con ruta de origen que transmite node_id, o None si es de difusión."""
+    parts = split_hop(payload)[0].split(":", 5)
+    if len(parts) < 5 or parts[0] not in ROUTED_KINDS:
+        return None
+    path = [parts[1]] + split_route(parts[4]) + [parts[2]]
+    if node_id not in path[:-1]:
+        return None
+    return path[path.index(node_id) + 1]
+
+
+def split_route(field):
+    return field.split("-") if field else []
+
+
+def decode(payload, rssi=None):
+    """Decodifica una trama; levanta ValueError si el tipo es desconocido o faltan campos."""
+    parts = payload.split(":")
+    kind = parts[0]
+    count = len(parts)
+    if kind == "HELLO" and count == 2:
+        return Message(kind, parts[1], raw=payload, rssi=rssi)
+    if kind == "HELLO" and count == 4:
+        return Message(kind, parts[1], extra=(int(parts[2]), int(parts[3])), raw=payload, rssi=rssi)
+    if kind == "HELLO" and count == 5:
+        return Message(kind, parts[1], msg_id=int(parts[4]), extra=(int(parts[2]), int(parts[3])), raw=payload, rssi=rssi)
+    if kind == "RREQ" and count in (5, 6):
+        ttl = int(parts[5]) if count == 6 else None
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), ttl, raw=payload, rssi=rssi)
+    if kind == "RREP" and count in (5, 6):
+        replier = parts[5] if count == 6 else None
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=replier, raw=payload, rssi=rssi)
+    if kind == "DATA" and count in (4, 5, 6):
+        route = split_route(parts[4]) if count >= 5 else []
+        since = parts[5] if count == 6 else None
+        return Message(kind, parts[1], parts[2], parts[3], route, extra=since, raw=payload, rssi=rssi)
+    if kind == "RESP" and count in (7, 8):
+        stats = parts[6] if count == 8 else None
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=parts[5], raw=payload, rssi=rssi, stats=stats)
+    if kind == "TELE" and count in (8, 9):
+        extra = (parts[5] == "1", parts[6], parts[7] if count == 9 else None)
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=extra, raw=payload, rssi=rssi)
+    if kind == "TOPO" and count == 7:
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=parts[5], raw=payload, rssi=rssi)
+    if kind == "TACK" and count in (6, 7):
+        extra = (int(parts[5]), count == 6 or parts[6] != "0")
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=extra, raw=payload, rssi=rssi)
+    if kind == "RERR" and count == 6:
+        link = parts[5].split("-")
+        if len(link) != 2:
+            raise ValueError("enlace inválido")
+        return Message(kind, parts[1], parts[2], parts[3], split_route(parts[4]), extra=(link[0], link[1]), raw=payload, rssi=rssi)
+    if kind == "GATE" and count == 5:
+        return Message(kind, parts[1], msg_id=parts[2], route=split_route(parts[3]), ttl=int(parts[4]), raw=payload, rssi=rssi)
+    if kind == "JOIN" and count == 4:
+        return Message(kind, parts[1], parts[2], route=split_route(parts[3]), raw=payload, rssi=rssi)
+    if kind == "SLOTS" and count == 7:
+        extra = (int(parts[3]), int(parts[4]), int(parts[5]), parts[6])
+        return Message(kind, parts[1], msg_id=int(parts[2]), extra=extra, raw=payload, rssi=rssi)
+    if kind == "ACK" and count == 6:
+        return Message(kind, parts[1], parts[2], parts[4], extra=(parts[3], parts[5]), raw=payload, rssi=rssi)
+    raise ValueError("trama inválida")
+
+
+def encode_batch(samples):
+    """
+    Lote de muestras [(secuencia, timestamp, valor), ...] con secuencias consecutivas:
+    B{primera secuencia}@{timestamp base}|{dt}={valor}|{dt}={valor}...
+    Los valores no pueden contener '|', '=' ni ':'; las tuplas se escriben como 'a/b/c'.
+    """
+    first_seq, base = samples[0][0], samples[0][1]
+    return "B%d@%d|" % (first_seq, base) + "|".join("%d=%s" % (ts - base, format_value(value)) for _, ts, value in samples)
+
+
+def encode_table(table):
+    """Tabla de vecinos {vecino: rssi} como 'B-85,C-90' (los IDs no llevan '-': separa la ruta)."""
+    return ",".join("%s%d" % (neighbor, min(rssi, -1)) for neighbor, rssi in sorted(table.items()))
+
+
+def decode_table(text):
+    """Inversa de encode_table; levanta ValueError si una entrada no tiene RSSI."""
+    table = {}
+    for entry in text.split(",") if text else ():
+        neighbor, _, rssi = entry.rpartition("-")
+        if not neighbor:
+            raise ValueError("entrada de tabla inválida")
+        table[neighbor] = -int(rssi)
+    return table
+
+
+def format_value(value):
+    return value if isinstance(value, str) else "/".join(str(field) for field in value)
+
+
+def decode_batch(text):
+    """Inversa de encode_batch; devuelve None si el texto es una lectura simple."""
+    if not text.startswith("B"):
+        return None
+    entries = text.split("|")
+    first_seq, base = entries[0][1:].split("@")
+    first_seq, base = int(first_seq), int(base)
+    samples = []
+    for offset, entry in enumerate(entries[1:]):
+        delta, value = entry.split("=", 1)
+        samples.append((first_seq + offset, base + int(delta), value))
+    return samples
@@ -1,23 +1,62 @@
 import time
 from machine import Timer # type: ignore
 import random
+from DSRMessage import decode, split_hop, HOP_MARK, encode_batch, decode_batch, format_value, encode_table
+import SensorCodec
+from DSRChecksum import ALGORITHMS as CHECKSUMS, DEFAULT_MODE as CHECKSUM_DEFAULT
+from DuplicateFilter import DuplicateFilter, SEQ_MOD
+from TimeSync import TimeSync
+from NodeLog import NodeLog
+from NodeMetrics import NodeMetrics, decode_summary, DUPLICATES, RELAYS, RETRIES, TIMEOUTS, CHECKSUM_ERRORS, PARSE_ERRORS, HANDLER_ERRORS
+from Ticks import ticks_ms, ticks_us, ticks_diff
 
 class DSRNode:
     MAX_ATTEMPTS = 2
     RETRY_INTERVAL = 30
     TIMEOUT = 62
-    CACHE_TIMEOUT = 180
+    MAX_HOPS = 8                # Saltos máximos que puede recorrer un RREQ
+    RREQ_JITTER_MS = 300        # Retardo aleatorio máximo antes de reenviar un RREQ
+    RREQ_SUPPRESS_COPIES = 3    # Copias escuchadas que cancelan un reenvío pendiente
+    RING_TTLS = (1, 2, 4)       # TTLs probados por la búsqueda en anillo expansivo
+    RING_HOP_TIMEOUT_MS = 1000  # Espera por salto antes de ampliar el anillo
+    ROUTE_TIMEOUT = 300         # Segundos que una ruta de la caché se considera fresca
+    CACHED_REPLY_MAX_AGE = 60   # Antigüedad máxima de una ruta para responder un RREQ desde la caché
+    NEIGHBOR_TIMEOUT = 35       # Segundos sin HELLO tras los cuales un vecino se da por perdido
+    HOP_ACK_TIMEOUT_MS = 500    # Espera del ACK del siguiente salto antes de retransmitir
+    HOP_ACK_RETRIES = 2         # Retransmisiones por salto antes de dar el enlace por caído
+    HOP_ACK_BUFFER = 4          # Tramas que cada nodo retiene a la espera de ACK
+    FRAME_MTU = 255             # Tramas más largas salen fragmentadas (FragmentLink) y los demás vecinos no las escuchan
+    RX_BURST = 16               # Tramas que receive_message saca de la radio por llamada
+    SAMPLE_BUFFER = 64          # Lecturas propias retenidas para pedidos por lote
+    BATCH_MAX = 16              # Lecturas por RESP en lote
+    READINGS_KEEP = 64          # Lecturas recibidas que se guardan por nodo
+    PUSH_JITTER_MS = 2000       # Variación aleatoria de cada envío de telemetría
+    PUSH_CHANGE_DELAY_MS = 500  # Demora máxima del envío disparado por un cambio de lectura
+    ANY_GATEWAY = "*"           # start_push(ANY_GATEWAY): el gateway más cercano de los que se anuncian
+    ADVERT_JITTER_MS = 5000     # Variación aleatoria de cada anuncio de gateway
+    GATEWAY_TIMEOUT = 150       # Segundos sin anuncio tras los que se olvida un gateway
+    GATEWAY_SLACK = 1           # Saltos de más sobre el gateway más cercano con los que aún se reenvía un anuncio
+    GATEWAY_SWITCH_HOPS = 2     # Saltos que debe ahorrar otro gateway para dejar el del envío anterior
+    REPORT_DELAY_MS = 30000     # Espera de un informe de vecinos tras un cambio (junta cambios y da tiempo a un TELE)
+    RSSI_STEP = 5               # dB: paso del RSSI en los informes y cambio mínimo que dispara uno nuevo
+    CHECKSUM_MODE = CHECKSUM_DEFAULT  # "crc32", "crc16" o "legacy"; el mismo en todos los nodos de la red
 
     def __init__(self, node_id, lora, rtc, timer, qos=-80, role="slave"):
+        # Registro en memoria en lugar de print: lo escribe más tarde NodeLog.drain (ver NodeLog)
+        self.log = NodeLog()
         self.neighbors = set()
-        self.rreq_id = 0
-        self.query = {
-            "RREQ": [],
-            "RREP": [],
-            "DATA": [],
-            "RESP": []
-        }
+        self.neighbor_times = {}
+        self.neighbor_rssi = {}  # vecino -> RSSI del último HELLO
+        self.lost_neighbors = set()
+        # Secuencia de las tramas que origina el nodo; arranca al azar para no repetir las de antes de un reinicio
+        self.seq = random.randint(0, SEQ_MOD - 1)
+        self.duplicates = DuplicateFilter()
+        # Hora común de la red: el maestro es la referencia y la difunde en los HELLO
+        self.clock_sync = TimeSync(ticks_ms, self.log)
         self.routes = {}
+        self.route_times = {}
+        self.promiscuous = False
+        self.reply_from_cache = False  # Responder RREQ desde la caché (RREP con replier): opcional, ver CACHED_REPLY_MAX_AGE
         self.node_id = node_id
         self.quality_neighbor = qos
         self.lora = lora
@@ -29,90 +68,510 @@ class DSRNode:
         self.response_timer = 0
         self.attempts = 0
         self.sent_message = None
+        self.request_id = None   # ID del DATA pendiente
+        self.on_response = None  # callback(message) con el RESP que completa la solicitud pendiente
+        self.recovering = None
+        self.expanding_ring = False
+        self.hop_ack = None      # None, "explicit" o "passive"; sin ACK las fallas se ven a los NEIGHBOR_TIMEOUT s
+        self.ack_buffer = {}
+        self.pending_rreq = {}
+        self.ring_search = {}
+        self.samples = []        # [(secuencia, timestamp, valor)] del más viejo al más nuevo
+        self.sample_seq = 0
+        self.readings = {}       # nodo -> [(secuencia, timestamp, valor)] recibidas en RESP por lote o TELE
+        self.latest = {}         # nodo -> (timestamp de recepción, valor) de la última lectura recibida
+        self.sensor_schema = None  # Esquema de SensorCodec para lotes compactos (None = texto)
+        self.gateway = None      # Destino de la telemetría en modo push (None = sólo responde DATA)
+        self.push_interval = 0   # Segundos entre envíos programados (0 = sólo al cambiar la lectura)
+        self.push_on_change = False
+        self.push_ack = False    # Esperar TACK: lo no confirmado viaja de nuevo en el envío siguiente
+        self.push_sent_seq = 0   # Última secuencia confirmada (o enviada, sin TACK)
+        self.push_due = None     # ticks_ms del próximo envío
+        self.push_target = None  # Gateway del último envío (con ANY_GATEWAY, el elegido)
+        self.push_acked_by = None  # Gateway que confirmó push_sent_seq: sólo él tiene la referencia de las diferencias
+        self.gateways = {}       # gateway -> [saltos, time.time() del último anuncio]
+        self.advert_interval = 0 # (gateway) Segundos entre anuncios propios (0 = no se anuncia)
+        self.advert_due = None
+        self.peer_marks = {}     # (gateway) nodo -> última secuencia que ya guardó otro gateway
+        self.duplicate_readings = 0
+        self.report_gateway = None   # Destino de los informes de vecinos (None = no se informa)
+        self.report_interval = 0     # Segundos máximos entre informes aunque la tabla no cambie
+        self.report_due = None
+        self.report_piggyback = True # El informe viaja en el próximo TELE al mismo gateway si sale a tiempo
+        self.reported_neighbors = {} # vecino -> RSSI del último informe
+        self.parse_errors = {}
+        self.metrics = NodeMetrics()     # Contadores de tramas, reenvíos, reintentos y tiempos (stats())
+        self.stats_piggyback = 0     # Segundos mínimos entre resúmenes de métricas en los RESP (0 = nunca)
+        self.stats_sent_at = None
+        self.peer_stats = {}         # nodo -> (timestamp, resumen de métricas) del último RESP que lo trajo
+        self.handlers = {
+            "HELLO": self.process_hello,
+            "RREQ": self.process_rreq,
+            "RREP": self.process_rrep,
+            "DATA": self.process_data,
+            "RESP": self.process_response,
+            "RERR": self.process_rerr,
+            "ACK": self.process_ack,
+            "TELE": self.process_telemetry,
+            "TACK": self.process_tack,
+            "GATE": self.process_gateway,
+            "TOPO": self.process_topology,
+        }
+        # Suscriptores de la recepción: [nombre, tipos (None = todos), callback, tramas entregadas]
+        self.subscribers = []
+        self.subscribe("neighbors", ("HELLO",), self.process_hello)
+        self.subscribe("routing", ("RREQ", "RREP", "DATA", "RESP", "RERR", "ACK", "TELE", "TACK", "GATE", "TOPO"), self.dispatch)
+        self.subscribe("requests", ("RESP",), self.complete_request)
 
+        # Sin timer (timer=None) el dueño del nodo llama a set_timestamp cada segundo, p. ej. NodeRuntime
+        if self.timer is not None:
+            self.timer.init(period=1000, mode=Timer.PERIODIC, callback=self.set_timestamp)
 
-        self.timer.init(period=1000, mode=Timer.PERIODIC, callback=self.set_timestamp)
-
-        print(f"Node {self.node_id} is operating as {self.role}.")
+        self.log.info("Node %s is operating as %s.", self.node_id, self.role)
 
 
     def set_timestamp(self, timer):
         rtc_time = self.rtc.datetime()
         t = (rtc_time[0], rtc_time[1], rtc_time[2], rtc_time[4], rtc_time[5], rtc_time[6], 0, 0, 0)
-        self.timestamp_message = time.mktime(t)
+        rtc_seconds = time.mktime(t)
+        synced = self.clock_sync.now_ms()
+        if self.role == "master":
+            # La hora de la red sigue al RTC del maestro; se reancla si se desvió más de 1 s (p. ej. tras sincronizar por HTTP)
+            if synced is None or abs(synced // 1000 - rtc_seconds) > 1:
+                self.clock_sync.set_reference(rtc_seconds * 1000)
+            self.timestamp_message = rtc_seconds
+        else:
+            self.clock_sync.expire()
+            synced = self.clock_sync.now_ms()
+            self.timestamp_message = synced // 1000 if synced is not None else rtc_seconds
         self.cache_cleaning()
 
-    def remove_query(self, command, element):
-        try:
-            initial_len = len(self.query[command])
-            self.query[command] = [sublist for sublist in self.query[command] if element not in sublist]
-            if len(self.query[command]) < initial_len:
-                print(f"La orden con el '{element}' ha sido eliminada del comando '{command}'.")
-            else:
-                print(f"No se encuentra el elemento '{element}' en el comando '{command}'.")
-        except KeyError:
-            print(f"No existe el comando '{command}' en el diccionario.")
-    
+    def next_seq(self):
+        """ID de la próxima trama originada por este nodo."""
+        self.seq = (self.seq + 1) % SEQ_MOD
+        return str(self.seq)
+
+    def id_owner(self, kind, source, destination):
+        # Las respuestas repiten el ID del pedido: la secuencia es del nodo que pidió
+        return destination if kind in ("RREP", "RESP", "TACK") else source
+
+    def is_duplicate(self, kind, msg_id, source, destination):
+        """True si la trama ya se procesó."""
+        return self.duplicates.seen((kind, self.id_owner(kind, source, destination)), int(msg_id))
+
+    def mark_processed(self, kind, msg_id, source, destination):
+        """Registra la trama como procesada; devuelve False si ya lo estaba."""
+        if self.duplicates.mark((kind, self.id_owner(kind, source, destination)), int(msg_id)):
+            return True
+        self.metrics.count(DUPLICATES)
+        return False
+
     def cache_cleaning(self):
-        for cmd in ["RREQ", "RREP","DATA","RESP"]:
-            self.query[cmd] = [i for i in self.query[cmd] if self.timestamp_message - int(i[0]) < self.CACHE_TIMEOUT]
+        now = time.time()
+        for neighbor in list(self.neighbor_times):
+            if now - self.neighbor_times[neighbor] >= self.NEIGHBOR_TIMEOUT:
+                self.mark_neighbor_lost(neighbor)
+                self.purge_link(self.node_id, neighbor)
+        for destination in list(self.routes):
+            if now - self.route_times.get(destination, 0) >= self.ROUTE_TIMEOUT:
+                self.remove_route(destination)
+        for gateway in list(self.gateways):
+            if now - self.gateways[gateway][1] >= self.GATEWAY_TIMEOUT:
+                self.log.info("%s dejó de escuchar al gateway %s", self.node_id, gateway)
+                del self.gateways[gateway]
+
+    def mark_neighbor_lost(self, neighbor):
+        """Da de baja a un vecino hasta que vuelva a escucharse su HELLO."""
+        self.log.info("%s perdió al vecino %s", self.node_id, neighbor)
+        self.neighbor_times.pop(neighbor, None)
+        self.neighbor_rssi.pop(neighbor, None)
+        self.neighbors.discard(neighbor)
+        self.lost_neighbors.add(neighbor)
+        if neighbor in self.reported_neighbors:
+            self.topology_changed()
+
+    def set_route(self, destination, route):
+        self.routes[destination] = route
+        self.route_times[destination] = time.time()
+
+    def remove_route(self, destination):
+        self.routes.pop(destination, None)
+        self.route_times.pop(destination, None)
+
+    def get_route(self, destination):
+        """Devuelve la ruta hacia destination si está en la caché y sigue fresca, o None."""
+        if destination not in self.routes:
+            return None
+        if time.time() - self.route_times.get(destination, 0) >= self.ROUTE_TIMEOUT:
+            self.remove_route(destination)
+            return None
+        return self.routes[destination]
+
+    def add_route(self, destination, route):
+        """Guarda una ruta aprendida si no había otra, si es más corta o si la anterior venció."""
+        if destination == self.node_id or self.node_id in route or destination in route:
+            return
+        if (route[0] if route else destination) in self.lost_neighbors:
+            # Caminos viejos que siguen circulando no deben revivir un enlace caído
+            return
+        current = self.get_route(destination)
+        if current is None or len(route) <= len(current):
+            self.set_route(destination, route)
+
+    def purge_link(self, node_a, node_b):
+        """
+        Elimina de la caché todas las rutas que atraviesan el enlace node_a - node_b (en cualquier sentido).
+        Un gateway que se queda sin ruta se olvida hasta su próximo anuncio: así se reenvían los de los demás.
+        """
+        for destination in list(self.routes):
+            path = [self.node_id] + self.routes[destination] + [destination]
+            for i in range(len(path) - 1):
+                if (path[i], path[i + 1]) in ((node_a, node_b), (node_b, node_a)):
+                    self.remove_route(destination)
+                    self.gateways.pop(destination, None)
+                    break
+
+    def learn_from_path(self, path):
+        """
+        Carga en la caché las subrutas que revela un camino completo (origen, intermedios, destino).
+        Si este nodo no pertenece al camino sólo aprende en modo promiscuo, a través de los vecinos que sí están en él.
+        """
+        if self.node_id in path:
+            anchors = [(path.index(self.node_id), [])]
+        elif self.promiscuous:
+            anchors = [(i, [node]) for i, node in enumerate(path) if node in self.neighbors]
+        else:
+            return
+        for position, prefix in anchors:
+            for i, node in enumerate(path):
+                if i > position:
+                    self.add_route(node, prefix + path[position + 1:i])
+                elif i < position:
+                    self.add_route(node, prefix + path[i + 1:position][::-1])
 
     def calculate_checksum(self, message):
-        message_bytes = message.encode('utf-8')
-        checksum = 0
-        for i in range(0, len(message_bytes), 2):
-            word = message_bytes[i]
-            if i + 1 < len(message_bytes):
-                word = (word << 8) + message_bytes[i + 1]
-            checksum += word
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
-        return ~checksum & 0xFFFF
+        """Checksum de CHECKSUM_MODE sobre un str o sobre bytes/memoryview."""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        return CHECKSUMS[self.CHECKSUM_MODE](message)
 
     def verify_checksum(self, message_with_checksum):
-        *message_parts, received_checksum = message_with_checksum.rsplit(":", 1)
-        message = ":".join(message_parts)
-        return int(received_checksum) == self.calculate_checksum(message)
+        try:
+            received_checksum = int(message_with_checksum[message_with_checksum.rfind(":") + 1:])
+        except ValueError:
+            return False
+        frame = message_with_checksum.encode('utf-8')
+        separator = frame.rfind(b":")
+        # Vista sin copiar la trama
+        return received_checksum == self.calculate_checksum(memoryview(frame)[:separator])
 
-    def send_hello(self):
+    def hello_message(self):
+        """HELLO con la hora de red actual; SlotScheduler lo arma de nuevo al transmitir."""
         hello_message = f"HELLO:{self.node_id}"
+        beacon = self.clock_sync.beacon()
+        if beacon is not None:
+            hello_message += f":{beacon[0]}:{beacon[1]}"
+        return hello_message
+
+    def send(self, payload):
+        """Transmite una trama por la radio (o la capa que la envuelve) y la cuenta en metrics."""
+        self.metrics.on_tx(payload)
+        self.lora.send(payload)
+
+    def send_hello(self):
         # print(f"{self.node_id} enviando mensaje HELLO")
-        self.lora.send(hello_message)
+        self.send(self.hello_message())
     
-    def send_response(self,destination,id_response, routelist):
-        temp = random.uniform(50,100)
-        humidity = random.uniform(0,100)
-        data_message_raw = f"RESP:{self.node_id}:{destination}:{id_response}:{routelist}:{temp},{humidity}"
+    def update_sensor(self, value):
+        """Guarda una lectura en el buffer circular de muestras con secuencia y timestamp."""
+        self.sample_seq += 1
+        if len(self.samples) >= self.SAMPLE_BUFFER:
+            self.samples.pop(0)
+        self.samples.append((self.sample_seq, self.timestamp_message, value))
+        if self.gateway is not None and self.push_on_change and (len(self.samples) < 2 or self.samples[-2][2] != value):
+            self.schedule_push(random.randint(0, self.PUSH_CHANGE_DELAY_MS))
+
+    def select_samples(self, since):
+        """Lecturas posteriores a since ("s{secuencia}" o "t{timestamp}"), hasta BATCH_MAX."""
+        key, threshold = (0 if since[0] == "s" else 1), int(since[1:])
+        selected = [sample for sample in self.samples if sample[key] > threshold]
+        return selected[:self.BATCH_MAX]
+
+    def encode_samples(self, samples, reference_seq=None):
+        """Lote de texto o, con sensor_schema, compacto y en diferencias con la lectura reference_seq."""
+        if self.sensor_schema is None:
+            return encode_batch(samples)
+        reference = None
+        for sample in self.samples:
+            if sample[0] == reference_seq:
+                reference = sample
+        return SensorCodec.encode_batch(self.sensor_schema, samples, reference)
+
+    def send_response(self, destination, id_response, routelist, since=None):
+        if since is not None:
+            samples = self.select_samples(since)
+            # El solicitante ya tiene la lectura s{n}: sirve de referencia para las diferencias
+            reference_seq = int(since[1:]) if since[0] == "s" else None
+            # Lote vacío: se informa la última secuencia para que el pedido siguiente siga desde ahí
+            sensor_data = self.encode_samples(samples, reference_seq) if samples else f"B{self.sample_seq + 1}@{self.timestamp_message}"
+        elif self.samples:
+            sensor_data = format_value(self.samples[-1][2])
+        else:
+            temp = random.uniform(50,100)
+            humidity = random.uniform(0,100)
+            sensor_data = f"{temp:.1f},{humidity:.1f}"
+        data_message_raw = f"RESP:{self.node_id}:{destination}:{id_response}:{routelist}:{sensor_data}"
+        if self.stats_piggyback and (self.stats_sent_at is None or time.time() - self.stats_sent_at >= self.stats_piggyback):
+            # Resumen de métricas para el gateway, como campo opcional antes del checksum
+            self.stats_sent_at = time.time()
+            data_message_raw += f":{self.metrics.encode(self.layer_counters())}"
         checksum = self.calculate_checksum(data_message_raw)
         data_message = f"{data_message_raw}:{checksum}"
-        self.lora.send(data_message)
+        self.forward_routed(data_message, self.node_id, destination, id_response, routelist.split("-") if routelist else [])
 
-    def broadcast_rreq(self, destination):
-        self.rreq_id = self.timestamp_message
-        rreq_message = f"RREQ:{self.node_id}:{destination}:{self.rreq_id}:"
-        self.query["RREQ"].append([str(self.rreq_id),self.node_id,destination])
-        self.lora.send(rreq_message)
+    def broadcast_rreq(self, destination, ttl=None):
+        if ttl is None:
+            if self.expanding_ring:
+                # Búsqueda en anillo expansivo: se empieza con el TTL más chico
+                ttl = self.RING_TTLS[0]
+                self.ring_search[destination] = [0, ticks_ms()]
+            else:
+                ttl = self.MAX_HOPS
+        rreq_id = self.next_seq()
+        rreq_message = f"RREQ:{self.node_id}:{destination}:{rreq_id}::{ttl}"
+        self.metrics.discovery_started(destination, ticks_ms())
+        self.mark_processed("RREQ", rreq_id, self.node_id, destination)
+        self.send(rreq_message)
+
+    def process_pending(self):
+        """Envía los RREQ (y anuncios GATE) cuyo retardo aleatorio venció, amplía las búsquedas en anillo sin respuesta y retransmite las tramas sin ACK."""
+        now = ticks_ms()
+        for key in list(self.pending_rreq):
+            start, delay, copies, message = self.pending_rreq[key]
+            if ticks_diff(now, start) >= delay:
+                del self.pending_rreq[key]
+                self.metrics.count(RELAYS)
+                self.send(message)
+
+        for key in list(self.ack_buffer):
+            entry = self.ack_buffer[key]
+            start, tries, payload, next_hop, source, destination, msg_id, routelist = entry
+            if ticks_diff(now, start) >= self.HOP_ACK_TIMEOUT_MS:
+                if tries < self.HOP_ACK_RETRIES:
+                    # Retransmisión local: sólo se repite el salto que falló
+                    entry[0] = now
+                    entry[1] += 1
+                    self.metrics.count(RETRIES)
+                    self.send(self.mark_hop(payload))
+                else:
+                    del self.ack_buffer[key]
+                    self.metrics.count(TIMEOUTS)
+                    self.mark_neighbor_lost(next_hop)
+                    self.handle_link_failure(payload, source, destination, msg_id, routelist, next_hop)
+
+        if self.push_due is not None and ticks_diff(now, self.push_due) >= 0:
+            self.push_telemetry()
+
+        if self.advert_due is not None and ticks_diff(now, self.advert_due) >= 0:
+            self.advertise_gateway()
+
+        if self.report_due is not None and ticks_diff(now, self.report_due) >= 0:
+            self.report_topology()
+
+        for destination in list(self.ring_search):
+            index, start = self.ring_search[destination]
+            ttl = self.RING_TTLS[index]
+            if ticks_diff(now, start) >= 2 * ttl * self.RING_HOP_TIMEOUT_MS:
+                index += 1
+                if index < len(self.RING_TTLS):
+                    self.ring_search[destination] = [index, now]
+                    self.broadcast_rreq(destination, self.RING_TTLS[index])
+                else:
+                    # Último intento: inundación completa de la red
+                    del self.ring_search[destination]
+                    self.broadcast_rreq(destination, self.MAX_HOPS)
+
+    def start_push(self, gateway, interval=0, on_change=False, ack=False):
+        """
+        Modo push: envía las lecturas nuevas a gateway cada interval segundos (con jitter)
+        y/o al cambiar la lectura, sin esperar un DATA. Con ack, las lecturas sin TACK se reenvían.
+        Con gateway=ANY_GATEWAY cada envío va al gateway más cercano de los que se anuncian.
+        """
+        self.gateway = gateway
+        self.push_interval = interval
+        self.push_on_change = on_change
+        self.push_ack = ack
+        if interval:
+            # Fase aleatoria: los esclavos encendidos juntos no transmiten a la vez
+            self.schedule_push(random.randint(0, interval * 1000))
+
+    def stop_push(self):
+        self.gateway = None
+        self.push_due = None
+
+    def schedule_push(self, delay_ms):
+        due = ticks_ms() + delay_ms
+        if self.push_due is None or ticks_diff(due, self.push_due) < 0:
+            self.push_due = due
+
+    def push_telemetry(self):
+        """Envía al gateway las lecturas posteriores a push_sent_seq y programa el envío siguiente."""
+        self.push_due = None
+        if self.push_interval:
+            jitter = random.randint(-self.PUSH_JITTER_MS, self.PUSH_JITTER_MS)
+            self.schedule_push(max(0, self.push_interval * 1000 + jitter))
+        samples = self.select_samples(f"s{self.push_sent_seq}")
+        gateway = self.choose_gateway(self.gateway)
+        if not samples or gateway is None:
+            return
+        route = self.get_route(gateway)
+        if route is None:
+            # La ruta al gateway se aprende una vez; mientras tanto las lecturas esperan en el buffer
+            self.broadcast_rreq(gateway)
+            return
+        self.push_target = gateway
+        # Las diferencias se calculan contra una lectura que el gateway tenga: la que él mismo confirmó
+        reference = self.push_sent_seq if self.push_ack and self.push_acked_by == gateway else None
+        tele_id = self.next_seq()
+        tele_raw = (f"TELE:{self.node_id}:{gateway}:{tele_id}:{'-'.join(route)}:"
+                    f"{1 if self.push_ack else 0}:{self.encode_samples(samples, reference)}")
+        if self.report_wanted(gateway):
+            # El informe de vecinos pendiente viaja en este TELE en lugar de un TOPO aparte
+            tele_raw += f":{self.neighbor_table()}"
+            self.mark_reported()
+        if not self.push_ack:
+            self.push_sent_seq = samples[-1][0]
+        self.log.debug("%s envía %d lecturas a %s", self.node_id, len(samples), gateway)
+        self.forward_routed(f"{tele_raw}:{self.calculate_checksum(tele_raw)}", self.node_id, gateway, tele_id, route)
+
+    def choose_gateway(self, gateway):
+        """
+        Destino de un envío a gateway: él mismo o, con ANY_GATEWAY, el anunciado con la ruta más
+        corta. El del último push se mantiene salvo que otro ahorre GATEWAY_SWITCH_HOPS saltos.
+        """
+        if gateway != self.ANY_GATEWAY:
+            return gateway
+        hops = {}
+        for gateway in self.gateways:
+            route = self.get_route(gateway)
+            if route is not None:
+                hops[gateway] = len(route)
+        if not hops:
+            # Sin ruta a ninguno: se descubre la del más cercano según su anuncio
+            return min(self.gateways, key=lambda g: (self.gateways[g][0], g)) if self.gateways else None
+        nearest = min(hops, key=lambda g: (hops[g], g))
+        if self.push_target in hops and hops[self.push_target] - hops[nearest] < self.GATEWAY_SWITCH_HOPS:
+            return self.push_target
+        return nearest
+
+    def start_reports(self, gateway, interval=600):
+        """
+        Informa la tabla de vecinos (con RSSI) a gateway tras cada cambio y al menos cada interval
+        segundos. Si a tiempo sale un TELE al mismo gateway, el informe viaja en él.
+        """
+        self.report_gateway = gateway
+        self.report_interval = interval
+        self.schedule_report(random.randint(0, self.REPORT_DELAY_MS))
+
+    def schedule_report(self, delay_ms):
+        due = ticks_ms() + delay_ms
+        if self.report_due is None or ticks_diff(due, self.report_due) < 0:
+            self.report_due = due
+
+    def topology_changed(self):
+        """Un vecino nuevo, perdido o con otro RSSI: el informe sale a lo sumo en REPORT_DELAY_MS."""
+        if self.report_gateway is not None:
+            self.schedule_report(self.REPORT_DELAY_MS)
+
+    def neighbor_table(self):
+        """Vecinos actuales con el RSSI redondeado a RSSI_STEP (encode_table)."""
+        step = self.RSSI_STEP
+        return encode_table({n: int(round(rssi / step)) * step for n, rssi in self.neighbor_rssi.items() if n in self.neighbors})
+
+    def report_wanted(self, gateway):
+        """True si el informe de vecinos vence dentro de REPORT_DELAY_MS y su destino es gateway."""
+        if self.report_due is None or not self.report_piggyback:
+            return False
+        if ticks_diff(self.report_due, ticks_ms()) > self.REPORT_DELAY_MS:
+            return False
+        return self.choose_gateway(self.report_gateway) == gateway
+
+    def mark_reported(self):
+        self.reported_neighbors = dict(self.neighbor_rssi)
+        self.report_due = ticks_ms() + self.report_interval * 1000
+
+    def report_topology(self):
+        """Envía la tabla de vecinos en un TOPO propio: ningún TELE la llevó a tiempo."""
+        self.report_due = None
+        gateway = self.choose_gateway(self.report_gateway)
+        route = self.get_route(gateway) if gateway is not None else None
+        if route is None:
+            if gateway is not None:
+                self.broadcast_rreq(gateway)
+            self.schedule_report(self.REPORT_DELAY_MS)
+            return
+        table = self.neighbor_table()
+        self.mark_reported()
+        topo_id = self.next_seq()
+        topo_raw = f"TOPO:{self.node_id}:{gateway}:{topo_id}:{'-'.join(route)}:{table}"
+        self.forward_routed(f"{topo_raw}:{self.calculate_checksum(topo_raw)}", self.node_id, gateway, topo_id, route)
+
+    def start_advertising(self, interval=60):
+        """(gateway) Se anuncia a la mesh cada interval segundos para los esclavos con ANY_GATEWAY."""
+        self.advert_interval = interval
+        self.advert_due = ticks_ms() + random.randint(0, self.ADVERT_JITTER_MS)
+
+    def advertise_gateway(self):
+        self.advert_due = None
+        if not self.advert_interval:
+            return
+        jitter = random.randint(-self.ADVERT_JITTER_MS, self.ADVERT_JITTER_MS)
+        self.advert_due = ticks_ms() + max(0, self.advert_interval * 1000 + jitter)
+        advert_id = self.next_seq()
+        self.mark_processed("GATE", advert_id, self.node_id, None)
+        self.send(f"GATE:{self.node_id}:{advert_id}::{self.MAX_HOPS}")
+
+    def reading_marks(self):
+        """(gateway) Última secuencia guardada de cada nodo, para los demás gateways."""
+        return {source: stored[-1][0] for source, stored in self.readings.items() if stored}
+
+    def merge_marks(self, marks):
+        """(gateway) Incorpora las marcas de otro gateway: sus lecturas ya guardadas no se vuelven a guardar."""
+        for source, seq in marks.items():
+            if seq > self.peer_marks.get(source, 0):
+                self.peer_marks[source] = seq
 
     def send_rrep(self, destination,id_message,routes):
         # print(f"{self.node_id} envia RREP a {destination}: {id_message}: {'-'.join(routes)}")
         rrep_message = f"RREP:{self.node_id}:{destination}:{id_message}:{'-'.join(routes)}"
-        self.query["RREP"].append([id_message, self.node_id, destination])
-        self.lora.send(rrep_message)
+        self.mark_processed("RREP", id_message, self.node_id, destination)
+        self.send(rrep_message)
     
-    def request_data(self, destination):
-        if destination in self.routes.keys():
-            print(f"{self.node_id} enviando solicitud de datos a {destination} a través de la ruta {self.routes[destination]}")
-            data_message = f"DATA:{self.node_id}:{destination}:{self.timestamp_message}:{'-'.join(self.routes[destination])}"
-            self.query["DATA"].append([str(self.timestamp_message), self.node_id, destination])
-            self.lora.send(data_message)
+    def request_data(self, destination, since=None):
+        """Pide la lectura actual de destination o, con since, las lecturas posteriores en un lote."""
+        route = self.get_route(destination)
+        if route is not None:
+            self.log.info("%s enviando solicitud de datos a %s a través de la ruta %s", self.node_id, destination, route)
+            self.request_id = self.next_seq()
+            data_message = f"DATA:{self.node_id}:{destination}:{self.request_id}:{'-'.join(route)}"
+            if since is not None:
+                data_message += f":{since}"
+            self.mark_processed("DATA", self.request_id, self.node_id, destination)
             self.waiting_response = True
             # Almacenar detalles para el temporizador
             self.response_timer = time.time()
             self.attempts = 1
             self.sent_message = data_message
+            self.forward_routed(data_message, self.node_id, destination, self.request_id, route)
         else:
-            print(f"{self.node_id} no se puede enviar DATA a {destination} porque no hay ruta disponible.")
+            self.log.warning("%s no se puede enviar DATA a %s porque no hay ruta disponible.", self.node_id, destination)
             self.broadcast_rreq(destination)
 
+    def request_samples(self, destination):
+        """Pide a destination las lecturas posteriores a la última recibida de ese nodo."""
+        received = self.readings.get(destination)
+        self.request_data(destination, since=f"s{received[-1][0] if received else 0}")
+
     def waiting_for_response(self):
         if self.waiting_response:
             current_time = time.time()
@@ -120,198 +579,549 @@ class DSRNode:
             
             if time_elapsed >= self.RETRY_INTERVAL and self.attempts < self.MAX_ATTEMPTS:
                 self.response_timer = current_time
-                _, resource, redestination, redata_id, reroutelist = self.sent_message.split(":")
-                self.query["DATA"][-1][0] = str(self.timestamp_message)
-                data_message = f"DATA:{resource}:{redestination}:{self.timestamp_message}:{'-'.join(self.routes[redestination])}"
-                self.lora.send(data_message)
+                self.metrics.count(RETRIES)
+                self.resend_data_request()
                 self.attempts += 1
-                print(f"{self.node_id} reenviando mensaje de solicitud de datos {self.query['DATA'][-1][0]}")
-            
-            # Verificar si se ha recibido un paquete
-            if self.lora.is_packet_received():
-                message = self.lora.get_packet(rssi=True)
-                # print(f"{self.node_id} recibió mensaje: {message}")
-                if message.get('payload').startswith("RESP"):
-                    if self.verify_checksum(message.get('payload')):
-                        sequence, source, destination, data_id, routelist, sensors_data, checksum = message.get('payload').split(":")
-                        if destination == self.node_id and data_id == self.query["DATA"][-1][0]:
-                            if not [data_id, source, destination] in self.query["RESP"]:
-                                self.query["RESP"].append([data_id, source, destination])
-                                print(f"{self.node_id} recibió respuesta de la petición {data_id} con los datos {sensors_data}")
-                                self.waiting_response = False
-                    else:
-                        print(f"{self.node_id} no recibió un checksum correcto")
+                self.log.info("%s reenviando mensaje de solicitud de datos %s", self.node_id, self.request_id)
             
-            elif time_elapsed > self.TIMEOUT:
-                print(f"{self.node_id} no recibió respuesta para la petición {self.query['DATA'][-1][0]} por lo tanto la ruta está caída")
+            if time_elapsed > self.TIMEOUT:
+                self.log.warning("%s no recibió respuesta para la petición %s por lo tanto la ruta está caída", self.node_id, self.request_id)
                 self.waiting_response = False
-                try:
-                    self.routes.pop(self.query["DATA"][0][2])
-                except:
-                    pass
-                print(self.routes)
+                self.metrics.count(TIMEOUTS)
+                self.remove_route(self.sent_message.split(":")[2])
+                self.log.debug("Rutas: %s", dict(self.routes))
+
+    def resend_data_request(self):
+        """
+        Reenvía la solicitud DATA pendiente con un ID nuevo por la ruta actual.
+        Si ya no hay ruta, inicia un descubrimiento y la reenvía al llegar el RREP.
+        """
+        parts = self.sent_message.split(":")
+        _, resource, destination, _, routelist = parts[:5]
+        since = f":{parts[5]}" if len(parts) > 5 else ""
+        route = self.get_route(destination)
+        if route is None:
+            self.recovering = destination
+            self.broadcast_rreq(destination)
+            return
+        # ID nuevo: los relays descartan como duplicado un ID ya reenviado
+        self.request_id = self.next_seq()
+        self.mark_processed("DATA", self.request_id, resource, destination)
+        self.sent_message = f"DATA:{resource}:{destination}:{self.request_id}:{'-'.join(route)}{since}"
+        self.forward_routed(self.sent_message, resource, destination, self.request_id, route)
+
+    def forward_routed(self, payload, source, destination, msg_id, routelist):
+        """
+        Transmite una trama con ruta de origen; si el siguiente salto es un vecino vencido, trata el enlace como caído.
+        Con hop_ack activo la trama queda retenida hasta que el siguiente salto confirme la recepción.
+        """
+        path = [source] + routelist + [destination]
+        next_hop = path[path.index(self.node_id) + 1]
+        if next_hop in self.lost_neighbors:
+            self.handle_link_failure(payload, source, destination, msg_id, routelist, next_hop)
+            return
+        if source != self.node_id:
+            self.metrics.count(RELAYS)
+        self.send(self.mark_hop(payload))
+        if self.hop_ack:
+            if len(self.ack_buffer) >= self.HOP_ACK_BUFFER:
+                # Buffer lleno: se descarta la trama más antigua (queda el reintento extremo a extremo)
+                oldest = min(self.ack_buffer, key=lambda k: self.ack_buffer[k][0])
+                del self.ack_buffer[oldest]
+            key = (payload.split(":", 1)[0], msg_id, source)
+            self.ack_buffer[key] = [ticks_ms(), 0, payload, next_hop, source, destination, msg_id, routelist]
+
+    def mark_hop(self, payload):
+        """Con ACK pasivo agrega a la trama quién la transmite (HOP_MARK), para que el salto anterior reconozca el reenvío."""
+        if self.hop_ack == "passive":
+            return f"{payload}{HOP_MARK}{self.node_id}"
+        return payload
+
+    def acknowledge_hop(self, message):
+        """
+        Confirma al salto anterior la recepción de una trama DATA/RESP.
+        En modo "explicit" se confirma cada copia recibida, también los duplicados.
+        En modo "passive" el reenvío del siguiente salto hace de ACK; sólo se envía ACK explícito
+        desde el destino, ante un duplicado (el salto anterior no escuchó nuestro reenvío) o si
+        el reenvío sale fragmentado (FragmentLink sólo lo reensambla el siguiente salto).
+        """
+        kind, msg_id, source, destination, routelist = message.kind, message.msg_id, message.source, message.destination, message.route
+        key = (kind, msg_id, source)
+        entry = self.ack_buffer.get(key)
+        if self.hop_ack == "passive" and entry is not None and message.hop == entry[3]:
+            # Copia de una trama retenida transmitida por el siguiente salto: ya la reenvió (ACK pasivo).
+            # La misma copia desde el salto anterior es un reintento suyo y sigue al ACK explícito
+            del self.ack_buffer[key]
+            return
+        path = [source] + routelist + [destination]
+        if self.node_id not in path[1:]:
+            return
+        previous_hop = path[path.index(self.node_id) - 1]
+        duplicate = self.is_duplicate(kind, msg_id, source, destination)
+        fragmented = len(message.raw) + len(HOP_MARK) + len(self.node_id) > self.FRAME_MTU
+        if self.hop_ack == "explicit" or destination == self.node_id or duplicate or fragmented:
+            self.send(f"ACK:{self.node_id}:{previous_hop}:{kind}:{msg_id}:{source}")
+
+    def handle_link_failure(self, payload, source, destination, msg_id, routelist, next_hop):
+        """
+        Ante un enlace caído hacia next_hop: purga las rutas que lo usan, avisa al origen con un RERR
+        y trata de rescatar la trama por otra ruta de la caché.
+        """
+        self.log.warning("%s no puede reenviar a %s: enlace caído", self.node_id, next_hop)
+        self.purge_link(self.node_id, next_hop)
+        traversed = routelist[:routelist.index(self.node_id)] if self.node_id in routelist else []
+        if source != self.node_id:
+            self.send_rerr(source, traversed[::-1], next_hop)
+        if not self.salvage(payload, source, destination, traversed) and source == self.node_id and payload.startswith("DATA"):
+            self.resend_data_request()
+
+    def salvage(self, payload, source, destination, traversed):
+        """Reenvía la trama por una ruta alternativa hacia destination, reescribiendo su ruta de origen."""
+        alternative = self.get_route(destination)
+        if alternative is None:
+            return False
+        new_route = traversed + ([self.node_id] if source != self.node_id else []) + alternative
+        if len(set(new_route)) != len(new_route) or source in new_route or destination in new_route:
+            return False
+        if (alternative[0] if alternative else destination) in self.lost_neighbors:
+            return False
+        parts = payload.split(":")
+        parts[4] = '-'.join(new_route)
+        if parts[0] in ("RESP", "TELE", "TOPO"):
+            # La ruta forma parte del checksum
+            parts[-1] = str(self.calculate_checksum(":".join(parts[:-1])))
+        self.log.info("%s rescata la trama %s por la ruta %s", self.node_id, parts[3], new_route)
+        self.forward_routed(":".join(parts), source, destination, parts[3], new_route)
+        return True
+
+    def send_rerr(self, destination, routelist, unreachable):
+        """Envía un RERR al origen de la trama indicando el enlace caído entre este nodo y unreachable."""
+        err_id = self.next_seq()
+        rerr_message = f"RERR:{self.node_id}:{destination}:{err_id}:{'-'.join(routelist)}:{self.node_id}-{unreachable}"
+        self.mark_processed("RERR", err_id, self.node_id, destination)
+        self.send(rerr_message)
+
+    def decode_packet(self, packet):
+        """Decodifica un paquete de la radio; las tramas inválidas sólo suman al contador de su tipo."""
+        payload, hop = split_hop(packet.get('payload', ''))
+        try:
+            message = decode(payload, packet.get('rssi'))
+            message.rx_ms = packet.get('rx_ms')
+            message.hop = hop
+            return message
+        except (ValueError, IndexError):
+            kind = payload.split(":", 1)[0]
+            # Las claves se limitan a los tipos conocidos: el ruido no debe hacer crecer el diccionario
+            kind = kind if kind in self.handlers else "?"
+            self.parse_errors[kind] = self.parse_errors.get(kind, 0) + 1
+            self.metrics.count(PARSE_ERRORS)
+            return None
+
+    def dispatch(self, message):
+        """Entrega la trama al manejador de su tipo."""
+        self.handlers[message.kind](message)
+
+    def subscribe(self, name, kinds, callback):
+        """Registra callback(message) para las tramas de los tipos indicados (None recibe todas)."""
+        self.subscribers.append([name, kinds, callback, 0])
+
+    def delivery_counts(self):
+        """Tramas entregadas a cada suscriptor."""
+        return {name: delivered for name, _, _, delivered in self.subscribers}
+
+    def pump(self):
+        """
+        Único punto de lectura de la radio: vacía la cola de recepción (hasta RX_BURST tramas)
+        y entrega cada trama a todos los suscriptores de su tipo. Devuelve las tramas leídas.
+        """
+        handled = 0
+        while handled < self.RX_BURST and self.lora.is_packet_received():
+            packet = self.lora.get_packet(rssi=True)
+            if packet is None:
+                break
+            handled += 1
+            message = self.decode_packet(packet)
+            if message is None:
+                continue
+            started = ticks_us()
+            for subscriber in self.subscribers:
+                if subscriber[1] is None or message.kind in subscriber[1]:
+                    subscriber[3] += 1
+                    try:
+                        subscriber[2](message)
+                    except Exception as e:
+                        self.metrics.count(HANDLER_ERRORS)
+                        self.log.error("Error en %s procesando %s: %s", subscriber[0], message.kind, e)
+            self.metrics.on_rx(message.kind, ticks_diff(ticks_us(), started))
+        return handled
 
     def receive_message(self):
-        """Escucha la red y procesa los mensajes recibidos según el tipo de mensaje (HELLO, RREQ, RREP, DATA)."""
+        """Atiende los temporizadores del protocolo y reparte las tramas recibidas entre los suscriptores."""
         try:
-            if self.lora.is_packet_received():
-                message = self.lora.get_packet(rssi=True)
-                # print(f"{self.node_id} recibió mensaje: {message}")
-                # Procesar diferentes tipos de mensajes
-                payload = message.get('payload', '')
-                if payload.startswith("HELLO"):
-                    self.process_hello(message)
-                elif payload.startswith("RREQ"):
-                    self.process_rreq(message)
-                elif payload.startswith("RREP"):
-                    self.process_rrep(payload)
-                elif payload.startswith("DATA"):
-                    self.process_data(message)
-                elif payload.startswith("RESP"):
-                    self.process_response(message)
+            self.process_pending()
+            self.pump()
         except Exception as e:
-            print(f"Error al recibir mensaje: {e}")
+            self.log.error("Error al recibir mensaje: %s", e)
 
 
     def process_hello(self, message):
         """Procesa un mensaje HELLO recibido y agrega al nodo a la lista de vecinos"""
-        try:
-            _, neighbor_id = message.get("payload").split(":")
-            if neighbor_id != self.node_id and int(message.get("rssi")) > self.quality_neighbor:
-                if neighbor_id not in self.neighbors:
-                    print(message)
-                    self.neighbors.add(neighbor_id)
-                    print(f"{self.node_id} descubrió al vecino {neighbor_id}")
-        except Exception as e:
-            print(f"Error procesando HELLO: {e}")
+        neighbor_id = message.source
+        if neighbor_id != self.node_id and message.rssi is not None and int(message.rssi) > self.quality_neighbor:
+            self.neighbor_times[neighbor_id] = time.time()
+            self.neighbor_rssi[neighbor_id] = int(message.rssi)
+            reported = self.reported_neighbors.get(neighbor_id)
+            if reported is None or abs(int(message.rssi) - reported) >= self.RSSI_STEP:
+                self.topology_changed()
+            self.lost_neighbors.discard(neighbor_id)
+            if neighbor_id not in self.neighbors:
+                self.log.debug("%s", message)
+                self.neighbors.add(neighbor_id)
+                self.log.info("%s descubrió al vecino %s", self.node_id, neighbor_id)
+            if message.extra is not None:
+                rx_ms = message.rx_ms if message.rx_ms is not None else self.clock_sync.ticks()
+                self.clock_sync.on_beacon(neighbor_id, message.extra[0], message.extra[1], rx_ms, len(message.raw))
     
     def process_rreq(self, message):
-        try:
-            print(message)
-            sequence, source, destination, rreq_id, routelist = self.extract_message_data(message)
-            if not routelist:
-                self.process_empty_routelist(sequence, source, destination, rreq_id)
-            else:
-                self.process_non_empty_routelist(sequence, source, destination, rreq_id, routelist)
-        
-        except Exception as e:
-            print(f"Error procesando RREQ: {e}")
-
-    def extract_message_data(self, message):
-        sequence, source, destination, rreq_id, route = message.get('payload').split(":")
-        routelist = route.split("-") if route else []
-        return sequence, source, destination, rreq_id, routelist
+        self.log.debug("%s", message)
+        sequence, source, destination, rreq_id, routelist = message.kind, message.source, message.destination, message.msg_id, message.route
+        ttl = message.ttl if message.ttl is not None else self.MAX_HOPS
+        # El último nodo de la lista (o el origen) es quien transmitió este RREQ
+        last_hop = routelist[-1] if routelist else source
+        if last_hop in self.neighbors and self.node_id not in routelist:
+            self.learn_from_path([source] + routelist + [self.node_id])
+        key = (rreq_id, source, destination)
+        if key in self.pending_rreq:
+            # Supresión por contador: otra copia escuchada del RREQ pendiente
+            self.pending_rreq[key][2] += 1
+            if self.pending_rreq[key][2] >= self.RREQ_SUPPRESS_COPIES:
+                del self.pending_rreq[key]
+                self.log.debug("%s cancela el reenvío del RREQ %s", self.node_id, rreq_id)
+            return
+        if not routelist:
+            self.process_empty_routelist(sequence, source, destination, rreq_id, ttl)
+        else:
+            self.process_non_empty_routelist(sequence, source, destination, rreq_id, routelist, ttl)
 
-    def process_empty_routelist(self, sequence, source, destination, rreq_id):
+    def process_empty_routelist(self, sequence, source, destination, rreq_id, ttl):
         if source in self.neighbors:
             if destination == self.node_id:
-                print(f"Yo {self.node_id} soy el destino, enviando RREP a {source}")
+                self.log.debug("Yo %s soy el destino, enviando RREP a %s", self.node_id, source)
                 self.send_rrep_with_routelist(source, rreq_id, [])
-            else:
-                self.relay_rreq_if_needed(sequence, source, destination, rreq_id, [])
+            elif not self.reply_rreq_from_cache(source, destination, rreq_id, []):
+                self.relay_rreq_if_needed(sequence, source, destination, rreq_id, [], ttl)
 
-    def process_non_empty_routelist(self, sequence, source, destination, rreq_id, routelist):
+    def process_non_empty_routelist(self, sequence, source, destination, rreq_id, routelist, ttl):
         if routelist[-1] in self.neighbors:
             if destination == self.node_id:
-                print(f"Yo {self.node_id} soy el destino, enviando RREP a {source}")
+                self.log.debug("Yo %s soy el destino, enviando RREP a %s", self.node_id, source)
                 self.send_rrep_with_routelist(source, rreq_id, routelist)
-            else:
-                self.relay_rreq_if_needed(sequence, source, destination, rreq_id, routelist)
+            elif not self.reply_rreq_from_cache(source, destination, rreq_id, routelist):
+                self.relay_rreq_if_needed(sequence, source, destination, rreq_id, routelist, ttl)
         else:
             pass
             # print(f"El mensaje RREQ no fue recibido por una fuente conocida")
 
     def send_rrep_with_routelist(self, source, rreq_id, routelist):
         routelist.reverse()
-        self.query["RREQ"].append([rreq_id, source, self.node_id])
+        self.mark_processed("RREQ", rreq_id, source, self.node_id)
         self.send_rrep(source, rreq_id, routelist)
 
-    def relay_rreq_if_needed(self, sequence, source, destination, rreq_id, routelist):
-        if not [rreq_id, source, destination] in self.query["RREQ"]:
+    def reply_rreq_from_cache(self, source, destination, rreq_id, routelist):
+        """
+        Responde un RREQ en nombre del destino si hay una ruta fresca hacia él en la caché.
+        La ruta anunciada es la recorrida por el RREQ, este nodo y la ruta cacheada; devuelve True si se respondió.
+        """
+        if not self.reply_from_cache or self.is_duplicate("RREQ", rreq_id, source, destination):
+            return False
+        cached = self.get_route(destination)
+        if cached is None or time.time() - self.route_times[destination] > self.CACHED_REPLY_MAX_AGE:
+            return False
+        full_route = routelist + [self.node_id] + cached
+        # Sin bucles: ningún nodo repetido y ni el origen ni el destino como intermedios
+        if len(set(full_route)) != len(full_route) or source in full_route or destination in full_route:
+            return False
+        if len(full_route) + 1 > self.MAX_HOPS:
+            return False
+        self.mark_processed("RREQ", rreq_id, source, destination)
+        self.mark_processed("RREP", rreq_id, destination, source)
+        full_route.reverse()
+        # El último campo identifica a quien responde: los nodos anteriores a él en la ruta no reenvían
+        rrep_message = f"RREP:{destination}:{source}:{rreq_id}:{'-'.join(full_route)}:{self.node_id}"
+        self.log.debug("%s responde desde la caché el RREQ %s hacia %s", self.node_id, rreq_id, destination)
+        self.send(rrep_message)
+        return True
+
+    def relay_rreq_if_needed(self, sequence, source, destination, rreq_id, routelist, ttl):
+        if self.mark_processed("RREQ", rreq_id, source, destination):
+            # El RREQ recibido ya recorrió len(routelist) + 1 saltos
+            if len(routelist) + 1 >= ttl:
+                return
             routelist.append(self.node_id)
-            finalmessage = f"{sequence}:{source}:{destination}:{rreq_id}:{'-'.join(routelist)}"
+            finalmessage = f"{sequence}:{source}:{destination}:{rreq_id}:{'-'.join(routelist)}:{ttl}"
             # print(f"Nodo intermedio: {self.node_id} reenvía RREQ: {finalmessage}")
-            self.query["RREQ"].append([rreq_id, source, destination])
-            self.lora.send(finalmessage)
+            # El reenvío se difiere un tiempo aleatorio para que los vecinos no transmitan a la vez
+            delay = random.randint(0, self.RREQ_JITTER_MS)
+            self.pending_rreq[(rreq_id, source, destination)] = [ticks_ms(), delay, 1, finalmessage]
     
     def process_rrep(self, message):
-        try:
-            print(message)
-            _, source, destination, rrep_id, route = message.split(":")
-            routelist = route[0].split("-") if route else []
+        self.log.debug("%s", message)
+        source, destination, rrep_id, routelist, replier = message.source, message.destination, message.msg_id, message.route, message.extra
+        self.learn_from_path([source] + routelist + [destination])
 
-            if destination == self.node_id:
-                if not [rrep_id, source, destination] in self.query["RREP"]:
-                    self.query["RREP"].append([rrep_id, source, destination])
-                    routelist.reverse()
-                    print(f"Mensaje recibido de la petición {rrep_id}. La ruta hacia {source} es {routelist}")
-                    self.routes[source] = routelist
+        if destination == self.node_id:
+            if self.mark_processed("RREP", rrep_id, source, destination):
+                self.ring_search.pop(source, None)
+                self.metrics.discovery_done(source, ticks_ms())
+                routelist.reverse()
+                self.log.info("Mensaje recibido de la petición %s. La ruta hacia %s es %s", rrep_id, source, routelist)
+                self.set_route(source, routelist)
+                if self.waiting_response and self.recovering == source:
+                    self.recovering = None
+                    self.response_timer = time.time()
+                    self.resend_data_request()
 
-            else:
-                # Nodo intermedio, reenviar RREP si no fue procesado ya
-                if self.node_id in routelist:
-                    if not [rrep_id, source, destination] in self.query["RREP"]:
-                        print(f"Nodo de camino inverso: {self.node_id} reenvía RREP: {message}")
-                        self.query["RREP"].append([rrep_id, source, destination])
-                        self.lora.send(message)
-                    else:
-                        print("Mensaje ya reenviado")
+        else:
+            # Nodo intermedio, reenviar RREP si no fue procesado ya.
+            # En una respuesta desde la caché sólo reenvían los nodos posteriores a quien respondió
+            start = routelist.index(replier) + 1 if replier in routelist else 0
+            if self.node_id in routelist[start:]:
+                if self.mark_processed("RREP", rrep_id, source, destination):
+                    self.log.debug("Nodo de camino inverso: %s reenvía RREP: %s", self.node_id, message.raw)
+                    self.metrics.count(RELAYS)
+                    self.send(message.raw)
                 else:
-                    pass
-        except Exception as e:
-            print(f"Error procesando RREP: {e}")
+                    self.log.debug("Mensaje ya reenviado")
+            else:
+                pass
     
     def process_data(self, message):
         """Procesa un mensaje DATA recibido """
-        try:
-            print(message)
-            _, source, destination, data_id, *routelist = message.get('payload').split(':')
-            if destination == self.node_id:
-                if not [data_id, source, destination] in self.query["DATA"]:
-                    self.query["DATA"].append([data_id, source, destination])
-                    ruta = routelist[0].split("-")
-                    ruta.reverse()
-                    de_ruta = '-'.join(ruta)
-                    self.routes[source] = ruta
-                    self.send_response(source, data_id, de_ruta)
+        self.log.debug("%s", message)
+        source, destination, data_id, routelist = message.source, message.destination, message.msg_id, message.route
+        self.learn_from_path([source] + routelist + [destination])
+        if self.hop_ack:
+            self.acknowledge_hop(message)
+        if destination == self.node_id:
+            if self.mark_processed("DATA", data_id, source, destination):
+                ruta = routelist[::-1]
+                de_ruta = '-'.join(ruta)
+                self.send_response(source, data_id, de_ruta, message.extra)
 
-            else:
-                if self.node_id in routelist:
-                    if not [data_id, source, destination] in self.query["DATA"]:
-                        print(f"Nodo de transicion: {self.node_id} reenvía DATA: {message.get('payload')}")
-                        self.query["DATA"].append([data_id, source, destination])
-                        self.lora.send(message.get('payload'))
-                    else:
-                        print("Mensaje ya reenviado")
+        else:
+            if self.node_id in routelist:
+                if self.mark_processed("DATA", data_id, source, destination):
+                    self.log.debug("Nodo de transicion: %s reenvía DATA: %s", self.node_id, message.raw)
+                    self.forward_routed(message.raw, source, destination, data_id, routelist)
                 else:
-                    pass
-        except Exception as e:
-            print(f"Error procesando RREP: {e}")
+                    self.log.debug("Mensaje ya reenviado")
+            else:
+                pass
 
     def process_response(self, message):
         """Procesa un mensaje RESP recibido """
-        try:
-            _, source, destination, data_id, routelist, sensors, checksum = message.get('payload').split(":")
-            routelist = routelist.split("-")
-            if not destination == self.node_id:
-                if self.node_id in routelist:
-                    if not [data_id, source, destination] in self.query["RESP"]:
-                        self.query["RESP"].append([data_id, source, destination])
-                        self.lora.send(message.get('payload'))
-                        print(f"Nodo de transicion: {self.node_id} reenvía RESP: {message.get('payload')}")
-                    else:
-                        pass             
-                else:
-                    pass
-            elif destination == self.node_id:
-                if self.verify_checksum(message.get('payload')):
-                    sequence, source, destination, data_id, routelist, sensors_data, checksum = message.get('payload').split(":")
-                    if destination == self.node_id and data_id == self.query["DATA"][-1][0]:
-                        if not [data_id, source, destination] in self.query["RESP"]:
-                            self.query["RESP"].append([data_id, source, destination])
-                            print(f"{self.node_id} recibió respuesta de la petición {data_id} con los datos {sensors_data}")
-                            self.waiting_response = False
+        source, destination, data_id, routelist = message.source, message.destination, message.msg_id, message.route
+        self.learn_from_path([source] + routelist + [destination])
+        if self.hop_ack:
+            self.acknowledge_hop(message)
+        if not destination == self.node_id:
+            if self.node_id in routelist:
+                if self.mark_processed("RESP", data_id, source, destination):
+                    self.forward_routed(message.raw, source, destination, data_id, routelist)
+                    self.log.debug("Nodo de transicion: %s reenvía RESP: %s", self.node_id, message.raw)
                 else:
-                    print(f"{self.node_id} no recibió un checksum correcto")
-        except Exception as e:
-            print(f"Error procesando RESP: {e}")
+                    pass             
+            else:
+                pass
+
+    def complete_request(self, message):
+        """Suscriptor de la solicitud pendiente: cierra la espera al llegar su RESP y lo entrega a on_response."""
+        if message.destination != self.node_id:
+            return
+        source, destination, data_id = message.source, message.destination, message.msg_id
+        if self.verify_checksum(message.raw):
+            if data_id == self.request_id:
+                if self.mark_processed("RESP", data_id, source, destination):
+                    self.log.info("%s recibió respuesta de la petición %s con los datos %s", self.node_id, data_id, message.extra)
+                    self.waiting_response = False
+                    self.remember_reading(source, message.extra)
+                    if message.stats is not None:
+                        self.remember_stats(source, message.stats)
+                    if self.on_response is not None:
+                        self.on_response(message)
+        else:
+            self.metrics.count(CHECKSUM_ERRORS)
+            self.log.warning("%s no recibió un checksum correcto", self.node_id)
+
+    def remember_stats(self, source, text):
+        try:
+            self.peer_stats[source] = (self.timestamp_message, decode_summary(text))
+        except ValueError:
+            self.log.warning("%s recibió métricas inválidas de %s: %s", self.node_id, source, text)
+
+    def layer_counters(self):
+        """Contadores de las capas bajo el nodo: tramas perdidas por cola de recepción o de transmisión llena."""
+        radio = self.lora
+        tx_dropped = 0
+        # Cada envoltura (SlotLink, cola de NodeRuntime, FragmentLink) guarda la siguiente en .radio;
+        # se leen los atributos propios: getattr delegaría en la capa de abajo y contaría dos veces
+        while radio is not None:
+            own = getattr(radio, "__dict__", {})
+            tx_dropped += own.get("dropped", 0)
+            radio = own.get("radio")
+        return {"rx_overflows": getattr(self.lora, "rx_dropped", 0), "tx_overflows": tx_dropped}
+
+    def stats(self):
+        """Métricas del nodo para MQTT/HTTP (NodeMetrics.snapshot), con los resúmenes recibidos de otros nodos."""
+        snapshot = self.metrics.snapshot(self.layer_counters())
+        snapshot["node"] = self.node_id
+        if self.peer_stats:
+            snapshot["peers"] = {source: {"at": at, **summary} for source, (at, summary) in self.peer_stats.items()}
+        return snapshot
+
+    def remember_reading(self, source, sensor_data):
+        """Guarda el lote en readings y la lectura más nueva de source en latest."""
+        if sensor_data[:1] in ("B", "C"):
+            self.store_batch(source, sensor_data)
+            stored = self.readings.get(source)
+            if not stored:
+                return
+            value = stored[-1][2]
+        else:
+            value = sensor_data
+        self.latest[source] = (self.timestamp_message, value)
+
+    def store_batch(self, source, sensor_data):
+        """Agrega a readings las lecturas nuevas de un RESP por lote."""
+        stored = self.readings.setdefault(source, [])
+        if sensor_data.startswith("C"):
+            def reference(seq):
+                for sample in stored:
+                    if sample[0] == seq:
+                        return sample[2]
+            try:
+                samples = SensorCodec.decode_batch(sensor_data, reference)
+            except ValueError as e:
+                self.log.warning("%s no pudo decodificar el lote de %s: %s", self.node_id, source, e)
+                return
+        else:
+            samples = decode_batch(sensor_data)
+        if not samples:
+            return
+        last_seq = stored[-1][0] if stored else 0
+        fresh = [sample for sample in samples if sample[0] > last_seq]
+        # Lo que otro gateway ya guardó (el esclavo cambió de gateway antes de recibir el TACK) se descarta
+        peer_seq = self.peer_marks.get(source, 0)
+        new = [sample for sample in fresh if sample[0] > peer_seq]
+        self.duplicate_readings += len(fresh) - len(new)
+        stored.extend(new)
+        del stored[:-self.READINGS_KEEP]
+
+    def process_telemetry(self, message):
+        """Procesa un TELE: el gateway guarda las lecturas y, si se le pide, confirma con un TACK; los nodos de la ruta lo reenvían."""
+        source, destination, tele_id, routelist = message.source, message.destination, message.msg_id, message.route
+        self.learn_from_path([source] + routelist + [destination])
+        if self.hop_ack:
+            self.acknowledge_hop(message)
+        if self.is_duplicate("TELE", tele_id, source, destination):
+            self.metrics.count(DUPLICATES)
+            return
+        if destination == self.node_id:
+            if not self.verify_checksum(message.raw):
+                self.metrics.count(CHECKSUM_ERRORS)
+                self.log.warning("%s no recibió un checksum correcto", self.node_id)
+                return
+            wants_ack, sensor_data = message.extra[:2]
+            self.mark_processed("TELE", tele_id, source, destination)
+            self.remember_reading(source, sensor_data)
+            self.log.debug("%s recibió telemetría de %s: %s", self.node_id, source, sensor_data)
+            if wants_ack:
+                # Última secuencia guardada (aquí o en otro gateway): si el lote no se pudo decodificar, el esclavo reenvía desde ahí
+                stored = self.readings.get(source)
+                held = stored[-1][0] if stored else 0
+                confirmed = max(held, self.peer_marks.get(source, 0))
+                route = routelist[::-1]
+                tack = f"TACK:{self.node_id}:{source}:{tele_id}:{'-'.join(route)}:{confirmed}"
+                if confirmed != held:
+                    # Esa lectura sólo la tiene otro gateway: el esclavo no debe usarla de referencia
+                    tack += ":0"
+                self.forward_routed(tack, self.node_id, source, tele_id, route)
+        elif self.node_id in routelist:
+            self.mark_processed("TELE", tele_id, source, destination)
+            self.forward_routed(message.raw, source, destination, tele_id, routelist)
+
+    def process_topology(self, message):
+        """Procesa un TOPO: los nodos de la ruta lo reenvían; en el gateway lo toma TopologyGraph."""
+        source, destination, topo_id, routelist = message.source, message.destination, message.msg_id, message.route
+        self.learn_from_path([source] + routelist + [destination])
+        if self.hop_ack:
+            self.acknowledge_hop(message)
+        if not self.mark_processed("TOPO", topo_id, source, destination):
+            return
+        if destination != self.node_id and self.node_id in routelist:
+            self.forward_routed(message.raw, source, destination, topo_id, routelist)
+
+    def process_tack(self, message):
+        """Procesa un TACK: el esclavo da por entregadas sus lecturas hasta la secuencia confirmada."""
+        source, destination, tack_id, routelist = message.source, message.destination, message.msg_id, message.route
+        self.learn_from_path([source] + routelist + [destination])
+        if self.hop_ack:
+            self.acknowledge_hop(message)
+        if not self.mark_processed("TACK", tack_id, source, destination):
+            return
+        if destination == self.node_id:
+            # Lo que confirma el gateway manda: también es la referencia de las diferencias del lote siguiente,
+            # salvo que él no guarde esa lectura (la guardó otro gateway): entonces el lote siguiente va sin diferencias
+            self.push_sent_seq, held = message.extra
+            self.push_acked_by = source if held else None
+        elif self.node_id in routelist:
+            self.forward_routed(message.raw, source, destination, tack_id, routelist)
+
+    def process_gateway(self, message):
+        """
+        Procesa un anuncio GATE: aprende la ruta al gateway y lo reenvía (una vez, con retardo aleatorio)
+        sólo si el gateway está a lo sumo GATEWAY_SLACK saltos más lejos que el más cercano conocido.
+        Así cada anuncio cubre la zona de su gateway y el borde con los vecinos, no toda la red.
+        """
+        gateway, advert_id, routelist = message.source, message.msg_id, message.route
+        if gateway == self.node_id or self.node_id in routelist:
+            return
+        if (routelist[-1] if routelist else gateway) not in self.neighbors:
+            return
+        if not self.mark_processed("GATE", advert_id, gateway, None):
+            return
+        hops = len(routelist) + 1
+        self.learn_from_path([gateway] + routelist + [self.node_id])
+        self.gateways[gateway] = [hops, time.time()]
+        nearest = min(entry[0] for entry in self.gateways.values())
+        if self.role == "master" or hops >= message.ttl or hops > nearest + self.GATEWAY_SLACK:
+            return
+        route = '-'.join(routelist + [self.node_id])
+        # Mismo retardo aleatorio que los RREQ para que los vecinos no reenvíen a la vez
+        self.pending_rreq[("GATE", advert_id, gateway)] = [ticks_ms(), random.randint(0, self.RREQ_JITTER_MS), 1,
+                                                          f"GATE:{gateway}:{advert_id}:{route}:{message.ttl}"]
+
+    def process_rerr(self, message):
+        """Procesa un RERR: todo nodo que lo escucha purga el enlace caído; el origen recupera su solicitud pendiente."""
+        source, destination, err_id, routelist = message.source, message.destination, message.msg_id, message.route
+        broken_from, broken_to = message.extra
+        self.purge_link(broken_from, broken_to)
+        if self.is_duplicate("RERR", err_id, source, destination):
+            self.metrics.count(DUPLICATES)
+            return
+        if destination == self.node_id:
+            self.mark_processed("RERR", err_id, source, destination)
+            self.log.info("%s recibió RERR: el enlace %s-%s está caído", self.node_id, broken_from, broken_to)
+            if self.waiting_response and self.get_route(self.sent_message.split(":")[2]) is None:
+                self.response_timer = time.time()
+                self.resend_data_request()
+        elif self.node_id in routelist:
+            self.mark_processed("RERR", err_id, source, destination)
+            self.metrics.count(RELAYS)
+            self.send(message.raw)
+
+    def process_ack(self, message):
+        """Libera del buffer de retransmisión la trama que confirma el siguiente salto."""
+        if message.destination == self.node_id:
+            kind, source = message.extra
+            self.ack_buffer.pop((kind, message.msg_id, source), None)
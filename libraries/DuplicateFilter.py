@@ -0,0 +1,64 @@
+"""
+Detección de tramas duplicadas por origen
+=========================================
+
+Cada nodo numera las tramas que origina con una secuencia propia de 16 bits
+(DSRNode.next_seq); las respuestas (RREP, RESP, TACK) repiten la secuencia del
+pedido. Para saber si una trama ya se procesó alcanza con guardar, por cada
+(tipo, dueño de la secuencia), la secuencia más alta vista y un bitmap de las
+WINDOW anteriores: dos enteros por clave, sin importar cuántas tramas pasen.
+
+- Secuencia más nueva que la más alta: la ventana avanza.
+- Dentro de la ventana: duplicada si su bit ya está marcado.
+- Más vieja que la ventana: se toma como un reinicio del origen (que arranca
+  su secuencia en un valor aleatorio) y la ventana vuelve a empezar.
+
+Las comparaciones son módulo 2^16, así que la secuencia puede dar la vuelta.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+SEQ_MOD = 65536
+WINDOW = 32
+WINDOW_MASK = (1 << WINDOW) - 1
+
+
+def seq_diff(new, old):
+    """Distancia con signo de old a new en el espacio de secuencias circular."""
+    diff = (new - old) % SEQ_MOD
+    return diff - SEQ_MOD if diff >= SEQ_MOD // 2 else diff
+
+
+class DuplicateFilter:
+    def __init__(self):
+        self.windows = {}   # clave -> [secuencia más alta, bitmap (bit i = más alta - i)]
+
+    def seen(self, key, seq):
+        """True si seq ya se marcó para key."""
+        window = self.windows.get(key)
+        if window is None:
+            return False
+        diff = seq_diff(seq % SEQ_MOD, window[0])
+        return -WINDOW < diff <= 0 and bool(window[1] & (1 << -diff))
+
+    def mark(self, key, seq):
+        """Marca seq para key; devuelve False si ya estaba marcada (duplicada)."""
+        seq %= SEQ_MOD
+        window = self.windows.get(key)
+        if window is None:
+            self.windows[key] = [seq, 1]
+            return True
+        diff = seq_diff(seq, window[0])
+        if diff > 0:
+            window[0] = seq
+            window[1] = ((window[1] << diff) | 1) & WINDOW_MASK if diff < WINDOW else 1
+        elif diff > -WINDOW:
+            bit = 1 << -diff
+            if window[1] & bit:
+                return False
+            window[1] |= bit
+        else:
+            window[0] = seq
+            window[1] = 1
+        return True
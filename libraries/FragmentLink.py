@@ -0,0 +1,212 @@
+"""
+Fragmentación de tramas más largas que un paquete LoRa
+======================================================
+
+FragmentLink envuelve la radio que usa DSRNode. Las tramas de hasta MTU
+caracteres salen tal cual; las más largas se parten en fragmentos numerados
+que el receptor reensambla antes de entregarlos al nodo, de modo que DSRNode y
+los relays siguen viendo tramas completas.
+
+    FRAG:{emisor}:{siguiente salto}:{id}:{índice}:{total}:{porción}
+    FNACK:{receptor}:{emisor}:{id}:{índices faltantes separados por ','}
+
+El siguiente salto sale de la ruta de origen de la trama (DSRMessage.next_hop),
+o es '*' en las de difusión. Sólo el siguiente salto reensambla y pide con
+FNACK los fragmentos de una trama con ruta: los demás vecinos los descartan
+(stats["foreign"]) en lugar de multiplicar los FNACK y las retransmisiones.
+
+Si pasa FRAG_GAP_MS sin fragmentos nuevos y faltan índices, el receptor pide
+sólo esos con un FNACK (hasta FRAG_NACK_RETRIES veces); el emisor retiene los
+fragmentos de sus últimas TX_KEEP tramas durante FRAG_KEEP_MS para
+retransmitirlos. Un reensamblado incompleto se descarta tras FRAG_TIMEOUT_MS y
+se retienen a lo sumo RX_BUFFERS a la vez.
+
+Los FNACK y las retransmisiones salen por `transmit`: con nodo.send pasan por la
+cola de salida del nodo (NodeRuntime) y por sus slots (SlotScheduler) como
+cualquier trama; sin él, directo a la radio.
+
+Con `log` (el NodeLog del nodo, que pasa también a la radio) los descartes
+por tamaño se registran en lugar de imprimirse.
+
+Uso:
+    lora = FragmentLink(LoRa(spi, ...), NODE_ID)
+    nodo = DSRNode(NODE_ID, lora, rtc, None)
+    lora.transmit = nodo.send
+    lora.log = nodo.log
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+from DSRMessage import next_hop
+from Ticks import ticks_ms, ticks_diff
+
+
+class FragmentLink:
+    MTU = 255                 # LoRa.MAX_PKT_LENGTH
+    MAX_FRAGMENTS = 16        # Fragmentos máximos por trama
+    RX_BUFFERS = 4            # Reensamblados simultáneos
+    TX_KEEP = 4               # Tramas propias retenidas para retransmisión selectiva
+    FRAG_GAP_MS = 600         # Silencio tras el que se piden los fragmentos faltantes
+    FRAG_TIMEOUT_MS = 5000    # Vida máxima de un reensamblado incompleto
+    FRAG_KEEP_MS = 5000       # Vida de los fragmentos retenidos por el emisor
+    FRAG_NACK_RETRIES = 2     # FNACK por trama antes de abandonarla
+
+    def __init__(self, radio, node_id, transmit=None):
+        self.radio = radio
+        self.node_id = node_id
+        self.transmit = transmit  # Envío de FNACK y retransmisiones (None = directo a la radio)
+        self._log = None
+        self.next_id = 0
+        self.sent = {}        # id -> [inicio, [fragmentos]]
+        self.partial = {}     # (emisor, id) -> [inicio, último, total, {índice: porción}, fnacks, rssi]
+        self.ready = []       # [(payload, rssi, ticks de RX)] reensamblados o sin fragmentar
+        self.stats = {"fragmented": 0, "reassembled": 0, "expired": 0, "nacks": 0, "resent": 0, "oversize": 0, "foreign": 0}
+
+    @property
+    def on_receive(self):
+        return self.radio.on_receive
+
+    @on_receive.setter
+    def on_receive(self, callback):
+        # NodeRuntime se engancha a la interrupción de la radio real
+        self.radio.on_receive = callback
+
+    @property
+    def log(self):
+        return self._log
+
+    @log.setter
+    def log(self, log):
+        # El driver también descarta tramas: al mismo registro
+        self._log = log
+        self.radio.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.radio, name)
+
+    def fragment(self, data, frag_id, target="*"):
+        fragments = []
+        index = offset = 0
+        while offset < len(data):
+            header = "FRAG:%s:%s:%d:%d:" % (self.node_id, target, frag_id, index)
+            # El total se agrega después: se reserva lugar para MAX_FRAGMENTS
+            size = self.MTU - len(header) - len(str(self.MAX_FRAGMENTS)) - 1
+            fragments.append([header, data[offset:offset + size]])
+            offset += size
+            index += 1
+        total = len(fragments)
+        return [header + "%d:" % total + chunk for header, chunk in fragments]
+
+    def send(self, data):
+        if len(data) <= self.MTU:
+            self.radio.send(data)
+            return
+        frag_id = self.next_id
+        self.next_id = (self.next_id + 1) % 65536
+        fragments = self.fragment(data, frag_id, next_hop(data, self.node_id) or "*")
+        if len(fragments) > self.MAX_FRAGMENTS:
+            self.stats["oversize"] += 1
+            if self._log is not None:
+                self._log.warning("%s descarta una trama de %d bytes: supera %d fragmentos", self.node_id, len(data), self.MAX_FRAGMENTS)
+            else:
+                print(f"{self.node_id} descarta una trama de {len(data)} bytes: supera {self.MAX_FRAGMENTS} fragmentos")
+            return
+        if len(self.sent) >= self.TX_KEEP:
+            del self.sent[min(self.sent, key=lambda key: self.sent[key][0])]
+        self.sent[frag_id] = [ticks_ms(), fragments]
+        self.stats["fragmented"] += 1
+        for fragment in fragments:
+            self.radio.send(fragment)
+
+    def send_control(self, data):
+        # Tramas de hasta MTU: si dan la vuelta por transmit, send las deja pasar sin fragmentar
+        if self.transmit is not None:
+            self.transmit(data)
+        else:
+            self.radio.send(data)
+
+    def process_fragment(self, payload, rssi, rx_ms):
+        parts = payload.split(":", 6)
+        if len(parts) != 7:
+            return
+        sender, target, frag_id, index, total, chunk = parts[1], parts[2], parts[3], int(parts[4]), int(parts[5]), parts[6]
+        if sender == self.node_id or not 0 <= index < total <= self.MAX_FRAGMENTS:
+            return
+        if target != "*" and target != self.node_id:
+            self.stats["foreign"] += 1
+            return
+        key = (sender, frag_id)
+        now = ticks_ms()
+        entry = self.partial.get(key)
+        if entry is None:
+            if len(self.partial) >= self.RX_BUFFERS:
+                # Buffer lleno: se abandona el reensamblado más viejo
+                del self.partial[min(self.partial, key=lambda k: self.partial[k][0])]
+                self.stats["expired"] += 1
+            entry = self.partial[key] = [now, now, total, {}, 0, rssi]
+        entry[1] = now
+        entry[3][index] = chunk
+        entry[5] = rssi
+        if len(entry[3]) == entry[2]:
+            del self.partial[key]
+            chunks = entry[3]
+            self.ready.append(("".join(chunks[i] for i in range(entry[2])), rssi, rx_ms))
+            self.stats["reassembled"] += 1
+
+    def process_fnack(self, payload):
+        parts = payload.split(":")
+        if len(parts) != 5 or parts[2] != self.node_id:
+            return
+        entry = self.sent.get(int(parts[3]))
+        if entry is None:
+            return
+        for index in parts[4].split(","):
+            if index and int(index) < len(entry[1]):
+                self.send_control(entry[1][int(index)])
+                self.stats["resent"] += 1
+
+    def process_timers(self):
+        now = ticks_ms()
+        for key in list(self.partial):
+            start, last, total, chunks, nacks, _ = self.partial[key]
+            if ticks_diff(now, start) > self.FRAG_TIMEOUT_MS:
+                del self.partial[key]
+                self.stats["expired"] += 1
+            elif ticks_diff(now, last) > self.FRAG_GAP_MS and nacks < self.FRAG_NACK_RETRIES:
+                missing = ",".join(str(i) for i in range(total) if i not in chunks)
+                self.send_control(f"FNACK:{self.node_id}:{key[0]}:{key[1]}:{missing}")
+                self.partial[key][1] = now
+                self.partial[key][4] += 1
+                self.stats["nacks"] += 1
+        for frag_id in list(self.sent):
+            if ticks_diff(now, self.sent[frag_id][0]) > self.FRAG_KEEP_MS:
+                del self.sent[frag_id]
+
+    def is_packet_received(self):
+        while self.radio.is_packet_received():
+            packet = self.radio.get_packet(rssi=True)
+            if packet is None:
+                break
+            payload, rssi, rx_ms = packet["payload"], packet.get("rssi"), packet.get("rx_ms")
+            try:
+                if payload.startswith("FRAG:"):
+                    self.process_fragment(payload, rssi, rx_ms)
+                elif payload.startswith("FNACK:"):
+                    self.process_fnack(payload)
+                else:
+                    self.ready.append((payload, rssi, rx_ms))
+            except ValueError:
+                pass  # Encabezado de fragmento inválido
+        if self.partial or self.sent:
+            self.process_timers()
+        return len(self.ready) > 0
+
+    def get_packet(self, rssi=False):
+        if not self.ready and not self.is_packet_received():
+            return None
+        payload, packet_rssi, rx_ms = self.ready.pop(0)
+        packet_info = {"payload": payload, "rx_ms": rx_ms}
+        if rssi:
+            packet_info["rssi"] = packet_rssi
+        return packet_info
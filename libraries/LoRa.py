@@ -66,11 +66,18 @@ class LoRa:
         # VARIABLES DE CONTROL DE RECEPCIÓN
         # ================================================================
         
-        self.packet_received = False      # Flag: paquete recibido
+        self.packet_received = False      # Flag: hay paquetes en la cola
         self.received_payload = None      # Contenido del último paquete
         self.last_payload = None         # Último payload (para detectar duplicados)
         self.received_rssi = None        # RSSI del último paquete recibido
         
+        # Cola de recepción: la interrupción encola y get_packet entrega en orden,
+        # así un paquete no se pierde si llega otro antes de leerlo
+        self.RX_QUEUE_LEN = 8            # Paquetes que se retienen sin leer
+        self.rx_queue = []               # [(payload, rssi, ticks_ms de RX), ...] del más viejo al más nuevo
+        self.rx_dropped = 0              # Paquetes descartados por cola llena
+        self.on_receive = None           # Callback opcional al encolar (p. ej. NodeRuntime)
+        
         # Control de tiempo para evitar duplicados
         self.last_receive_time = 0       # Timestamp de última recepción
         self.receive_delay = 2           # Retardo mínimo entre recepciones (seg)
@@ -119,6 +126,7 @@ class LoRa:
         self.IRQ_TX_DONE_MASK = 0x08
         self.IRQ_PAYLOAD_CRC_ERROR_MASK = 0x20
         self.MAX_PKT_LENGTH = 255
+        self.log = None  # NodeLog del nodo para avisar de las tramas descartadas (None = print)
         
         self.init_lora()
 
@@ -150,6 +158,13 @@ class LoRa:
         print("Lora Conectado")
     
     def send(self, data):
+        if len(data) > self.MAX_PKT_LENGTH:
+            # El registro de longitud es de 8 bits: la trama saldría truncada
+            if self.log is not None:
+                self.log.warning("Trama de %d bytes descartada (máximo %d); usar FragmentLink", len(data), self.MAX_PKT_LENGTH)
+            else:
+                print(f"Trama de {len(data)} bytes descartada (máximo {self.MAX_PKT_LENGTH}); usar FragmentLink")
+            return
         self.set_mode_standby()
         self.write_register(self.REG_FIFO_ADDR_PTR, self.TX_BASE_ADDR)
         
@@ -170,9 +185,10 @@ class LoRa:
         self.set_mode_rx_continuous()
 
     def _irq_recv(self, pin):
-        self.check_for_packet()
+        # Marca de tiempo lo antes posible: TimeSync la usa para estimar la hora de la baliza
+        self.check_for_packet(time.ticks_ms())
         
-    def check_for_packet(self):
+    def check_for_packet(self, rx_ms=None):
         irq_flags = self.read_register(self.REG_IRQ_FLAGS)
         if irq_flags & self.IRQ_RX_DONE_MASK:
             current_addr = self.read_register(self.REG_FIFO_RX_CURRENT_ADDR)
@@ -183,9 +199,16 @@ class LoRa:
             
             self.get_rssi()
             
+            if len(self.rx_queue) >= self.RX_QUEUE_LEN:
+                # Cola llena: se descarta el paquete más viejo
+                self.rx_queue.pop(0)
+                self.rx_dropped += 1
+            self.rx_queue.append((payload_string, self.received_rssi, rx_ms if rx_ms is not None else time.ticks_ms()))
             self.packet_received = True
             self.received_payload = payload_string
             self.last_payload = payload_string
+            if self.on_receive is not None:
+                self.on_receive()
             self.write_register(self.REG_IRQ_FLAGS, self.IRQ_RX_DONE_MASK)
             self.write_register(self.REG_IRQ_FLAGS, 0xFF)
         
@@ -266,7 +289,7 @@ class LoRa:
         time.sleep(0.01)
     # Método para verificar si llegó un paquete
     def is_packet_received(self):
-        return self.packet_received
+        return len(self.rx_queue) > 0
     
     def get_rssi(self):
         rssi_value = self.read_register(self.REG_RSSI_VALUE)
@@ -275,19 +298,20 @@ class LoRa:
 
     # Método para obtener el contenido del paquete recibido
     def get_packet(self,rssi=False):
-        if self.packet_received:
+        if self.rx_queue:
+            payload, packet_rssi, rx_ms = self.rx_queue.pop(0)  # El más viejo primero
             if rssi:
                 packet_info = {
-                "rssi": self.received_rssi,
-                "payload": self.received_payload
+                "rssi": packet_rssi,
+                "payload": payload,
+                "rx_ms": rx_ms
                 }
             else:
                 packet_info = {
-                "payload": self.received_payload
+                "payload": payload,
+                "rx_ms": rx_ms
                 }
-            self.packet_received = False  # Reiniciar la bandera
-            self.received_payload = None  # Limpiar el payload
-            self.received_rssi = None  # Limpiar el valor de RSSI
+            self.packet_received = len(self.rx_queue) > 0
             return packet_info
         else:
             return None
@@ -0,0 +1,186 @@
+"""
+Registro del nodo en memoria
+============================
+
+Reemplaza los print de DSRNode y de las librerías que lo acompañan. Escribir
+por la UART bloquea el loop unos milisegundos por línea, justo cuando el nodo
+reenvía una inundación de RREQ; NodeLog sólo guarda la entrada en un buffer
+circular y la escribe más tarde:
+
+- Niveles DEBUG < INFO < WARNING < ERROR; lo que está por debajo de `level` se
+  descarta con una comparación.
+- Formato diferido: se guardan el formato y sus argumentos ("%s reenvía %s",
+  nodo, trama) y el texto se arma recién al drenar o al volcar. Si algún
+  argumento es mutable (lista, diccionario, conjunto) el texto se arma al
+  escribir, para que la entrada muestre su valor de ese momento.
+- drain() pasa las entradas nuevas a los destinos de add_sink (consola, un
+  archivo en la flash con FileSink, MQTT...), de a `limit` por llamada, desde
+  un momento en que el nodo no atiende la radio (la tarea log de NodeRuntime o
+  el bucle principal de los maestros). Las que se pisan antes de drenarse
+  suman a `lost`.
+- NodeLog no usa locks: en los maestros el hilo dueño del nodo saca las
+  entradas con take() (vía NodeOwner.call) y otro hilo las entrega a los
+  destinos con deliver(); drain() hace las dos cosas en un mismo hilo.
+- dump() devuelve las últimas entradas del buffer, drenadas o no, para un
+  comando de diagnóstico.
+
+Con echo=True cada entrada se imprime al escribirla, como antes (simulador en
+modo verbose, desarrollo).
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import os
+from array import array
+
+from Ticks import ticks_ms
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+MUTABLE = (list, dict, set, bytearray)  # Argumentos que se formatean al escribir
+
+
+def render(fmt, args):
+    try:
+        return fmt % args if args else fmt
+    except (TypeError, ValueError):
+        return "%s %r" % (fmt, args)
+
+
+class NodeLog:
+    CAPACITY = 64       # Entradas que retiene el buffer circular
+
+    def __init__(self, level=INFO, capacity=None, echo=False):
+        self.level = level
+        self.capacity = self.CAPACITY if capacity is None else capacity
+        self.echo = echo
+        # Buffer circular en listas paralelas preasignadas: escribir no crea tuplas propias
+        self.times = array("L", [0] * self.capacity)
+        self.levels = bytearray(self.capacity)
+        self.formats = [None] * self.capacity
+        self.args = [None] * self.capacity
+        self.written = 0    # Entradas escritas desde el arranque
+        self.drained = 0    # Entradas ya entregadas a los destinos
+        self.lost = 0       # Entradas pisadas antes de drenarse
+        self.sinks = []     # [callback(línea), nivel mínimo]
+        self.clock = ticks_ms
+
+    def debug(self, fmt, *args):
+        if DEBUG >= self.level:
+            self.write(DEBUG, fmt, args)
+
+    def info(self, fmt, *args):
+        if INFO >= self.level:
+            self.write(INFO, fmt, args)
+
+    def warning(self, fmt, *args):
+        if WARNING >= self.level:
+            self.write(WARNING, fmt, args)
+
+    def error(self, fmt, *args):
+        if ERROR >= self.level:
+            self.write(ERROR, fmt, args)
+
+    def write(self, level, fmt, args):
+        for arg in args:
+            if isinstance(arg, MUTABLE):
+                fmt, args = render(fmt, args), ()
+                break
+        index = self.written % self.capacity
+        self.times[index] = self.clock() & 0xFFFFFFFF
+        self.levels[index] = level
+        self.formats[index] = fmt
+        self.args[index] = args
+        self.written += 1
+        if self.written - self.drained > self.capacity:
+            # Buffer lleno sin drenar: la entrada más vieja se perdió para los destinos
+            self.drained = self.written - self.capacity
+            if self.sinks:
+                self.lost += 1
+        if self.echo:
+            print(self.format(index))
+
+    def format(self, index):
+        text = render(self.formats[index], self.args[index])
+        return "%d %s %s" % (self.times[index], LEVEL_NAMES[self.levels[index]], text)
+
+    def add_sink(self, callback, level=DEBUG):
+        """Destino de drain(): callback(línea) recibe las entradas de nivel >= level."""
+        self.sinks.append([callback, level])
+
+    def take(self, limit=None):
+        """Saca hasta limit entradas nuevas como [(nivel, línea)], sin las que ningún destino quiere; en el hilo que escribe."""
+        entries = []
+        if not self.sinks:
+            return entries
+        lowest = min(level for _, level in self.sinks)
+        count = 0
+        while self.drained < self.written and (limit is None or count < limit):
+            index = self.drained % self.capacity
+            self.drained += 1
+            count += 1
+            if self.levels[index] >= lowest:
+                entries.append((self.levels[index], self.format(index)))
+        return entries
+
+    def deliver(self, entries):
+        """Entrega a los destinos las entradas de take(); puede correr en otro hilo. Devuelve cuántas entregó."""
+        for entry_level, line in entries:
+            for callback, level in self.sinks:
+                if entry_level >= level:
+                    try:
+                        callback(line)
+                    except Exception as e:
+                        print("Error en un destino del registro:", e)
+        return len(entries)
+
+    def drain(self, limit=None):
+        """Entrega a los destinos hasta limit entradas nuevas en este hilo; devuelve cuántas sacó del buffer."""
+        if not self.sinks:
+            return 0
+        pending = self.written - self.drained
+        self.deliver(self.take(limit))
+        return pending - (self.written - self.drained)
+
+    def dump(self, count=None, level=DEBUG):
+        """Últimas count entradas del buffer (todas si es None) de nivel >= level, de la más vieja a la más nueva."""
+        first = max(self.written - self.capacity, 0)
+        if count is not None:
+            first = max(first, self.written - count)
+        return [self.format(n % self.capacity) for n in range(first, self.written)
+                if self.levels[n % self.capacity] >= level]
+
+    def stats(self):
+        return {"written": self.written, "pending": self.written - self.drained, "lost": self.lost,
+                "level": LEVEL_NAMES.get(self.level, self.level)}
+
+
+class FileSink:
+    """Destino que agrega las líneas a un archivo de la flash y lo rota a path + '.1' al pasar max_bytes."""
+
+    def __init__(self, path, max_bytes=16384):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def __call__(self, line):
+        if self.size is None:
+            try:
+                self.size = os.stat(self.path)[6]
+            except OSError:
+                self.size = 0
+        if self.size + len(line) + 1 > self.max_bytes:
+            try:
+                os.remove(self.path + ".1")
+            except OSError:
+                pass
+            try:
+                os.rename(self.path, self.path + ".1")
+            except OSError:
+                pass
+            self.size = 0
+        with open(self.path, "a") as output:
+            output.write(line + "\n")
+        self.size += len(line) + 1
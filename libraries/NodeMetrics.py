@@ -0,0 +1,165 @@
+"""
+Métricas de un nodo de la red mesh
+==================================
+
+Contadores del nodo en arreglos preasignados (array "L"): sumar uno no crea
+objetos, así que se pueden llevar en cada trama sin presionar al recolector
+de basura de MicroPython.
+
+- Tramas transmitidas y recibidas por tipo, y tiempo en el aire de las
+  transmitidas (de una tabla por largo calculada al iniciar).
+- Contadores sueltos: duplicados, reenvíos, reintentos, vencimientos,
+  checksums inválidos, tramas mal formadas y errores de los suscriptores.
+- Histograma de lo que tarda en procesarse cada trama recibida, por tipo
+  (µs, límites en HANDLER_BOUNDS_US).
+- Histograma de la latencia de los descubrimientos de ruta propios (ms,
+  límites en ROUTE_BOUNDS_MS); los que no terminan en DISCOVERY_TIMEOUT_MS
+  se cuentan como fallidos.
+
+snapshot() arma un dict (sólo con lo distinto de cero) para publicar por MQTT
+o HTTP; encode()/decode_summary() dan un resumen corto que un esclavo agrega
+a sus RESP (DSRNode.stats_piggyback).
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+from array import array
+
+from TimeSync import airtime_ms
+from Ticks import ticks_diff
+
+KINDS = ("HELLO", "RREQ", "RREP", "DATA", "RESP", "RERR", "ACK", "TELE", "TACK", "GATE", "TOPO", "JOIN", "SLOTS", "?")
+KIND_INDEX = {kind: index for index, kind in enumerate(KINDS)}
+OTHER = KIND_INDEX["?"]
+
+COUNTERS = ("duplicates", "relays", "retries", "timeouts", "checksum_errors", "parse_errors", "handler_errors",
+            "route_failures")
+DUPLICATES, RELAYS, RETRIES, TIMEOUTS, CHECKSUM_ERRORS, PARSE_ERRORS, HANDLER_ERRORS, ROUTE_FAILURES = range(len(COUNTERS))
+
+HANDLER_BOUNDS_US = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)  # + un balde para lo mayor
+ROUTE_BOUNDS_MS = (250, 500, 1000, 2000, 5000, 10000, 20000, 40000)
+
+# Claves cortas del resumen que viaja en los RESP
+SUMMARY_KEYS = (("tx", "tx"), ("rx", "rx"), ("air", "airtime_ms"), ("dup", "duplicates"), ("rly", "relays"),
+                ("rtr", "retries"), ("to", "timeouts"), ("crc", "checksum_errors"), ("ovf", "rx_overflows"))
+
+MAX_PKT_LENGTH = 255
+
+
+def bucket(bounds, value):
+    """Índice del balde de value: el primero cuyo límite lo alcanza, o el último."""
+    index = 0
+    for bound in bounds:
+        if value <= bound:
+            return index
+        index += 1
+    return index
+
+
+class NodeMetrics:
+    DISCOVERY_TIMEOUT_MS = 40000   # Descubrimiento propio sin RREP tras el que se cuenta como fallido
+
+    def __init__(self):
+        kinds = len(KINDS)
+        self.tx = array("L", [0] * kinds)
+        self.rx = array("L", [0] * kinds)
+        self.air_tenths = array("L", [0] * kinds)     # Décimas de ms en el aire por tipo
+        self.counters = array("L", [0] * len(COUNTERS))
+        self.handler_buckets = len(HANDLER_BOUNDS_US) + 1
+        self.handler_hist = array("L", [0] * (kinds * self.handler_buckets))
+        self.handler_max_us = array("L", [0] * kinds)
+        self.route_hist = array("L", [0] * (len(ROUTE_BOUNDS_MS) + 1))
+        self.discoveries = {}   # destino -> ticks_ms del primer RREQ propio sin respuesta
+        # Tiempo en el aire por largo de trama, en décimas de ms: sin flotantes al transmitir
+        self.air_table = array("H", [int(airtime_ms(length) * 10) for length in range(MAX_PKT_LENGTH + 1)])
+
+    @staticmethod
+    def kind_index(payload):
+        """Índice del tipo de una trama de texto sin partirla (startswith no crea objetos)."""
+        for index in range(OTHER):
+            kind = KINDS[index]
+            if payload.startswith(kind) and payload.startswith(":", len(kind)):
+                return index
+        return OTHER
+
+    def count(self, counter):
+        self.counters[counter] += 1
+
+    def on_tx(self, payload):
+        index = self.kind_index(payload)
+        self.tx[index] += 1
+        # Una trama larga sale en fragmentos de MAX_PKT_LENGTH (FragmentLink); sin contar sus encabezados
+        full, rest = divmod(len(payload), MAX_PKT_LENGTH)
+        air = full * self.air_table[MAX_PKT_LENGTH]
+        if rest:
+            air += self.air_table[rest]  # Sin resto no hay un paquete más: air_table[0] es el de una trama vacía
+        self.air_tenths[index] += air
+
+    def on_rx(self, kind, elapsed_us):
+        """Trama recibida de tipo kind que los suscriptores procesaron en elapsed_us."""
+        index = KIND_INDEX.get(kind, OTHER)
+        self.rx[index] += 1
+        self.handler_hist[index * self.handler_buckets + bucket(HANDLER_BOUNDS_US, elapsed_us)] += 1
+        if elapsed_us > self.handler_max_us[index]:
+            self.handler_max_us[index] = elapsed_us
+
+    def discovery_started(self, destination, now):
+        started = self.discoveries.get(destination)
+        if started is not None and ticks_diff(now, started) < self.DISCOVERY_TIMEOUT_MS:
+            return  # Reintento o ampliación del anillo: cuenta desde el primer RREQ
+        if started is not None:
+            self.counters[ROUTE_FAILURES] += 1
+        self.discoveries[destination] = now
+
+    def discovery_done(self, destination, now):
+        started = self.discoveries.pop(destination, None)
+        if started is not None:
+            self.route_hist[bucket(ROUTE_BOUNDS_MS, ticks_diff(now, started))] += 1
+
+    def snapshot(self, extra=None):
+        """Dict con los contadores distintos de cero (y extra: contadores de otras capas)."""
+        per_kind = lambda values: {KINDS[i]: values[i] for i in range(len(KINDS)) if values[i]}
+        handlers = {}
+        for i in range(len(KINDS)):
+            if self.rx[i]:
+                start = i * self.handler_buckets
+                handlers[KINDS[i]] = {"hist": list(self.handler_hist[start:start + self.handler_buckets]),
+                                      "max_us": self.handler_max_us[i]}
+        stats = {
+            "tx": per_kind(self.tx),
+            "rx": per_kind(self.rx),
+            "airtime_ms": {KINDS[i]: self.air_tenths[i] // 10 for i in range(len(KINDS)) if self.air_tenths[i]},
+            "counters": {COUNTERS[i]: self.counters[i] for i in range(len(COUNTERS)) if self.counters[i]},
+            "handler_us": {"bounds": list(HANDLER_BOUNDS_US), "kinds": handlers},
+            "route_ms": {"bounds": list(ROUTE_BOUNDS_MS), "hist": list(self.route_hist)},
+        }
+        if extra:
+            stats["counters"].update({name: value for name, value in extra.items() if value})
+        return stats
+
+    def summary(self, extra=None):
+        """Totales de SUMMARY_KEYS como {clave corta: valor}."""
+        totals = {
+            "tx": sum(self.tx),
+            "rx": sum(self.rx),
+            "airtime_ms": sum(self.air_tenths) // 10,
+        }
+        for i in range(len(COUNTERS)):
+            totals[COUNTERS[i]] = self.counters[i]
+        if extra:
+            totals.update(extra)
+        return {short: totals.get(name, 0) for short, name in SUMMARY_KEYS}
+
+    def encode(self, extra=None):
+        """Resumen para un RESP: 'tx=12,rx=40,air=830,...' (sin ':' ni '-')."""
+        return ",".join("%s=%d" % item for item in self.summary(extra).items())
+
+
+def decode_summary(text):
+    """Inversa de NodeMetrics.encode; levanta ValueError si una entrada no es clave=número."""
+    summary = {}
+    for entry in text.split(","):
+        key, _, value = entry.partition("=")
+        summary[key] = int(value)
+    return summary
@@ -0,0 +1,142 @@
+"""
+Hilo dueño de un DSRNode
+========================
+
+DSRNode no es seguro entre hilos: `duplicates`, `routes`, los buffers y la radio se
+modifican sin locks. En los maestros con varios hilos (MQTT, API, temporizador
+de HELLO) un solo hilo, el dueño, toca el nodo; los demás le envían comandos
+por una cola protegida con un lock y reciben el resultado en un Future.
+
+Uso:
+    owner = NodeOwner(dsr_node)                         # nodo creado con timer=None
+    _thread.start_new_thread(owner.loop, ())            # hilo dueño de la radio
+    owner.submit(dsr_node.request_data, "B")            # desde cualquier hilo
+    rutas = owner.call(lambda: dict(dsr_node.routes))   # espera el resultado
+
+Con on_response=callback, el dueño llama a callback(message) con cada RESP que
+completa una solicitud DATA (DSRNode.on_response), en su propio hilo.
+Con una ReadingCache (cache=...), owner.read(nodo, callback) consulta la caché
+en el hilo dueño (también los aciertos) y, si la lectura venció, encola el pedido.
+Con un SlotScheduler (scheduler=...), cada pasada atiende también los slots.
+
+Corre igual con _thread de MicroPython y de CPython.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import time
+import _thread
+
+from Ticks import ticks_ms, ticks_diff
+
+
+class Future:
+    """Resultado de un comando; el lock queda tomado hasta que el dueño lo resuelve."""
+    WAIT_MS = 10        # Pausa entre consultas de result() con timeout
+
+    def __init__(self):
+        self._done = _thread.allocate_lock()
+        self._done.acquire()
+        self.value = None
+        self.error = None
+
+    def resolve(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self._done.release()
+
+    def done(self):
+        return not self._done.locked()
+
+    def result(self, timeout=-1):
+        """Espera hasta `timeout` segundos (-1: sin límite); re-levanta el error del comando."""
+        if timeout < 0:
+            self._done.acquire()
+            self._done.release()
+        else:
+            # El lock de _thread en MicroPython ignora el timeout de acquire: se consulta done() hasta el plazo
+            start = ticks_ms()
+            while not self.done():
+                if ticks_diff(ticks_ms(), start) >= timeout * 1000:
+                    raise OSError("timeout esperando al hilo dueño")
+                time.sleep(self.WAIT_MS / 1000)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class NodeOwner:
+    QUEUE_LIMIT = 32    # Comandos pendientes antes de rechazar nuevos
+    POLL_MS = 100       # Pausa del bucle del dueño entre pasadas
+    READ_TIMEOUT = 5    # Segundos que read() espera la consulta a la caché
+
+    def __init__(self, node, on_response=None, cache=None, scheduler=None):
+        self.node = node
+        if on_response is not None:
+            node.on_response = on_response
+        self.cache = cache
+        self.scheduler = scheduler
+        self.lock = _thread.allocate_lock()
+        self.commands = []
+        self.rejected = 0
+        self.running = False
+
+    def submit(self, function, *args):
+        """Encola function(*args) para el hilo dueño; se puede llamar desde cualquier hilo."""
+        future = Future()
+        with self.lock:
+            if len(self.commands) >= self.QUEUE_LIMIT:
+                self.rejected += 1
+                future.resolve(error=OSError("cola de comandos llena"))
+                return future
+            self.commands.append((function, args, future))
+        return future
+
+    def call(self, function, *args, timeout=-1):
+        return self.submit(function, *args).result(timeout)
+
+    def read(self, destination, callback):
+        """
+        Lectura de destination a través de la caché, consultada en el hilo dueño: si está fresca,
+        callback(lectura) ya corrió al volver y devuelve True; si no, callback corre luego en el hilo
+        dueño con la lectura o None. Espera a lo sumo READ_TIMEOUT segundos una pasada del dueño.
+        """
+        return self.call(self.cache.get, destination, callback, timeout=self.READ_TIMEOUT)
+
+    def run_pending(self):
+        """Ejecuta los comandos encolados; sólo desde el hilo dueño."""
+        with self.lock:
+            commands, self.commands = self.commands, []
+        for function, args, future in commands:
+            try:
+                value = function(*args)
+            except Exception as e:
+                future.resolve(error=e)
+            else:
+                future.resolve(value)
+        return len(commands)
+
+    def step(self):
+        """Una pasada del dueño: comandos, radio y reintentos."""
+        self.run_pending()
+        self.node.receive_message()
+        if self.cache is not None:
+            self.cache.process_timers()
+        if self.scheduler is not None:
+            self.scheduler.process()
+        self.node.waiting_for_response()
+
+    def loop(self):
+        """Cuerpo del hilo dueño; lleva también el reloj del nodo (set_timestamp cada segundo)."""
+        self.running = True
+        last_second = ticks_ms()
+        while self.running:
+            try:
+                if ticks_diff(ticks_ms(), last_second) >= 1000:
+                    last_second = ticks_ms()
+                    self.node.set_timestamp(None)
+                self.step()
+            except Exception as e:
+                self.node.log.error("Error en el hilo dueño del nodo: %s", e)
+            time.sleep(self.POLL_MS / 1000)
@@ -0,0 +1,174 @@
+"""
+Runtime asíncrono para DSRNode
+==============================
+
+Reemplaza el bucle `while True: ...; time.sleep(1)` y los machine.Timer del
+firmware por tareas de un único event loop:
+
+- rx:      despierta con la interrupción DIO0 de la radio y vacía su cola (DSRNode.pump)
+- tx:      transmite de a una trama la cola de salida, cediendo el loop entre tramas
+- timers:  reenvíos diferidos de RREQ, ACK por salto y reintentos de DATA
+- clock:   timestamp del nodo y limpieza de cachés cada segundo (antes un Timer)
+- beacon:  HELLO periódico con una fase aleatoria
+- sampler: lectura periódica de sensores (función común o corrutina)
+- slots:   con un SlotScheduler, transmisión en la contienda y en los slots propios
+- log:     drena el registro del nodo (NodeLog) a sus destinos de a LOG_BATCH entradas
+
+Corre con uasyncio en MicroPython y con asyncio en CPython, donde el simulador
+lo conecta a las radios emuladas.
+
+Uso:
+    nodo = DSRNode(NODE_ID, lora, rtc, None, qos=LORA_QOS)
+    NodeRuntime(nodo, hello_ms=5000, sampler=leer_sensores, sample_ms=10000).run()
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import random
+
+try:
+    import uasyncio as asyncio  # type: ignore
+except ImportError:
+    import asyncio
+
+
+def make_rx_flag():
+    """Bandera que la interrupción de la radio puede activar: ThreadSafeFlag en MicroPython, Event en CPython."""
+    try:
+        return asyncio.ThreadSafeFlag()
+    except AttributeError:
+        return asyncio.Event()
+
+
+class TxQueue:
+    """
+    Envoltorio de la radio que ve DSRNode: send() sólo encola y la tarea tx transmite.
+    El resto de la interfaz (recepción, contadores) pasa directo a la radio.
+    """
+
+    def __init__(self, radio, limit=16):
+        self.radio = radio
+        self.limit = limit
+        self.queue = []
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def send(self, data):
+        if len(self.queue) >= self.limit:
+            self.queue.pop(0)
+            self.dropped += 1
+        self.queue.append(data)
+        self.ready.set()
+
+    def is_packet_received(self):
+        return self.radio.is_packet_received()
+
+    def get_packet(self, rssi=False):
+        return self.radio.get_packet(rssi)
+
+    def __getattr__(self, name):
+        return getattr(self.radio, name)
+
+
+class NodeRuntime:
+    TICK_MS = 50        # Período de los temporizadores del protocolo
+    RX_IDLE_MS = 1000   # Sondeo de respaldo si la radio no avisa por interrupción
+    LOG_MS = 500        # Período del drenado del registro
+    LOG_BATCH = 8       # Entradas por tanda: la consola retiene el loop a lo sumo unas líneas
+
+    def __init__(self, node, hello_ms=10000, sampler=None, sample_ms=60000, scheduler=None):
+        self.node = node
+        self.scheduler = scheduler
+        self.radio = node.lora
+        self.tx = TxQueue(self.radio)
+        node.lora = self.tx
+        self.hello_ms = hello_ms
+        self.sampler = sampler
+        self.sample_ms = sample_ms
+        self.rx_flag = make_rx_flag()
+        # La radio llama on_receive desde su interrupción al encolar un paquete
+        self.radio.on_receive = self.rx_flag.set
+        self.tasks = []
+
+    async def rx_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.rx_flag.wait(), self.RX_IDLE_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            if hasattr(self.rx_flag, "clear"):
+                self.rx_flag.clear()
+            # pump lee hasta RX_BURST tramas: se repite mientras queden en la cola
+            while self.node.pump():
+                await asyncio.sleep(0)
+
+    async def tx_loop(self):
+        while True:
+            await self.tx.ready.wait()
+            self.tx.ready.clear()
+            while self.tx.queue:
+                self.radio.send(self.tx.queue.pop(0))
+                await asyncio.sleep(0)
+
+    async def timers_loop(self):
+        while True:
+            self.node.process_pending()
+            self.node.waiting_for_response()
+            await asyncio.sleep(self.TICK_MS / 1000)
+
+    async def clock_loop(self):
+        while True:
+            self.node.set_timestamp(None)
+            await asyncio.sleep(1)
+
+    async def beacon_loop(self):
+        # Fase aleatoria: nodos encendidos a la vez no anuncian juntos
+        await asyncio.sleep(random.randint(0, self.hello_ms) / 1000)
+        while True:
+            self.node.send_hello()
+            await asyncio.sleep(self.hello_ms / 1000)
+
+    async def sampler_loop(self):
+        while True:
+            result = self.sampler()
+            if hasattr(result, "send"):
+                # Corrutina: puede esperar al sensor sin bloquear la radio
+                await result
+            await asyncio.sleep(self.sample_ms / 1000)
+
+    async def slot_loop(self):
+        while True:
+            # process() devuelve los ms hasta la próxima ventana (o envío de la contienda)
+            await asyncio.sleep(self.scheduler.process() / 1000)
+
+    async def log_loop(self):
+        while True:
+            # Entre tandas se cede el loop: una trama que llega no espera a que se vacíe el registro
+            while self.node.log.drain(self.LOG_BATCH):
+                await asyncio.sleep(0)
+            await asyncio.sleep(self.LOG_MS / 1000)
+
+    def start(self):
+        """Crea las tareas en el loop en curso y las devuelve."""
+        loops = [self.rx_loop(), self.tx_loop(), self.timers_loop(), self.clock_loop(), self.beacon_loop(), self.log_loop()]
+        if self.sampler is not None:
+            loops.append(self.sampler_loop())
+        if self.scheduler is not None:
+            loops.append(self.slot_loop())
+        self.tasks = [asyncio.create_task(loop) for loop in loops]
+        return self.tasks
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    async def main(self):
+        self.start()
+        while True:
+            await asyncio.sleep(3600)
+
+    def run(self):
+        """Punto de entrada del firmware: corre el nodo para siempre."""
+        asyncio.run(self.main())
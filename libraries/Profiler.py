@@ -0,0 +1,144 @@
+"""
+Perfilado opcional de los caminos calientes del nodo
+====================================================
+
+Mide cuántas veces se llama cada función, el tiempo total y el máximo, con
+ticks_us en MicroPython y perf_counter_ns en CPython. Es opcional: attach()
+reemplaza los métodos del nodo y de la radio por versiones cronometradas
+sólo en esas instancias, y detach() los devuelve. Sin attach() no hay
+ningún costo, porque ningún método cambia.
+
+Qué se mide:
+- Radio (la de abajo de FragmentLink, SlotLink o la cola de NodeRuntime):
+  check_for_packet (corre en la interrupción DIO0), send y get_packet.
+- DSRNode: pump, decode_packet (el split de la trama), los process_* de cada
+  tipo, el checksum, forward_routed, process_pending y send.
+
+Los tiempos son inclusivos: pump incluye decode_packet y los process_* que
+llama. Varios nodos pueden compartir un Profiler (el simulador); sus tiempos
+se suman por nombre.
+
+Uso:
+    profiler = Profiler()
+    profiler.attach(nodo)
+    ...
+    print(profiler.report())
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+from Ticks import ticks_us, ticks_diff
+
+RADIO_HOT_PATHS = ("check_for_packet", "send", "get_packet")
+NODE_HOT_PATHS = ("pump", "decode_packet", "dispatch", "process_hello", "process_rreq", "process_rrep",
+                  "process_data", "process_response", "complete_request", "process_telemetry", "process_topology",
+                  "process_tack", "process_gateway", "process_rerr", "process_ack", "calculate_checksum",
+                  "verify_checksum", "forward_routed", "process_pending", "send")
+
+
+def innermost_radio(radio):
+    """Driver debajo de las envolturas que guardan la capa siguiente en .radio (sin pasar por __getattr__)."""
+    while True:
+        inner = getattr(radio, "__dict__", {}).get("radio")
+        if inner is None:
+            return radio
+        radio = inner
+
+
+class Profiler:
+    def __init__(self):
+        self.index = {}     # nombre -> posición en las listas de abajo
+        self.names = []
+        self.calls = []
+        self.total_us = []
+        self.max_us = []
+        self.patched = []   # [(objeto, atributo, original)] para detach()
+
+    def slot(self, name):
+        index = self.index.get(name)
+        if index is None:
+            index = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.calls.append(0)
+            self.total_us.append(0)
+            self.max_us.append(0)
+        return index
+
+    def wrap(self, name, function):
+        """Versión cronometrada de function que acumula en name."""
+        index = self.slot(name)
+        calls, total_us, max_us = self.calls, self.total_us, self.max_us
+
+        def timed(*args, **kwargs):
+            start = ticks_us()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = ticks_diff(ticks_us(), start)
+                calls[index] += 1
+                total_us[index] += elapsed
+                if elapsed > max_us[index]:
+                    max_us[index] = elapsed
+        return timed
+
+    def instrument(self, obj, names, prefix):
+        """Reemplaza los métodos names de obj (los que tenga) por versiones cronometradas; devuelve [(original, cronometrado)]."""
+        replaced = []
+        for name in names:
+            original = getattr(obj, name, None)
+            if original is None or name in getattr(obj, "__dict__", {}):
+                continue  # No existe o ya está instrumentado
+            timed = self.wrap(prefix + name, original)
+            setattr(obj, name, timed)
+            self.patched.append((obj, name, original))
+            replaced.append((original, timed))
+        return replaced
+
+    def attach(self, node):
+        """Cronometra los caminos calientes de node y de su radio."""
+        self.instrument(innermost_radio(node.lora), RADIO_HOT_PATHS, "radio.")
+        replaced = self.instrument(node, NODE_HOT_PATHS, "")
+        # handlers y suscriptores guardan los métodos ligados al crear el nodo: se apuntan a los cronometrados
+        self.rebind(node, replaced)
+
+    def detach(self):
+        """Devuelve los métodos originales; los contadores se conservan hasta reset()."""
+        restore = []
+        for obj, name, original in reversed(self.patched):
+            restore.append((getattr(obj, name), original))
+            delattr(obj, name)
+        for obj in {id(obj): obj for obj, _, _ in self.patched}.values():
+            if hasattr(obj, "handlers"):
+                self.rebind(obj, restore)
+        self.patched = []
+
+    @staticmethod
+    def rebind(node, pairs):
+        # Pares (viejo, nuevo) en una lista: los métodos ligados se comparan con == sin usarlos de clave
+        for kind, handler in list(node.handlers.items()):
+            for old, new in pairs:
+                if handler == old:
+                    node.handlers[kind] = new
+        for subscriber in node.subscribers:
+            for old, new in pairs:
+                if subscriber[2] == old:
+                    subscriber[2] = new
+
+    def reset(self):
+        for index in range(len(self.names)):
+            self.calls[index] = self.total_us[index] = self.max_us[index] = 0
+
+    def results(self):
+        """[(nombre, llamadas, total µs, máximo µs)] de lo llamado al menos una vez, del mayor total al menor."""
+        rows = [(self.names[i], self.calls[i], self.total_us[i], self.max_us[i])
+                for i in range(len(self.names)) if self.calls[i]]
+        rows.sort(key=lambda row: -row[2])
+        return rows
+
+    def report(self, limit=None):
+        """Tabla de results() como texto."""
+        lines = ["%-22s %8s %10s %9s %9s" % ("función", "llamadas", "total ms", "media µs", "máx µs")]
+        for name, calls, total, longest in self.results()[:limit]:
+            lines.append("%-22s %8d %10.1f %9d %9d" % (name, calls, total / 1000, total // calls, longest))
+        return "\n".join(lines)
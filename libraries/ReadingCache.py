@@ -0,0 +1,105 @@
+"""
+Caché de la última lectura de cada nodo en el gateway
+=====================================================
+
+Cada DATOS/<id> de MQTT o sondeo del maestro costaba un DATA/RESP completo por
+la mesh aunque el mismo nodo se hubiera leído segundos antes. ReadingCache
+responde con DSRNode.latest (la última lectura recibida por RESP o TELE)
+mientras tenga menos de `ttl` segundos, y si no pide una nueva:
+
+- Pedidos simultáneos del mismo nodo comparten un único DATA (coalescencia).
+- DSRNode sostiene una sola solicitud pendiente: los nodos distintos se piden
+  de a uno, el más antiguo primero, cuando el nodo queda libre.
+- Sin ruta, request_data sólo lanza un RREQ: el pedido se repite tras
+  RETRY_S segundos, duplicando la espera en cada intento (5, 10, 20 s...),
+  hasta REQUEST_TIMEOUT, y entonces se entrega None. Un nodo inalcanzable
+  cuesta así unos pocos RREQ por inundación y no uno cada RETRY_S.
+
+Los callbacks reciben (valor, antigüedad en segundos) o None. stats lleva los
+aciertos, fallos, pedidos sumados a uno en curso, DATA enviados y vencidos.
+
+Uso (en el hilo dueño del nodo, p. ej. a través de NodeOwner):
+    cache = ReadingCache(dsr_node, ttl=30)
+    cache.get("B", lambda reading: print(reading))
+    cache.process_timers()          # en cada pasada del bucle
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+
+class ReadingCache:
+    TTL = 30                # Segundos que una lectura se considera fresca
+    RETRY_S = 5             # Espera antes del primer reintento de un pedido sin respuesta; se duplica en cada uno
+    REQUEST_TIMEOUT = 62    # Segundos tras los que un pedido sin respuesta se entrega como None
+
+    def __init__(self, node, ttl=None):
+        self.node = node
+        self.ttl = self.TTL if ttl is None else ttl
+        self.pending = {}      # nodo -> [inicio, último envío, lectura previa, [callbacks], envíos]
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "requests": 0, "timeouts": 0}
+        node.subscribe("cache", ("RESP", "TELE"), self.on_reading)
+
+    def fresh(self, destination):
+        """(valor, antigüedad) si la última lectura de destination sigue fresca, o None."""
+        entry = self.node.latest.get(destination)
+        if entry is None:
+            return None
+        age = self.node.timestamp_message - entry[0]
+        return (entry[1], age) if age <= self.ttl else None
+
+    def get(self, destination, callback):
+        """
+        Entrega callback(lectura) al instante si está fresca y devuelve True; si no, pide una o se suma
+        al pedido en curso y devuelve False.
+        """
+        cached = self.fresh(destination)
+        if cached is not None:
+            self.stats["hits"] += 1
+            callback(cached)
+            return True
+        self.stats["misses"] += 1
+        entry = self.pending.get(destination)
+        if entry is not None:
+            self.stats["coalesced"] += 1
+            entry[3].append(callback)
+            return False
+        self.pending[destination] = [self.node.timestamp_message, None, self.node.latest.get(destination), [callback], 0]
+        self.process_timers()
+        return False
+
+    def on_reading(self, message):
+        """Suscriptor de RESP y TELE: corre después de DSRNode, con latest ya actualizado."""
+        entry = self.pending.get(message.source)
+        latest = self.node.latest.get(message.source)
+        if entry is None or latest is entry[2]:
+            return
+        self.resolve(message.source, (latest[1], self.node.timestamp_message - latest[0]))
+
+    def resolve(self, destination, reading):
+        callbacks = self.pending.pop(destination)[3]
+        for callback in callbacks:
+            try:
+                callback(reading)
+            except Exception as e:
+                self.node.log.error("Error entregando la lectura de %s: %s", destination, e)
+
+    def process_timers(self):
+        """Vence los pedidos viejos y, con el nodo libre, envía el DATA del pedido más antiguo."""
+        now = self.node.timestamp_message
+        for destination in list(self.pending):
+            if now - self.pending[destination][0] > self.REQUEST_TIMEOUT:
+                self.stats["timeouts"] += 1
+                self.resolve(destination, None)
+        if self.node.waiting_response:
+            return
+        due = [destination for destination, entry in self.pending.items()
+               if entry[1] is None or now - entry[1] >= self.RETRY_S << (entry[4] - 1)]
+        if not due:
+            return
+        destination = min(due, key=lambda d: (self.pending[d][1] is not None, self.pending[d][0]))
+        entry = self.pending[destination]
+        entry[1] = now
+        entry[4] += 1
+        self.stats["requests"] += 1
+        self.node.request_data(destination)
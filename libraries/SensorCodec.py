@@ -0,0 +1,146 @@
+"""
+Codificación compacta de lecturas de sensores
+=============================================
+
+Cada campo se cuantiza a punto fijo según el esquema (0.1 °C, 1e-5° en las
+coordenadas), se codifica como diferencia con la lectura anterior (la primera
+de un lote, con la última lectura confirmada por el receptor) y se escribe
+como varint.
+
+Las tramas LoRa de la red son texto separado por ':', así que los varints se
+escriben con dígitos imprimibles en vez de bytes: cada carácter lleva 5 bits,
+y el alfabeto indica si sigue otro dígito (MORE) o si es el último (FINAL).
+Los enteros con signo pasan antes por zigzag (0, -1, 1, -2... -> 0, 1, 2, 3...).
+Un campo sin dato (sensor ausente, GPS sin fix) se escribe como '~'.
+
+Lote:  C{esquema}{primera secuencia}@{timestamp base}[^{secuencia de referencia}]|{lecturas}
+Cada lectura es varint(dt) seguido de un varint por campo, sin separadores.
+
+Una lectura GPS + temperatura ocupa ~26 caracteres como texto y 4-6 en un lote.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+FINAL = "0123456789ABCDEFGHIJKLMNOPQRSTUV"
+MORE = "WXYZabcdefghijklmnopqrstuvwxyz-_"
+MISSING = "~"
+DIGITS = {}
+for _index, _char in enumerate(FINAL):
+    DIGITS[_char] = (_index, True)
+for _index, _char in enumerate(MORE):
+    DIGITS[_char] = (_index, False)
+
+# Esquemas conocidos por esclavos y gateway: (campo, factor de cuantización)
+SCHEMAS = {
+    "G": (("lon", 100000), ("lat", 100000), ("temp", 10)),  # Esclavo GPS + DS18B20
+    "T": (("temp", 10), ("hum", 10)),                       # Temperatura y humedad
+}
+
+
+def zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def unzigzag(value):
+    return -((value + 1) >> 1) if value & 1 else value >> 1
+
+
+def put_varint(out, value):
+    while value >= 32:
+        out.append(MORE[value & 31])
+        value >>= 5
+    out.append(FINAL[value])
+
+
+def get_varint(text, position):
+    value = shift = 0
+    while True:
+        digit, final = DIGITS[text[position]]
+        position += 1
+        value |= digit << shift
+        if final:
+            return value, position
+        shift += 5
+
+
+def quantize(schema, value):
+    """Enteros de punto fijo de una lectura (secuencia de números o texto 'a/b/c'); None si falta el dato."""
+    if isinstance(value, str):
+        value = value.split("/")
+    quantized = []
+    for index, (_, scale) in enumerate(SCHEMAS[schema]):
+        try:
+            quantized.append(int(round(float(value[index]) * scale)))
+        except (IndexError, TypeError, ValueError):
+            quantized.append(None)
+    return quantized
+
+
+def dequantize(schema, quantized):
+    return tuple(None if q is None else q / scale for q, (_, scale) in zip(quantized, SCHEMAS[schema]))
+
+
+def encode_batch(schema, samples, reference=None):
+    """
+    Lote de [(secuencia, timestamp, valor)] consecutivas. Con reference (una muestra que el
+    receptor ya tiene) la primera lectura también se codifica como diferencia.
+    """
+    if reference is not None:
+        previous, previous_ts = quantize(schema, reference[2]), reference[1]
+        header = "C%s%d@%d^%d|" % (schema, samples[0][0], previous_ts, reference[0])
+    else:
+        previous, previous_ts = [None] * len(SCHEMAS[schema]), samples[0][1]
+        header = "C%s%d@%d|" % (schema, samples[0][0], previous_ts)
+    out = []
+    for _, timestamp, value in samples:
+        put_varint(out, zigzag(timestamp - previous_ts))
+        previous_ts = timestamp
+        current = quantize(schema, value)
+        for q, last in zip(current, previous):
+            if q is None:
+                out.append(MISSING)
+            else:
+                put_varint(out, zigzag(q if last is None else q - last))
+        previous = current
+    return header + "".join(out)
+
+
+def decode_batch(text, reference=None):
+    """
+    Inversa de encode_batch: [(secuencia, timestamp, (campos...))]. reference(secuencia) debe
+    devolver el valor de esa lectura si el lote la usa; levanta ValueError si falta.
+    """
+    schema = text[1]
+    if schema not in SCHEMAS:
+        raise ValueError("esquema desconocido")
+    header, payload = text[2:].split("|", 1)
+    first_seq, _, base = header.partition("@")
+    base, _, reference_seq = base.partition("^")
+    previous_ts = int(base)
+    previous = [None] * len(SCHEMAS[schema])
+    if reference_seq:
+        value = reference(int(reference_seq)) if reference is not None else None
+        if value is None:
+            raise ValueError("lectura de referencia desconocida")
+        previous = quantize(schema, value)
+    samples = []
+    sequence, position = int(first_seq), 0
+    try:
+        while position < len(payload):
+            delta, position = get_varint(payload, position)
+            previous_ts += unzigzag(delta)
+            current = []
+            for last in previous:
+                if payload[position] == MISSING:
+                    current.append(None)
+                    position += 1
+                    continue
+                delta, position = get_varint(payload, position)
+                current.append(unzigzag(delta) if last is None else last + unzigzag(delta))
+            samples.append((sequence, previous_ts, dequantize(schema, current)))
+            previous = current
+            sequence += 1
+    except (KeyError, IndexError):
+        raise ValueError("lote truncado")
+    return samples
@@ -0,0 +1,351 @@
+"""
+Transmisión por slots (TDMA) sobre la hora de la red
+====================================================
+
+Sin cronograma todas las tramas salen al azar (ALOHA): HELLO, reenvíos de RREQ y
+respuestas chocan más cuantos más nodos hay. Con la hora común de TimeSync,
+SlotScheduler reparte el canal en tramas de tiempo de largo fijo (frame_ms):
+
+    | contienda | slot 0 | slot 1 | ... | slot n-1 | (libres) |
+
+- Contienda: los SLOTS, todo lo que envía un nodo que todavía no tiene slot y
+  el HELLO de cada nodo una de cada DISCOVERY_FRAMES tramas, para que lo
+  descubran los vecinos nuevos; cada trama sale tras una espera aleatoria.
+- Slots: el dueño transmite todo lo demás, propio y reenviado (también RREQ y
+  RREP), de a una trama mientras entre en lo que queda del slot. Los vecinos
+  escuchan sus slots, así que nada compite por el canal.
+
+El gateway (role "master") arma el cronograma. Cada nodo sincronizado sin slot
+envía JOIN a su padre de TimeSync, que lo reenvía hacia el gateway agregando su
+nombre; después, las rutas de los TELE y RESP que llegan al gateway dicen por qué
+relays viaja de verdad cada nodo. Los slots van del nodo más profundo al
+gateway, para que una lectura suba toda la mesh en una misma trama de tiempo, y
+cada relay suma un slot por nodo que atiende (hasta MAX_SLOTS y lo que entre en
+la trama). Si el reparto cambia hay versión nueva, a lo sumo una cada
+ISSUE_FRAMES tramas; viaja por inundación, y los HELLO llevan la versión que
+sigue el emisor: quien escucha a un vecino atrasado le repite el SLOTS vigente.
+
+    JOIN:{nodo}:{siguiente salto}:{relays recorridos}
+    SLOTS:{gateway}:{versión}:{frame_ms}:{slot_ms}:{contienda_ms}:{nodo*slots-nodo-...}
+    HELLO:{nodo}:{hora global en ms}:{nivel}:{versión}
+
+La radio duerme fuera de la contienda, de los slots propios y de los de sus
+vecinos; el gateway escucha siempre. Como cada nodo emite un HELLO por trama,
+un vecino o el padre de TimeSync se dan por perdidos tras TIMEOUT_FRAMES tramas
+en silencio. Sin hora de red o sin cronograma el nodo
+transmite al instante, como sin slots.
+
+En sentido gateway -> nodo las tramas cruzan un salto por trama de tiempo: con
+slots conviene la telemetría push y un HOP_ACK_TIMEOUT_MS mayor que frame_ms.
+
+Uso (antes de crear NodeRuntime o NodeOwner, que reciben el scheduler):
+    slots = SlotScheduler(nodo)
+    NodeRuntime(nodo, hello_ms=5000, scheduler=slots).run()
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import random
+from TimeSync import airtime_ms
+from DuplicateFilter import seq_diff, SEQ_MOD
+
+MTU = 255
+
+
+def frame_airtime(data):
+    """Tiempo en el aire de una trama; las de más de MTU bytes cuentan como FragmentLink las parte."""
+    packets = -(-len(data) // MTU)
+    return airtime_ms(min(len(data), MTU)) * packets
+
+
+class SlotLink:
+    """
+    Envoltorio de la radio que ve DSRNode: con cronograma send() sólo encola
+    (el HELLO de descubrimiento para la contienda, el resto para los slots propios)
+    y SlotScheduler transmite en su ventana.
+    """
+
+    def __init__(self, radio, limit=16):
+        self.radio = radio
+        self.limit = limit
+        self.control = []
+        self.data = []
+        self.dropped = 0
+        self.direct = True      # Sin cronograma: cada trama sale al instante
+        self.discovery = False  # El HELLO de esta trama de tiempo va en la contienda
+
+    @property
+    def on_receive(self):
+        return self.radio.on_receive
+
+    @on_receive.setter
+    def on_receive(self, callback):
+        self.radio.on_receive = callback
+
+    def __getattr__(self, name):
+        return getattr(self.radio, name)
+
+    def send(self, data):
+        if self.direct:
+            self.radio.send(data)
+            return
+        hello = data.startswith("HELLO:")
+        if hello and any(queued.startswith("HELLO:") for queued in self.control + self.data):
+            # Basta uno encolado: se arma de nuevo al transmitir
+            return
+        queue = self.control if (hello and self.discovery) or data.startswith("SLOTS:") else self.data
+        if len(queue) >= self.limit:
+            queue.pop(0)
+            self.dropped += 1
+        if hello:
+            # Adelante: de él dependen la hora de los vecinos y que no lo den por perdido
+            queue.insert(0, data)
+        else:
+            queue.append(data)
+
+    def flush(self):
+        """Transmite lo encolado (al perder el cronograma)."""
+        while self.control or self.data:
+            self.radio.send((self.control or self.data).pop(0))
+
+    def is_packet_received(self):
+        return self.radio.is_packet_received()
+
+    def get_packet(self, rssi=False):
+        return self.radio.get_packet(rssi)
+
+
+class SlotScheduler:
+    FRAME_MS = 20000            # Largo de la trama de tiempo: no cambia entre versiones del cronograma
+    SLOT_MS = 400               # Entra una trama de 255 bytes (~400 ms a SF7/125 kHz)
+    CONTENTION_MS = 4000        # Ventana de contienda al inicio de cada trama de tiempo
+    GUARD_MS = 10               # Margen al final de cada ventana por el error de sincronización
+    MAX_SLOTS = 4               # Slots máximos de un nodo (relays y gateway)
+    JOIN_INTERVAL_MS = 10000    # Espera entre JOIN mientras el nodo no figura en el cronograma
+    IDLE_MS = 100               # Período de process() sin cronograma
+    TIMEOUT_FRAMES = 3          # Tramas sin HELLO tras las que se pierde un vecino o el padre
+    DISCOVERY_FRAMES = 2        # Cada cuántas tramas el HELLO va en la contienda
+    ISSUE_FRAMES = 6            # (gateway) Tramas mínimas entre versiones del cronograma
+
+    def __init__(self, node, frame_ms=None, slot_ms=None, contention_ms=None):
+        self.node = node
+        self.link = SlotLink(node.lora)
+        node.lora = self.link
+        self.frame_ms = self.FRAME_MS if frame_ms is None else frame_ms
+        self.slot_ms = self.SLOT_MS if slot_ms is None else slot_ms
+        self.contention_ms = self.CONTENTION_MS if contention_ms is None else contention_ms
+        self.version = None
+        self.slots = []          # Dueño de cada slot, en orden
+        self.schedule = None     # Trama SLOTS vigente, para repetirla a los vecinos atrasados
+        self.entries = None      # Reparto vigente ("A*2-B")
+        self.members = {}        # (gateway) nodo -> relays hasta el gateway
+        self.dirty = False
+        self.issued_at = None
+        self.join_due = None
+        self.repair_due = None
+        self.backoff_until = None
+        self.awake = True
+        self.stats = {"joins": 0, "schedules": 0, "repairs": 0, "slot_frames": 0, "contention_frames": 0}
+        node.subscribe("slots", ("HELLO", "JOIN", "SLOTS", "TELE", "RESP"), self.on_message)
+
+    def send(self, payload):
+        # Directo al SlotLink (sin la cola de NodeRuntime), pero contado en las métricas del nodo
+        self.node.metrics.on_tx(payload)
+        self.link.send(payload)
+
+    def on_message(self, message):
+        if message.kind == "HELLO":
+            self.on_hello(message)
+        elif message.kind == "JOIN":
+            self.on_join(message)
+        elif message.kind in ("TELE", "RESP"):
+            if self.node.role == "master" and message.destination == self.node.node_id:
+                self.add_member(message.source, message.route)
+        elif self.version is None or seq_diff(message.msg_id, self.version) > 0:
+            self.apply(message.msg_id, *message.extra)
+            self.schedule = message.raw
+            if self.node.role != "master":
+                # Inundación: cada versión se retransmite una sola vez
+                self.send(message.raw)
+
+    def on_hello(self, message):
+        """Un vecino sincronizado con un cronograma más viejo (o ninguno) recibe el vigente, a lo sumo una vez por trama."""
+        if self.schedule is None or message.extra is None:
+            return
+        if message.msg_id is not None and seq_diff(self.version, message.msg_id) <= 0:
+            return
+        now = self.node.clock_sync.now_ms()
+        if now is None or (self.repair_due is not None and now - self.repair_due < 0):
+            return
+        self.repair_due = now + self.frame_ms
+        self.stats["repairs"] += 1
+        self.send(self.schedule)
+
+    def on_join(self, message):
+        if message.destination != self.node.node_id:
+            return
+        if self.node.role == "master":
+            self.stats["joins"] += 1
+            self.add_member(message.source, message.route)
+            return
+        parent = self.node.clock_sync.parent
+        if parent is not None and message.source != self.node.node_id:
+            route = message.route + [self.node.node_id]
+            self.send(f"JOIN:{message.source}:{parent}:{'-'.join(route)}")
+
+    def add_member(self, member, relays):
+        """(gateway) Registra por qué relays llega member; hay versión nueva si cambia el reparto."""
+        if self.members.get(member) != relays:
+            self.members[member] = relays
+            self.dirty = self.build_schedule() != self.entries
+
+    def apply(self, version, frame_ms, slot_ms, contention_ms, entries):
+        """Adopta un cronograma: 'A*2-B' son dos slots de A y uno de B."""
+        slots = []
+        for entry in entries.split("-"):
+            owner, _, count = entry.partition("*")
+            slots.extend([owner] * int(count or 1))
+        self.version = version
+        self.entries = entries
+        self.frame_ms = frame_ms
+        self.slot_ms = slot_ms
+        self.contention_ms = contention_ms
+        self.slots = slots
+        # Un HELLO por trama: los vencimientos por silencio se miden en tramas
+        timeout_ms = self.TIMEOUT_FRAMES * frame_ms
+        self.node.NEIGHBOR_TIMEOUT = max(type(self.node).NEIGHBOR_TIMEOUT, timeout_ms // 1000)
+        self.node.clock_sync.PARENT_TIMEOUT_MS = max(type(self.node.clock_sync).PARENT_TIMEOUT_MS, timeout_ms)
+
+    def build_schedule(self):
+        """(gateway) Slots del nodo más profundo al gateway; cada relay suma uno por nodo que atiende."""
+        gateway = self.node.node_id
+        depth = {gateway: 0}
+        load = {gateway: 1}
+        for member, relays in self.members.items():
+            depth[member] = len(relays) + 1
+            load.setdefault(member, 1)
+            for index, relay in enumerate(relays):
+                depth.setdefault(relay, len(relays) - index)
+                load[relay] = load.get(relay, 1) + 1
+            load[gateway] += 1
+        order = sorted(load, key=lambda n: (-depth[n], n))
+        counts = {n: min(load[n], self.MAX_SLOTS) for n in order}
+        capacity = (self.frame_ms - self.contention_ms) // self.slot_ms
+        while sum(counts.values()) > capacity and max(counts.values()) > 1:
+            counts[max(counts, key=counts.get)] -= 1
+        # Si ni con un slot por nodo alcanza, los más profundos siguen en la contienda
+        order = order[len(order) - capacity:] if len(order) > capacity else order
+        return "-".join(n if counts[n] == 1 else f"{n}*{counts[n]}" for n in order)
+
+    def issue(self):
+        """(gateway) Nueva versión del cronograma, difundida en la próxima contienda."""
+        self.dirty = False
+        self.issued_at = self.node.clock_sync.now_ms()
+        version = random.randint(0, SEQ_MOD - 1) if self.version is None else (self.version + 1) % SEQ_MOD
+        entries = self.build_schedule()
+        self.apply(version, self.frame_ms, self.slot_ms, self.contention_ms, entries)
+        self.stats["schedules"] += 1
+        self.schedule = f"SLOTS:{self.node.node_id}:{version}:{self.frame_ms}:{self.slot_ms}:{self.contention_ms}:{entries}"
+        self.send(self.schedule)
+
+    def listen(self, on):
+        if on == self.awake:
+            return
+        self.awake = on
+        if on:
+            self.link.radio.set_mode_rx_continuous()
+        else:
+            self.link.radio.set_mode_sleep()
+
+    def transmit(self, data):
+        if data.startswith("HELLO:"):
+            # La hora de la baliza se toma al salir, no al encolar
+            data = self.node.hello_message()
+            if data.count(":") == 3:
+                data += f":{self.version}"
+        self.link.radio.send(data)
+
+    def join(self, now):
+        """Envía JOIN al padre de TimeSync mientras el nodo no figure en el cronograma."""
+        parent = self.node.clock_sync.parent
+        if parent is None or self.node.node_id in self.slots:
+            self.join_due = None
+            return
+        if self.join_due is not None and now - self.join_due < 0:
+            return
+        self.join_due = now + self.JOIN_INTERVAL_MS + random.randint(0, self.JOIN_INTERVAL_MS // 2)
+        self.send(f"JOIN:{self.node.node_id}:{parent}:")
+
+    def process(self):
+        """Transmite lo que corresponde a la ventana actual y duerme o despierta la radio; devuelve los ms hasta volver a llamarlo."""
+        node = self.node
+        now = node.clock_sync.now_ms()
+        master = node.role == "master"
+        if master and now is not None and self.due_issue(now):
+            self.issue()
+        if now is None or not self.slots:
+            self.link.direct = True
+            self.link.flush()
+            self.listen(True)
+            return self.IDLE_MS
+        self.link.direct = False
+        if not master:
+            self.join(now)
+        position = now % self.frame_ms
+        self.link.discovery = (now // self.frame_ms) % self.DISCOVERY_FRAMES == 0
+        if position < self.contention_ms:
+            return self.contend(now, self.contention_ms - position)
+        self.backoff_until = None
+        offset = position - self.contention_ms
+        index = offset // self.slot_ms
+        remaining = self.slot_ms - offset % self.slot_ms
+        if index >= len(self.slots):
+            # Slots libres hasta el final de la trama
+            self.listen(master or node.node_id not in self.slots)
+            return max(1, int(self.frame_ms - position))
+        owner = self.slots[index]
+        if owner == node.node_id:
+            self.listen(True)
+            if self.link.data and frame_airtime(self.link.data[0]) + self.GUARD_MS <= remaining:
+                # De a una: la radio termina cada trama antes de armar la siguiente (y su hora, si es HELLO)
+                airtime = frame_airtime(self.link.data[0])
+                self.stats["slot_frames"] += 1
+                self.transmit(self.link.data.pop(0))
+                return max(1, int(airtime) + 1)
+        else:
+            # También los vecinos dados por perdidos: su próximo HELLO puede estar en este slot
+            self.listen(master or node.node_id not in self.slots or owner in node.neighbors or owner in node.lost_neighbors)
+        return max(1, int(remaining))
+
+    def due_issue(self, now):
+        """(gateway) Primera versión, o nodos nuevos y ISSUE_FRAMES tramas desde la anterior; siempre fuera de la contienda."""
+        if now % self.frame_ms < self.contention_ms:
+            return False
+        if self.version is None:
+            return True
+        return self.dirty and now - self.issued_at >= self.ISSUE_FRAMES * self.frame_ms
+
+    def contend(self, now, remaining):
+        """Contienda: una trama por vez, cada una tras una espera aleatoria."""
+        self.listen(True)
+        queue = self.link.control
+        if not queue and self.node.node_id not in self.slots:
+            queue = self.link.data
+        if not queue:
+            self.backoff_until = None
+            return max(1, int(remaining))
+        if self.backoff_until is None:
+            self.backoff_until = now + random.randint(0, max(0, int(remaining) - self.SLOT_MS))
+        wait = self.backoff_until - now
+        if wait > 0:
+            return min(wait, max(1, int(remaining)))
+        airtime = frame_airtime(queue[0])
+        if airtime + self.GUARD_MS > remaining:
+            # No entra: espera a la contienda siguiente
+            self.backoff_until = None
+            return max(1, int(remaining))
+        self.stats["contention_frames"] += 1
+        self.transmit(queue.pop(0))
+        self.backoff_until = now + int(airtime) + random.randint(0, self.contention_ms // 4)
+        return max(1, int(airtime))
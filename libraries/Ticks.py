@@ -0,0 +1,29 @@
+"""
+Relojes de ticks para la placa y el host
+========================================
+
+ticks_ms, ticks_us y ticks_diff de MicroPython; en CPython (simulador,
+benchmarks) equivalentes con time.monotonic y time.perf_counter_ns, sin
+desborde, así que ticks_diff es una resta.
+
+Los módulos los importan de aquí (from Ticks import ticks_ms, ticks_diff):
+el simulador sigue pudiendo reemplazar el ticks_ms de un módulo por su reloj
+virtual.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import time
+
+try:
+    from time import ticks_ms, ticks_us, ticks_diff  # type: ignore
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(new, old):
+        return new - old
@@ -0,0 +1,142 @@
+"""
+Sincronización de reloj de la red por balizas
+=============================================
+
+El gateway (referencia, nivel 0) agrega su hora en milisegundos a cada HELLO; un
+nodo sincronizado la retransmite en los suyos con su nivel + 1, así la hora baja
+por la mesh salto a salto:
+
+    HELLO:{nodo}:{hora global en ms}:{nivel}
+
+Cada nodo sigue al vecino de menor nivel (su padre) y, por cada baliza, guarda
+el par (ticks_ms de la interrupción de RX, hora global del emisor + tiempo en el
+aire de la trama + TX_DELAY_MS). Con los últimos SAMPLES pares estima por
+mínimos cuadrados la hora global y la deriva de su cristal respecto del
+gateway, y con eso da la hora entre balizas. Si el padre calla PARENT_TIMEOUT_MS
+el nodo deja de emitir la hora (sigue dándola con la última estimación) y adopta
+al primer vecino sincronizado que escuche.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+from Ticks import ticks_ms, ticks_diff
+
+# Modulación configurada en LoRa.init_lora: SF7, 125 kHz, CR 4/5, preámbulo de 8 símbolos
+LORA_SF = 7
+LORA_BW = 125000
+LORA_CR = 5
+LORA_PREAMBLE = 8
+
+
+def airtime_ms(length):
+    """Tiempo en el aire de una trama de `length` bytes (fórmula del datasheet del SX1276, header explícito, sin CRC)."""
+    t_sym = (1 << LORA_SF) * 1000 / LORA_BW
+    low_dr = 1 if t_sym > 16 else 0
+    numerator = 8 * length - 4 * LORA_SF + 28
+    symbols = 8 + max(-(-numerator // (4 * (LORA_SF - 2 * low_dr))) * LORA_CR, 0)
+    return (LORA_PREAMBLE + 4.25 + symbols) * t_sym
+
+
+class TimeSync:
+    SAMPLES = 8                 # Balizas del padre en la regresión
+    MAX_DRIFT = 0.0005          # Deriva máxima creíble (500 ppm); más indica una baliza errónea
+    MAX_LEVEL = 8               # Niveles máximos (saltos desde el gateway)
+    PARENT_TIMEOUT_MS = 60000   # Silencio del padre tras el que se pierde la sincronización
+    TX_DELAY_MS = 0             # Demora fija entre la marca de hora y el inicio de la TX (calibrar en la placa)
+
+    def __init__(self, ticks=None, log=None):
+        self.ticks = ticks if ticks is not None else ticks_ms
+        self.log = log          # NodeLog del nodo (None = print)
+        self.level = None       # None: sin sincronizar; 0: referencia
+        self.parent = None
+        self.points = []        # [(ticks de RX, hora global)] del padre, del más viejo al más nuevo
+        self.anchor = None      # (ticks, hora global) sobre la recta estimada
+        self.rate = 1.0         # ms globales por ms locales (1 + deriva)
+        self.compensate = True  # Sumar la demora de propagación a cada baliza
+
+    def set_reference(self, global_ms):
+        """Convierte al nodo en la referencia de la red con la hora global indicada."""
+        self.level = 0
+        self.parent = None
+        self.points = []
+        self.anchor = (self.ticks(), global_ms)
+        self.rate = 1.0
+
+    def synced(self):
+        return self.level is not None
+
+    def reset(self):
+        self.level = None
+        self.parent = None
+        self.points = []
+        self.anchor = None
+        self.rate = 1.0
+
+    def now_ms(self):
+        """Hora global estimada en ms, o None sin sincronizar."""
+        if self.anchor is None:
+            return None
+        rx, global_ms = self.anchor
+        return global_ms + int(round(self.rate * ticks_diff(self.ticks(), rx)))
+
+    def drift_ppm(self):
+        return (self.rate - 1.0) * 1e6
+
+    def beacon(self):
+        """Campos de hora para el HELLO propio, o None sin sincronizar."""
+        if self.level is None or self.level >= self.MAX_LEVEL:
+            return None
+        return self.now_ms(), self.level
+
+    def on_beacon(self, sender, global_ms, level, rx_ms, length):
+        """Procesa la hora de un HELLO de sender recibido en rx_ms (ticks) con length bytes."""
+        if self.level == 0:
+            return
+        if sender == self.parent and level >= self.level:
+            # El padre tomó la hora de este nodo (o de más lejos): se corta el bucle
+            self.reset()
+            return
+        if sender != self.parent:
+            if self.level is not None and level + 1 >= self.level:
+                return
+            # Vecino más cerca del gateway: se lo adopta como padre
+            self.parent = sender
+            self.points = []
+            self.rate = 1.0
+        self.level = level + 1
+        if self.compensate:
+            global_ms += int(round(airtime_ms(length) + self.TX_DELAY_MS))
+        self.points.append((rx_ms, global_ms))
+        del self.points[:-self.SAMPLES]
+        self.anchor = (rx_ms, global_ms)
+        self.fit()
+
+    def fit(self):
+        """Recta por mínimos cuadrados sobre las balizas, relativas a la última (evita números grandes)."""
+        if len(self.points) < 2:
+            return
+        rx_last, global_last = self.points[-1]
+        xs = [ticks_diff(rx, rx_last) for rx, _ in self.points]
+        ys = [global_ms - global_last for _, global_ms in self.points]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        var = sum((x - mean_x) ** 2 for x in xs)
+        if var == 0:
+            return
+        rate = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+        if abs(rate - 1.0) <= self.MAX_DRIFT:
+            self.rate = rate
+            # Ancla sobre la recta: una baliza suelta con más demora no hace saltar la hora
+            self.anchor = (rx_last, global_last + int(round(mean_y - rate * mean_x)))
+
+    def expire(self):
+        """Pierde la sincronización si el padre dejó de emitir balizas; la hora sigue con la última recta."""
+        if self.parent is not None and ticks_diff(self.ticks(), self.points[-1][0]) > self.PARENT_TIMEOUT_MS:
+            if self.log is not None:
+                self.log.info("Sin balizas de %s: reloj sin sincronizar", self.parent)
+            else:
+                print(f"Sin balizas de {self.parent}: reloj sin sincronizar")
+            self.level = None
+            self.parent = None
+            self.points = []
@@ -0,0 +1,226 @@
+"""
+Topología de la red en el gateway
+=================================
+
+Cada nodo informa su tabla de vecinos (vecino y RSSI redondeado a
+DSRNode.RSSI_STEP) tras un cambio y cada tanto aunque nada cambie. El informe
+viaja en el próximo TELE al gateway si sale a tiempo, o en un TOPO propio:
+
+    TOPO:{origen}:{gateway}:{id}:{ruta}:{B-85,C-90}:{checksum}
+
+TopologyGraph guarda la última fila de cada nodo y arma con ellas el grafo de
+enlaces. Un enlace vale lo que diga el informe más nuevo de sus dos extremos
+(así un vecino perdido se borra aunque el otro extremo todavía no informe) y
+su RSSI es el promedio de ambos sentidos. Las filas sin renovar en `stale`
+segundos se descartan.
+
+Consultas (en el hilo dueño del nodo; se recalculan sólo si el grafo cambió):
+- shortest_path(a, b): camino de menos saltos.
+- betweenness(): fracción de los caminos mínimos entre pares que pasa por cada
+  nodo (Brandes); los valores altos son cuellos de botella.
+- bottlenecks(count): los `count` nodos de mayor betweenness.
+- partitions(): componentes conexas, la del gateway primero.
+- snapshot(): el grafo como dict listo para JSON.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import time
+
+from DSRMessage import decode_table
+
+
+class TopologyGraph:
+    STALE_S = 1800      # Segundos sin informe tras los que se descarta la fila de un nodo
+
+    def __init__(self, node, stale=None):
+        self.node = node
+        self.stale = self.STALE_S if stale is None else stale
+        self.rows = {}         # nodo -> {vecino: RSSI}
+        self.reported_at = {}  # nodo -> hora del último informe
+        self.version = 0       # Aumenta con cada cambio del grafo; invalida el caché
+        self.cache = {}        # consulta -> (versión, resultado)
+        self.stats = {"reports": 0, "changes": 0, "piggybacked": 0}
+        node.subscribe("topology", ("TELE", "TOPO"), self.on_report)
+
+    def on_report(self, message):
+        """Suscriptor de TELE y TOPO: toma la tabla de vecinos de los informes dirigidos al gateway."""
+        if message.destination != self.node.node_id:
+            return
+        table = message.extra if message.kind == "TOPO" else message.extra[2]
+        if table is None or not self.node.verify_checksum(message.raw):
+            return
+        try:
+            row = decode_table(table)
+        except ValueError:
+            self.node.log.warning("Tabla de vecinos inválida de %s: %s", message.source, table)
+            return
+        if message.kind == "TELE":
+            self.stats["piggybacked"] += 1
+        self.update(message.source, row)
+
+    def update(self, node_id, row, now=None):
+        """Reemplaza la fila de node_id con su último informe."""
+        self.stats["reports"] += 1
+        self.reported_at[node_id] = time.time() if now is None else now
+        if self.rows.get(node_id) != row:
+            self.rows[node_id] = row
+            self.changed()
+
+    def changed(self):
+        self.version += 1
+        self.stats["changes"] += 1
+
+    def expire(self, now=None):
+        """Descarta las filas de los nodos que no informan hace más de `stale` segundos."""
+        now = time.time() if now is None else now
+        for node_id, reported in list(self.reported_at.items()):
+            if now - reported > self.stale:
+                del self.reported_at[node_id]
+                del self.rows[node_id]
+                self.changed()
+
+    def own_row(self):
+        """Vecinos del gateway según sus propios HELLO."""
+        node = self.node
+        return {n: rssi for n, rssi in node.neighbor_rssi.items() if n in node.neighbors}
+
+    def edges(self):
+        """{(a, b): RSSI} con a < b según el informe más nuevo de cada extremo."""
+        own = self.node.node_id
+        rows = dict(self.rows)
+        rows[own] = self.own_row()
+        newest = dict(self.reported_at)
+        newest[own] = float("inf")  # La fila propia siempre está al día
+        pairs = set()
+        for a, row in rows.items():
+            for b in row:
+                if a != b:
+                    pairs.add((a, b) if a < b else (b, a))
+        links = {}
+        for a, b in pairs:
+            # Decide el extremo con el informe más nuevo; si el otro no informa, vale el que hay
+            if b not in rows or (a in rows and newest[a] >= newest[b]):
+                decider, other = a, b
+            else:
+                decider, other = b, a
+            if other not in rows[decider]:
+                continue
+            values = [rows[x][y] for x, y in ((a, b), (b, a)) if x in rows and y in rows[x]]
+            links[(a, b)] = sum(values) / len(values)
+        return links
+
+    def adjacency(self):
+        return self.cached("adjacency", self.build_adjacency)
+
+    def build_adjacency(self):
+        adjacency = {self.node.node_id: set()}
+        for a, b in self.edges():
+            adjacency.setdefault(a, set()).add(b)
+            adjacency.setdefault(b, set()).add(a)
+        return adjacency
+
+    def cached(self, name, compute):
+        # La fila propia cambia sin informe: se la suma a la versión del caché
+        version = (self.version, tuple(sorted(self.own_row())))
+        entry = self.cache.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, compute())
+            self.cache[name] = entry
+        return entry[1]
+
+    def shortest_path(self, source, destination):
+        """Lista de nodos de source a destination con menos saltos, o None si no están conectados."""
+        adjacency = self.adjacency()
+        if source not in adjacency or destination not in adjacency:
+            return None
+        previous = {source: None}
+        queue = [source]
+        for current in queue:
+            if current == destination:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = previous[current]
+                return path[::-1]
+            for neighbor in sorted(adjacency[current]):
+                if neighbor not in previous:
+                    previous[neighbor] = current
+                    queue.append(neighbor)
+        return None
+
+    def betweenness(self):
+        """{nodo: fracción de los caminos mínimos entre otros pares que pasan por él} (Brandes, sin pesos)."""
+        return self.cached("betweenness", self.build_betweenness)
+
+    def build_betweenness(self):
+        adjacency = self.adjacency()
+        score = dict.fromkeys(adjacency, 0.0)
+        for source in sorted(adjacency):
+            order = []
+            parents = {source: []}
+            paths = {source: 1}
+            distance = {source: 0}
+            queue = [source]
+            for current in queue:
+                order.append(current)
+                # En orden: las sumas (y los empates del ranking) no dependen del hash de cada proceso
+                for neighbor in sorted(adjacency[current]):
+                    if neighbor not in distance:
+                        distance[neighbor] = distance[current] + 1
+                        paths[neighbor] = 0
+                        parents[neighbor] = []
+                        queue.append(neighbor)
+                    if distance[neighbor] == distance[current] + 1:
+                        paths[neighbor] += paths[current]
+                        parents[neighbor].append(current)
+            dependency = dict.fromkeys(order, 0.0)
+            for current in reversed(order):
+                for parent in parents[current]:
+                    dependency[parent] += paths[parent] / paths[current] * (1 + dependency[current])
+                if current != source:
+                    score[current] += dependency[current]
+        # Cada par se contó en ambos sentidos; se normaliza por los pares que excluyen al nodo
+        count = len(adjacency)
+        pairs = (count - 1) * (count - 2) if count > 2 else 1
+        return {node_id: value / pairs for node_id, value in score.items()}
+
+    def bottlenecks(self, count=3):
+        """[(nodo, betweenness)] de los `count` nodos por los que pasan más caminos mínimos."""
+        ranking = sorted(self.betweenness().items(), key=lambda item: (-item[1], item[0]))
+        return [(node_id, round(value, 3)) for node_id, value in ranking[:count] if value > 0]
+
+    def partitions(self):
+        """Componentes conexas como listas ordenadas; la del gateway primero."""
+        return self.cached("partitions", self.build_partitions)
+
+    def build_partitions(self):
+        adjacency = self.adjacency()
+        own = self.node.node_id
+        seen = set()
+        components = []
+        for start in [own] + sorted(adjacency):
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            for current in component:
+                for neighbor in adjacency[current]:
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        component.append(neighbor)
+            components.append(sorted(component))
+        return components
+
+    def snapshot(self):
+        """Grafo completo para JSON: nodos, enlaces con RSSI y antigüedad de cada informe."""
+        now = time.time()
+        return {
+            "gateway": self.node.node_id,
+            "nodes": sorted(self.adjacency()),
+            "links": [[a, b, round(rssi)] for (a, b), rssi in sorted(self.edges().items())],
+            "age": {node_id: int(now - reported) for node_id, reported in self.reported_at.items()},
+            "partitions": self.partitions(),
+            "version": self.version,
+        }
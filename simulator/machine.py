@@ -0,0 +1,57 @@
+"""
+Emulación del módulo `machine` de MicroPython para el simulador
+================================================================
+
+Sólo implementa lo que usan las librerías de la red mesh (Timer y RTC).
+Los temporizadores y el RTC se apoyan en el reloj virtual que el simulador
+registra en CLOCK antes de crear los nodos.
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import time
+
+CLOCK = None  # Reloj virtual activo (mesh_sim.VirtualClock)
+
+
+class Timer:
+    """Temporizador por software ejecutado por el reloj virtual."""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timer_id=-1):
+        self.timer_id = timer_id
+        self._generation = 0
+
+    def init(self, period=1000, mode=PERIODIC, callback=None):
+        self._generation += 1
+        generation = self._generation
+
+        def fire():
+            if generation != self._generation:
+                return
+            if mode == Timer.PERIODIC:
+                CLOCK.schedule(period, fire)
+            callback(self)
+
+        CLOCK.schedule(period, fire)
+
+    def deinit(self):
+        self._generation += 1
+
+
+class RTC:
+    """Reloj de tiempo real derivado del reloj virtual."""
+
+    def __init__(self):
+        self.offset = 0
+
+    def datetime(self, value=None):
+        if value is not None:
+            year, month, day, _, hour, minute, second, _ = value
+            target = time.mktime((year, month, day, hour, minute, second, 0, 0, 0))
+            self.offset = target - CLOCK.time()
+            return None
+        t = time.localtime(CLOCK.time() + self.offset)
+        return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
@@ -0,0 +1,1441 @@
+"""
+Simulador de la Red Mesh LoRa
+=============================
+
+Ejecuta varias instancias reales de DSRNode (libraries/DSRNode.py) sobre radios
+emuladas, con un reloj virtual que reemplaza a machine.Timer, time.time y el RTC.
+Permite medir el comportamiento del protocolo sin placas ni tiempo real.
+
+Topologías: línea, grilla y nodos al azar (random_geometric) con RSSI de un modelo
+log-distancia con sombra por enlace (Propagation). El medio descuenta el tiempo en el
+aire de cada trama y, según el escenario, agrega desvanecimiento por trama, pérdida
+aleatoria y colisiones entre tramas solapadas, con o sin efecto captura.
+
+Escenarios disponibles:
+- discovery: descubrimientos de ruta sucesivos entre pares aleatorios; compara
+  latencia y cantidad de RREQ transmitidos con y sin respuestas desde la caché.
+- reliability: solicitudes DATA/RESP entre esquinas opuestas con pérdida de tramas
+  y la caída de un relay de la ruta; compara sin ACK por salto, ACK explícito y pasivo.
+- batch: lecturas periódicas de un esclavo a 3 saltos; compara una solicitud DATA/RESP
+  por lectura con pedidos por lote ("desde la última secuencia recibida"), en texto y
+  con SensorCodec.
+- push: lecturas por segundo de aire con sondeo DATA/RESP y con telemetría push
+  (programada, con TACK del gateway y en lotes), con pérdida de tramas.
+- fragment: tramas más largas que un paquete LoRa entre dos vecinos con pérdida;
+  compara sin fragmentar, fragmentos sin FNACK y con retransmisión selectiva.
+- cache: pedidos de lectura de varios clientes al gateway sobre pocos nodos; compara
+  un DATA por pedido, la coalescencia de pedidos simultáneos y ReadingCache con TTL.
+- timesync: nodos con relojes desfasados y con deriva sincronizados por las balizas
+  HELLO del gateway; error de la hora estimada sin compensar la demora, compensándola
+  y estimando además la deriva.
+- tdma: telemetría push de toda la grilla con colisiones en el medio; compara ALOHA
+  (transmitir al tener la trama) con SlotScheduler: lecturas por minuto y consumo de la radio.
+  "TDMA API" arma el gateway como master_api (FragmentLink y el cronograma en NodeOwner).
+- anycast: telemetría push con TACK de toda la grilla al gateway más cercano con 1, 2 y 4
+  gateways que se anuncian; saltos, aire por lectura, caída de un gateway y lecturas
+  duplicadas con y sin intercambio de marcas entre gateways.
+- topology: dos grillas unidas por un único nodo puente informan sus vecinos al gateway
+  (TopologyGraph); enlaces conocidos, aire de los informes en TOPO propios y dentro del
+  TELE, el puente como cuello de botella y el tiempo en detectar la partición al caer.
+- scale: cientos de nodos al azar con propagación, desvanecimiento y colisiones
+  empujando telemetría al gateway del centro; entrega, saltos, aire por lectura y
+  cuántas veces más rápido que el tiempo real corre la simulación.
+- runtime: en tiempo real sobre asyncio, latencia de solicitudes en una línea con el
+  bucle de sondeo del firmware (sleep de 1 s) y con NodeRuntime (RX por interrupción).
+
+Uso:
+    python simulator/mesh_sim.py discovery --topology grid --size 5 --queries 30
+    python simulator/mesh_sim.py reliability --size 4 --loss 0.1 --requests 20
+    python simulator/mesh_sim.py batch --size 4 --samples 60 --batch 10
+    python simulator/mesh_sim.py push --size 4 --samples 60 --loss 0.05
+    python simulator/mesh_sim.py fragment --bytes 1000 --loss 0.1
+    python simulator/mesh_sim.py cache --size 3 --requests 120 --ttl 30
+    python simulator/mesh_sim.py timesync --size 4 --minutes 10
+    python simulator/mesh_sim.py tdma --size 4 --minutes 20 --sample-ms 20000
+    python simulator/mesh_sim.py anycast --size 5 --minutes 20 --sample-ms 10000
+    python simulator/mesh_sim.py topology --size 3 --minutes 20
+    python simulator/mesh_sim.py scale --nodes 50 100 200 --minutes 10
+    python simulator/mesh_sim.py discovery --topology random --size 100 --queries 30
+    python simulator/mesh_sim.py runtime --size 4 --requests 3
+
+Autores: Francisco Fernández & Nahuel Ontivero
+Universidad: UTN - Facultad Regional Tucumán
+"""
+
+import argparse
+import asyncio
+import contextlib
+import heapq
+import io
+import math
+import os
+import random
+import sys
+import time as host_time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "libraries"))
+sys.path.insert(0, HERE)
+
+import machine  # noqa: E402  (emulación local de MicroPython)
+import DSRNode as dsr_module  # noqa: E402
+from NodeRuntime import NodeRuntime  # noqa: E402
+from NodeOwner import NodeOwner  # noqa: E402
+from NodeLog import DEBUG  # noqa: E402
+import FragmentLink as fragment_module  # noqa: E402
+from ReadingCache import ReadingCache  # noqa: E402
+from SlotScheduler import SlotScheduler  # noqa: E402
+from TopologyGraph import TopologyGraph  # noqa: E402
+
+EPOCH = 1767225600  # 2026-01-01 00:00:00 UTC, origen del reloj virtual
+
+
+def lora_airtime_ms(length, sf=7, bw=125000, cr=5, preamble=8, crc=False, explicit_header=True):
+    """Tiempo en el aire de una trama LoRa según la fórmula del datasheet del SX1276."""
+    t_sym = (2 ** sf) / bw * 1000
+    low_dr = 1 if t_sym > 16 else 0
+    ih = 0 if explicit_header else 1
+    numerator = 8 * length - 4 * sf + 28 + 16 * (1 if crc else 0) - 20 * ih
+    payload_symbols = 8 + max(math.ceil(numerator / (4 * (sf - 2 * low_dr))) * cr, 0)
+    return (preamble + 4.25) * t_sym + payload_symbols * t_sym
+
+
+class VirtualClock:
+    """Cola de eventos discretos con el tiempo virtual en milisegundos."""
+
+    def __init__(self):
+        self.now_ms = 0
+        self._events = []
+        self._sequence = 0
+
+    def schedule(self, delay_ms, callback, *args):
+        self._sequence += 1
+        heapq.heappush(self._events, (self.now_ms + delay_ms, self._sequence, callback, args))
+
+    def run_until(self, end_ms):
+        while self._events and self._events[0][0] <= end_ms:
+            when, _, callback, args = heapq.heappop(self._events)
+            self.now_ms = when
+            callback(*args)
+        self.now_ms = end_ms
+
+    def ticks_ms(self):
+        return int(self.now_ms)
+
+    def time(self):
+        return EPOCH + int(self.now_ms // 1000)
+
+
+class AsyncioClock:
+    """Reloj de tiempo real sobre el loop de asyncio, con la interfaz de VirtualClock."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.start = loop.time()
+
+    @property
+    def now_ms(self):
+        return (self.loop.time() - self.start) * 1000
+
+    def schedule(self, delay_ms, callback, *args):
+        self.loop.call_later(delay_ms / 1000, callback, *args)
+
+    def ticks_ms(self):
+        return int(self.now_ms)
+
+    def time(self):
+        return EPOCH + int(self.now_ms // 1000)
+
+
+class VirtualTime:
+    """Reemplazo del módulo time dentro de DSRNode: el tiempo avanza con el reloj virtual."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.localtime = host_time.localtime
+
+    def mktime(self, t):
+        # En MicroPython mktime devuelve un entero
+        return int(host_time.mktime(t))
+
+    def time(self):
+        return self.clock.time()
+
+    def monotonic(self):
+        return self.clock.now_ms / 1000
+
+
+class EmulatedRadio:
+    """
+    Radio con la misma interfaz que el driver LoRa (send, is_packet_received, get_packet).
+    Como el driver, encola hasta RX_QUEUE_LEN paquetes sin leer y descarta el más viejo si se llena.
+    Las tramas de más de MAX_PKT_LENGTH no salen al aire (se cuentan en medium.oversize).
+    """
+    RX_QUEUE_LEN = 8
+    MAX_PKT_LENGTH = 255
+
+    def __init__(self, medium, node_id):
+        self.medium = medium
+        self.node_id = node_id
+        self.rx_queue = []
+        self.rx_dropped = 0
+        self.busy_until = 0
+        self.tx_intervals = []   # [(inicio, fin)] de las transmisiones en curso o por salir
+        self.on_receive = None
+        self.ticks = medium.clock.ticks_ms   # Reloj local que marca las recepciones (el escenario timesync lo desvía)
+        # Estados de la radio para el consumo: TX, sleep y el resto escuchando
+        self.tx_ms = 0.0
+        self.sleep_ms = 0.0
+        self.asleep = False
+        self.sleep_start = 0
+        self.awake_since = 0
+
+    def set_mode_sleep(self):
+        if not self.asleep:
+            self.asleep = True
+            self.sleep_start = self.medium.clock.now_ms
+
+    def set_mode_rx_continuous(self):
+        if self.asleep:
+            self.asleep = False
+            now = self.medium.clock.now_ms
+            self.sleep_ms += now - self.sleep_start
+            self.awake_since = now
+
+    def radio_times(self):
+        """(ms en TX, ms durmiendo) hasta ahora."""
+        sleep_ms = self.sleep_ms + (self.medium.clock.now_ms - self.sleep_start if self.asleep else 0)
+        return self.tx_ms, sleep_ms
+
+    def send(self, data):
+        if len(data) > self.MAX_PKT_LENGTH:
+            self.medium.oversize += 1
+            return
+        self.medium.transmit(self, data)
+
+    def deliver(self, payload, rssi):
+        if len(self.rx_queue) >= self.RX_QUEUE_LEN:
+            self.rx_queue.pop(0)
+            self.rx_dropped += 1
+        self.rx_queue.append((payload, rssi, self.ticks()))
+        if self.on_receive is not None:
+            self.on_receive()
+
+    def is_packet_received(self):
+        return len(self.rx_queue) > 0
+
+    def get_packet(self, rssi=False):
+        if not self.rx_queue:
+            return None
+        payload, packet_rssi, rx_ms = self.rx_queue.pop(0)
+        packet_info = {"payload": payload, "rx_ms": rx_ms}
+        if rssi:
+            packet_info["rssi"] = packet_rssi
+        return packet_info
+
+
+class Propagation:
+    """
+    Modelo log-distancia del enlace LoRa (915 MHz, 17 dBm, SF7/125 kHz como LoRa.init_lora).
+    El RSSI medio de un enlace baja 10·EXPONENT dB por década de distancia y suma una sombra
+    fija por enlace (N(0, SHADOWING_DB)); cada trama suma además un desvanecimiento
+    N(0, FADING_DB) y se pierde si queda por debajo de la sensibilidad del SX1276.
+    """
+    TX_POWER = 17           # dBm (PA_BOOST)
+    PATH_LOSS_1M = 31.7     # dB a 1 m en espacio libre a 915 MHz
+    EXPONENT = 3.0          # Exponente de pérdida: 2 espacio libre, ~3 campo con vegetación
+    SHADOWING_DB = 4.0
+    FADING_DB = 3.0
+    SENSITIVITY = -123      # dBm a SF7/125 kHz
+    LINK_MARGIN_DB = 10     # Margen sobre la sensibilidad con el que se planifica la distancia entre nodos
+    NEIGHBOR_QOS = -115     # quality_neighbor de los nodos: con el -80 por defecto casi ningún enlace es vecino
+
+    def mean_rssi(self, distance):
+        return self.TX_POWER - self.PATH_LOSS_1M - 10 * self.EXPONENT * math.log10(max(distance, 1.0))
+
+    def range_m(self, margin_db=0):
+        """Distancia a la que el RSSI medio (sin sombra) queda margin_db sobre la sensibilidad."""
+        return 10 ** ((self.TX_POWER - self.PATH_LOSS_1M - self.SENSITIVITY - margin_db) / (10 * self.EXPONENT))
+
+    def received(self, rssi, rng):
+        """RSSI de una trama sobre un enlace de RSSI medio rssi, o None si no supera la sensibilidad."""
+        value = rssi + rng.gauss(0, self.FADING_DB) if self.FADING_DB else rssi
+        return int(round(value)) if value >= self.SENSITIVITY else None
+
+
+class Medium:
+    """
+    Canal compartido: entrega cada trama a los vecinos del emisor tras su tiempo en el aire.
+    Cada recepción se pierde con probabilidad `loss`; los nodos en `down` no transmiten ni reciben.
+    Con `propagation` (Propagation), el RSSI de cada trama varía alrededor del del enlace y la
+    trama se pierde por debajo de la sensibilidad. Con `collisions`, dos tramas que se solapan
+    en un receptor se pierden las dos y una radio no recibe mientras transmite; con
+    `capture_db`, la que llega al menos esos dB más fuerte sobrevive. Una radio dormida al
+    empezar la trama no la recibe.
+    """
+
+    def __init__(self, clock, links, loss=0.0, seed=1, collisions=False, propagation=None, capture_db=None):
+        self.clock = clock
+        self.links = links          # {nodo: {vecino: rssi}}
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.down = set()
+        self.radios = {}
+        self.tx_counts = {}
+        self.lost = 0
+        self.oversize = 0
+        self.airtime_ms = 0.0
+        self.airtime_by_kind = {}
+        self.collisions = collisions
+        self.propagation = propagation
+        self.capture_db = capture_db
+        self.receptions = {node: [] for node in links}   # nodo -> [[inicio, fin, sin colisión, rssi]]
+        self.collided = 0
+        self.faded = 0
+        self.missed_asleep = 0
+
+    def attach(self, node_id):
+        radio = EmulatedRadio(self, node_id)
+        self.radios[node_id] = radio
+        return radio
+
+    def transmit(self, radio, payload):
+        if radio.node_id in self.down:
+            return
+        kind = payload.split(":", 1)[0]
+        self.tx_counts[kind] = self.tx_counts.get(kind, 0) + 1
+        airtime = lora_airtime_ms(len(payload))
+        self.airtime_ms += airtime
+        self.airtime_by_kind[kind] = self.airtime_by_kind.get(kind, 0.0) + airtime
+        # La radio transmite de a una trama: si sigue ocupada, ésta sale a continuación
+        start = max(self.clock.now_ms, radio.busy_until)
+        end = radio.busy_until = start + airtime
+        radio.tx_ms += airtime
+        delay = end - self.clock.now_ms
+        if self.collisions:
+            radio.tx_intervals = [(s, e) for s, e in radio.tx_intervals if e > self.clock.now_ms] + [(start, end)]
+            # Semidúplex: lo que recibía el emisor durante la transmisión se pierde
+            for reception in self.receptions[radio.node_id]:
+                if reception[0] < end and reception[1] > start:
+                    reception[2] = False
+        for neighbor, rssi in self.links[radio.node_id].items():
+            if neighbor in self.down:
+                continue
+            if self.loss and self.rng.random() < self.loss:
+                self.lost += 1
+                continue
+            if self.propagation is not None:
+                rssi = self.propagation.received(self.links[radio.node_id][neighbor], self.rng)
+                if rssi is None:
+                    self.faded += 1
+                    continue
+            reception = [start, end, True, rssi]
+            if self.collisions:
+                capture = self.capture_db
+                for other in self.receptions[neighbor]:
+                    if other[0] < end and other[1] > start:
+                        if capture is not None and rssi >= other[3] + capture:
+                            other[2] = False
+                        elif capture is not None and other[3] >= rssi + capture:
+                            reception[2] = False
+                        else:
+                            other[2] = reception[2] = False
+                if any(s < end and e > start for s, e in self.radios[neighbor].tx_intervals):
+                    reception[2] = False
+                self.receptions[neighbor].append(reception)
+            self.clock.schedule(delay, self.finish, neighbor, reception, payload, rssi)
+
+    def finish(self, neighbor, reception, payload, rssi):
+        """Fin de una trama en un receptor: se entrega si no chocó y la radio escuchó desde el principio."""
+        radio = self.radios[neighbor]
+        if self.collisions:
+            self.receptions[neighbor].remove(reception)
+            if not reception[2]:
+                self.collided += 1
+                return
+        if radio.asleep or radio.awake_since > reception[0]:
+            self.missed_asleep += 1
+            return
+        radio.deliver(payload, rssi)
+
+
+def build_topology(kind, size, rssi=-60, seed=1, degree=8):
+    """
+    Devuelve {nodo: {vecino: rssi}} para una línea de `size` nodos, una grilla de size x size
+    o `size` nodos al azar con RSSI de Propagation (random_geometric con `degree` vecinos medios).
+    """
+    if kind == "random":
+        return random_geometric(size, degree, Propagation(), seed)
+    links = {}
+
+    def connect(a, b):
+        links.setdefault(a, {})[b] = rssi
+        links.setdefault(b, {})[a] = rssi
+
+    if kind == "line":
+        names = [f"N{i}" for i in range(size)]
+        for node in names:
+            links.setdefault(node, {})
+        for a, b in zip(names, names[1:]):
+            connect(a, b)
+    elif kind == "grid":
+        for row in range(size):
+            for col in range(size):
+                links.setdefault(f"N{row}_{col}", {})
+                if col + 1 < size:
+                    connect(f"N{row}_{col}", f"N{row}_{col + 1}")
+                if row + 1 < size:
+                    connect(f"N{row}_{col}", f"N{row + 1}_{col}")
+    else:
+        raise ValueError(f"Topología desconocida: {kind}")
+    return links
+
+
+def random_geometric(count, degree, propagation, seed=1, tries=100):
+    """
+    `count` nodos uniformes en un cuadrado con el lado justo para `degree` vecinos medios con
+    LINK_MARGIN_DB de margen (propagation.range_m); N0 va en el centro. Hay enlace si el RSSI medio
+    con sombra queda a lo sumo FADING_DB bajo la sensibilidad (llega al menos 1 trama de 6).
+    Repite el sorteo hasta que la red quede conexa.
+    """
+    rng = random.Random(seed)
+    side = propagation.range_m(propagation.LINK_MARGIN_DB) * math.sqrt(math.pi * count / degree)
+    floor = propagation.SENSITIVITY - propagation.FADING_DB
+    names = [f"N{i}" for i in range(count)]
+    for _ in range(tries):
+        positions = [(side / 2, side / 2)] + [(rng.uniform(0, side), rng.uniform(0, side)) for _ in names[1:]]
+        links = {name: {} for name in names}
+        for i, (xa, ya) in enumerate(positions):
+            for j in range(i + 1, count):
+                xb, yb = positions[j]
+                rssi = propagation.mean_rssi(math.hypot(xa - xb, ya - yb)) + rng.gauss(0, propagation.SHADOWING_DB)
+                if rssi >= floor:
+                    links[names[i]][names[j]] = links[names[j]][names[i]] = int(round(rssi))
+        reached = {names[0]}
+        frontier = [names[0]]
+        for node in frontier:
+            for neighbor in links[node]:
+                if neighbor not in reached:
+                    reached.add(neighbor)
+                    frontier.append(neighbor)
+        if len(reached) == count:
+            return links
+    raise ValueError(f"Sin red conexa de {count} nodos con {degree} vecinos medios tras {tries} sorteos")
+
+
+class MeshSimulation:
+    """
+    Red de DSRNode reales sobre el medio emulado.
+    Cada nodo repite el bucle del firmware (receive_message + waiting_for_response)
+    cada poll_ms y envía HELLO cada hello_ms, con fases aleatorias.
+    """
+
+    def __init__(self, links, seed=1, poll_ms=100, hello_ms=10000, loss=0.0, configure=None, verbose=False,
+                 collisions=False, propagation=None, capture_db=None, profiler=None):
+        random.seed(seed)
+        self.clock = VirtualClock()
+        machine.CLOCK = self.clock
+        dsr_module.time = VirtualTime(self.clock)
+        dsr_module.ticks_ms = self.clock.ticks_ms
+        fragment_module.ticks_ms = self.clock.ticks_ms
+        self.verbose = verbose
+        self.medium = Medium(self.clock, links, loss, seed, collisions, propagation, capture_db)
+        self.nodes = {}
+        with self.output():
+            for node_id in links:
+                node = dsr_module.DSRNode(node_id, self.medium.attach(node_id), machine.RTC(), machine.Timer())
+                # El registro marca la hora virtual; en modo verbose se imprime todo al escribirse
+                node.log.clock = self.clock.ticks_ms
+                if verbose:
+                    node.log.level = DEBUG
+                    node.log.echo = True
+                if configure is not None:
+                    configure(node)
+                if profiler is not None:
+                    # Un Profiler compartido suma los tiempos de todos los nodos (en tiempo real del host)
+                    profiler.attach(node)
+                self.nodes[node_id] = node
+                self.clock.schedule(random.randint(0, poll_ms), self._poll, node, poll_ms)
+                self.clock.schedule(random.randint(0, hello_ms), self._hello, node, hello_ms)
+
+    def output(self):
+        """Silencia los print de los nodos salvo en modo verbose."""
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def _poll(self, node, poll_ms):
+        if node.node_id in self.medium.down:
+            return
+        node.receive_message()
+        node.waiting_for_response()
+        self.clock.schedule(poll_ms, self._poll, node, poll_ms)
+
+    def _hello(self, node, hello_ms):
+        if node.node_id in self.medium.down:
+            return
+        node.send_hello()
+        self.clock.schedule(hello_ms, self._hello, node, hello_ms)
+
+    def fail(self, node_id):
+        """Apaga un nodo: deja de transmitir, recibir y ejecutar su bucle."""
+        self.medium.down.add(node_id)
+
+    def run(self, duration_ms):
+        with self.output():
+            self.clock.run_until(self.clock.now_ms + duration_ms)
+
+    def run_until(self, condition, timeout_ms, step_ms=50):
+        """Avanza el reloj hasta que condition() sea verdadera; devuelve el tiempo transcurrido o None."""
+        start = self.clock.now_ms
+        while self.clock.now_ms - start < timeout_ms:
+            self.run(step_ms)
+            if condition():
+                return self.clock.now_ms - start
+        return None
+
+    def discover(self, source, destination, timeout_ms=20000, settle_ms=5000):
+        """
+        Fuerza un descubrimiento de ruta desde source y mide latencia y RREQ transmitidos.
+        La cuenta de RREQ incluye los reenvíos que siguen tras encontrar la ruta (settle_ms).
+        """
+        node = self.nodes[source]
+        node.remove_route(destination)
+        rreq_before = self.medium.tx_counts.get("RREQ", 0)
+        with self.output():
+            node.broadcast_rreq(destination)
+        latency = self.run_until(lambda: destination in node.routes, timeout_ms)
+        self.run(settle_ms)
+        return latency, self.medium.tx_counts.get("RREQ", 0) - rreq_before
+
+    def request(self, source, destination, timeout_ms=70000, retry_ms=2000, samples=False):
+        """
+        Solicita datos de destination desde source hasta recibir un RESP nuevo
+        (con samples, el lote de lecturas posteriores a la última recibida).
+        Si el nodo quedó sin solicitud pendiente (sin ruta o TIMEOUT) la repite cada retry_ms.
+        Devuelve el tiempo hasta la respuesta o None.
+        """
+        node = self.nodes[source]
+        previous = node.latest.get(destination)
+        last_request = [self.clock.now_ms]
+        send = node.request_samples if samples else node.request_data
+        with self.output():
+            send(destination)
+
+        def answered_now():
+            if node.latest.get(destination) is not previous:
+                return True
+            if not node.waiting_response and self.clock.now_ms - last_request[0] >= retry_ms:
+                last_request[0] = self.clock.now_ms
+                with self.output():
+                    send(destination)
+            return False
+
+        return self.run_until(answered_now, timeout_ms)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_discovery(args):
+    links = build_topology(args.topology, args.size, seed=args.seed)
+    # Al azar, el RSSI de cada trama sale del modelo de propagación (con desvanecimiento)
+    propagation = Propagation() if args.topology == "random" else None
+    names = sorted(links)
+    pair_rng = random.Random(args.seed)
+    pairs = []
+    while len(pairs) < args.queries:
+        source, destination = pair_rng.sample(names, 2)
+        pairs.append((source, destination))
+
+    print(f"Topología {args.topology} ({len(names)} nodos), {args.queries} descubrimientos")
+    print(f"{'modo':<18}{'éxito':>8}{'lat. media (ms)':>18}{'lat. p90 (ms)':>16}{'RREQ/descubr.':>16}")
+    for cached in (False, True):
+        def configure(node, cached=cached):
+            node.reply_from_cache = cached
+            if propagation is not None:
+                node.quality_neighbor = propagation.NEIGHBOR_QOS
+        sim = MeshSimulation(links, seed=args.seed, configure=configure, verbose=args.verbose, propagation=propagation)
+        sim.run(args.warmup * 1000)
+        latencies, rreqs = [], []
+        for source, destination in pairs:
+            latency, rreq_tx = sim.discover(source, destination)
+            rreqs.append(rreq_tx)
+            if latency is not None:
+                latencies.append(latency)
+        label = "caché en nodos" if cached else "sólo destino"
+        mean = sum(latencies) / len(latencies) if latencies else float("nan")
+        p90 = percentile(latencies, 0.9) if latencies else float("nan")
+        print(f"{label:<18}{len(latencies):>5}/{len(pairs):<2}{mean:>18.0f}{p90:>16.0f}{sum(rreqs) / len(rreqs):>16.1f}")
+
+
+def run_reliability(args):
+    links = build_topology("grid", args.size)
+    source, destination = "N0_0", f"N{args.size - 1}_{args.size - 1}"
+    print(f"Grilla {args.size}x{args.size}, {source} -> {destination}, pérdida por recepción {args.loss:.0%}, "
+          f"{args.requests} solicitudes y luego caída de un relay")
+    print(f"{'modo':<12}{'entregadas':>12}{'lat. media (ms)':>18}{'lat. p90 (ms)':>16}{'recuperación (ms)':>20}{'tramas tx':>12}")
+    for mode in (None, "explicit", "passive"):
+        def configure(node, mode=mode):
+            node.hop_ack = mode
+        sim = MeshSimulation(links, seed=args.seed, loss=args.loss, configure=configure, verbose=args.verbose)
+        sim.run(args.warmup * 1000)
+        sim.request(source, destination)
+        latencies = []
+        for _ in range(args.requests):
+            latency = sim.request(source, destination, timeout_ms=args.timeout * 1000)
+            if latency is not None:
+                latencies.append(latency)
+            sim.run(1000)
+        # Con la ruta vigente confirmada, cae el relay central
+        sim.request(source, destination)
+        route = sim.nodes[source].routes.get(destination)
+        recovery = None
+        if route:
+            sim.fail(route[len(route) // 2])
+            recovery = sim.request(source, destination, timeout_ms=120000)
+        label = mode or "sin ACK"
+        mean = sum(latencies) / len(latencies) if latencies else float("nan")
+        p90 = percentile(latencies, 0.9) if latencies else float("nan")
+        recovery_text = f"{recovery:.0f}" if recovery is not None else "-"
+        print(f"{label:<12}{len(latencies):>9}/{args.requests:<2}{mean:>18.0f}{p90:>16.0f}{recovery_text:>20}"
+              f"{sum(sim.medium.tx_counts.values()):>12}")
+
+
+def gps_readings(count, seed):
+    """Lecturas (lon, lat, temp) de un esclavo quieto: ruido de GPS de pocos 1e-5° y deriva de temperatura."""
+    rng = random.Random(seed)
+    lon, lat, temp = -65.212345, -26.808285, 24.5
+    readings = []
+    for _ in range(count):
+        temp += rng.choice((-0.1, 0.0, 0.0, 0.1))
+        readings.append((round(lon + rng.randint(-3, 3) * 1e-5, 6), round(lat + rng.randint(-3, 3) * 1e-5, 6), round(temp, 1)))
+    return readings
+
+
+def run_batch(args):
+    links = build_topology("line", args.size)
+    source, destination = "N0", f"N{args.size - 1}"
+    print(f"Línea de {args.size} nodos: {destination} toma {args.samples} lecturas cada {args.sample_ms} ms y {source} las recoge")
+    print(f"{'modo':<26}{'lecturas':>10}{'tramas tx':>12}{'aire (s)':>10}{'aire/lectura (ms)':>20}")
+
+    def configure(node):
+        node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+
+    def configure_codec(node):
+        configure(node)
+        node.sensor_schema = "G"
+
+    for mode in ("single", "batch", "codec"):
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, verbose=args.verbose,
+                             configure=configure_codec if mode == "codec" else configure)
+        readings = gps_readings(args.samples, args.seed)
+        sim.run(args.warmup * 1000)
+        node, sampler = sim.nodes[source], sim.nodes[destination]
+        tx_before = {kind: count for kind, count in sim.medium.tx_counts.items()}
+        air_before = dict(sim.medium.airtime_by_kind)
+        delivered = []   # Respuestas aceptadas: cada una deja una entrada nueva en latest
+        for index in range(args.samples):
+            # En texto, como las formatea el firmware; con el codec, como números
+            sampler.update_sensor(readings[index] if mode == "codec" else "%.6f/%.6f/%.1f" % readings[index])
+            if mode == "single":
+                sim.request(source, destination, timeout_ms=args.sample_ms, retry_ms=args.sample_ms)
+                latest = node.latest.get(destination)
+                if latest is not None and (not delivered or delivered[-1] is not latest):
+                    delivered.append(latest)
+            elif (index + 1) % args.batch == 0:
+                sim.request(source, destination, timeout_ms=args.sample_ms, retry_ms=args.sample_ms, samples=True)
+            sim.run(max(0, args.sample_ms - (sim.clock.now_ms % args.sample_ms)))
+        if mode != "single":
+            delivered = node.readings.get(destination, [])
+        # Tráfico de datos: todo salvo los HELLO
+        frames = sum(count - tx_before.get(kind, 0) for kind, count in sim.medium.tx_counts.items() if kind != "HELLO")
+        airtime = sum(ms - air_before.get(kind, 0.0) for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        label = {"single": "una por solicitud", "batch": f"lotes de {args.batch}", "codec": f"lotes de {args.batch} + codec"}[mode]
+        per_reading = f"{airtime / len(delivered):.0f}" if delivered else "-"
+        print(f"{label:<26}{len(delivered):>10}{frames:>12}{airtime / 1000:>10.1f}{per_reading:>20}")
+
+
+def run_push(args):
+    links = build_topology("line", args.size)
+    gateway, sensor = "N0", f"N{args.size - 1}"
+    period = args.sample_ms // 1000
+    print(f"Línea de {args.size} nodos: {sensor} toma {args.samples} lecturas cada {args.sample_ms} ms "
+          f"para el gateway {gateway}, pérdida {args.loss:.0%}")
+    print(f"{'modo':<22}{'lecturas':>12}{'tramas tx':>12}{'aire (s)':>10}{'lecturas/s de aire':>20}")
+
+    def configure(node):
+        node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+
+    modes = [
+        ("sondeo DATA/RESP", None),
+        ("push", dict(interval=period)),
+        ("push + TACK", dict(interval=period, ack=True)),
+        (f"push lotes de {args.batch}", dict(interval=period * args.batch, ack=True)),
+    ]
+    for label, push in modes:
+        sim = MeshSimulation(links, seed=args.seed, loss=args.loss, hello_ms=args.hello_ms, configure=configure,
+                             verbose=args.verbose)
+        sim.run(args.warmup * 1000)
+        tx_before = dict(sim.medium.tx_counts)
+        air_before = dict(sim.medium.airtime_by_kind)
+        node = sim.nodes[sensor]
+        if push is not None:
+            with sim.output():
+                node.start_push(gateway, **push)
+        answered = []
+        for index in range(args.samples):
+            node.update_sensor(f"-65.{index:06d}/-26.808285/24.5")
+            if push is None:
+                sim.request(gateway, sensor, timeout_ms=args.sample_ms, retry_ms=args.sample_ms)
+                latest = sim.nodes[gateway].latest.get(sensor)
+                if latest is not None and (not answered or answered[-1] is not latest):
+                    answered.append(latest)
+            sim.run(max(0, args.sample_ms - (sim.clock.now_ms % args.sample_ms)))
+        if push is not None:
+            # Último envío programado para lo que quedó en el buffer
+            sim.run(push["interval"] * 1000 + node.PUSH_JITTER_MS)
+        delivered = len(answered) if push is None else len(sim.nodes[gateway].readings.get(sensor, []))
+        frames = sum(count - tx_before.get(kind, 0) for kind, count in sim.medium.tx_counts.items() if kind != "HELLO")
+        airtime = sum(ms - air_before.get(kind, 0.0) for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        rate = f"{delivered / (airtime / 1000):.1f}" if airtime else "-"
+        print(f"{label:<22}{delivered:>9}/{args.samples:<3}{frames:>11}{airtime / 1000:>10.1f}{rate:>20}")
+
+
+def run_cache(args):
+    links = build_topology("grid", args.size)
+    gateway = "N0_0"
+    hot = sorted(node for node in links if node != gateway)[-args.hot:]
+    print(f"Grilla de {args.size}x{args.size}: {args.requests} pedidos de lectura al gateway {gateway} "
+          f"cada ~{args.interval_ms} ms sobre {', '.join(hot)}")
+    print(f"{'modo':<22}{'servidos':>12}{'DATA enviados':>15}{'latencia media (s)':>20}{'aire (s)':>10}")
+
+    for label, ttl in (("un DATA por pedido", None), ("coalescencia", -1), (f"caché TTL {args.ttl} s", args.ttl)):
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, verbose=args.verbose)
+        sim.run(args.warmup * 1000)
+        for destination in hot:
+            sim.discover(gateway, destination)
+        node = sim.nodes[gateway]
+        cache = ReadingCache(node, ttl) if ttl is not None else None
+        rng = random.Random(args.seed)
+        latencies = []
+        open_requests = []   # Sin caché: [(inicio, nodo, lectura previa)]
+        data_before = sim.medium.tx_counts.get("DATA", 0)
+        air_before = dict(sim.medium.airtime_by_kind)
+
+        def served(start):
+            def callback(reading):
+                if reading is not None:
+                    latencies.append((sim.clock.now_ms - start) / 1000)
+            return callback
+
+        def ask(destination):
+            if cache is not None:
+                cache.get(destination, served(sim.clock.now_ms))
+            else:
+                # Como el firmware sin caché: cada DATOS/<id> es un request_data
+                open_requests.append((sim.clock.now_ms, destination, node.latest.get(destination)))
+                node.request_data(destination)
+
+        def check():
+            if cache is not None:
+                cache.process_timers()
+            for entry in list(open_requests):
+                if node.latest.get(entry[1]) is not entry[2]:
+                    open_requests.remove(entry)
+                    latencies.append((sim.clock.now_ms - entry[0]) / 1000)
+            sim.clock.schedule(100, check)
+
+        sim.clock.schedule(0, check)
+        at = 0
+        for _ in range(args.requests):
+            at += rng.expovariate(1 / args.interval_ms)
+            sim.clock.schedule(at, ask, rng.choice(hot))
+        sim.run(at + 70000)
+        data = sim.medium.tx_counts.get("DATA", 0) - data_before
+        airtime = sum(ms - air_before.get(kind, 0.0) for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        mean = f"{sum(latencies) / len(latencies):.2f}" if latencies else "-"
+        print(f"{label:<22}{len(latencies):>8}/{args.requests:<3}{data:>15}{mean:>20}{airtime / 1000:>10.1f}")
+        if cache is not None:
+            print(f"    {cache.stats}")
+
+
+def run_timesync(args):
+    links = build_topology("grid", args.size)
+    gateway = "N0_0"
+    print(f"Grilla de {args.size}x{args.size}, referencia {gateway}, HELLO cada {args.hello_ms} ms, "
+          f"deriva de los cristales ±{args.drift_ppm} ppm, {args.minutes} min")
+    print(f"{'modo':<26}{'sincronizados':>14}{'error medio (ms)':>18}{'p90 (ms)':>10}{'máx (ms)':>10}{'deriva estimada':>17}")
+
+    modes = (("sin compensar demora", False, 1), ("compensando demora", True, 1), ("demora + deriva", True, None))
+    for label, compensate, samples in modes:
+        rng = random.Random(args.seed)
+        drifts = {}
+
+        def configure(node):
+            # Reloj local propio: arranque en un instante cualquiera y cristal con deriva
+            clock, start = machine.CLOCK, rng.randint(0, 10 ** 6)
+            drift = drifts[node.node_id] = rng.uniform(-args.drift_ppm, args.drift_ppm) * 1e-6
+            node.clock_sync.ticks = node.lora.ticks = lambda: int(start + clock.now_ms * (1 + drift))
+            node.clock_sync.compensate = compensate
+            if samples is not None:
+                node.clock_sync.SAMPLES = samples
+            if node.node_id == gateway:
+                node.role = "master"
+
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, configure=configure, verbose=args.verbose)
+        sim.run(args.warmup * 1000)
+        reference = sim.nodes[gateway].clock_sync
+        errors = []
+        synced = 0
+        for _ in range(args.minutes * 60):
+            sim.run(1000)
+            now = reference.now_ms()
+            for node_id, node in sim.nodes.items():
+                if node_id == gateway:
+                    continue
+                estimate = node.clock_sync.now_ms()
+                if estimate is not None:
+                    synced += 1
+                    errors.append(abs(estimate - now))
+        total = args.minutes * 60 * (len(sim.nodes) - 1)
+        # Deriva relativa al gateway que cada nodo debería estimar
+        drift_error = [abs((1 + drifts[gateway]) / (1 + drifts[n]) - node.clock_sync.rate) * 1e6
+                       for n, node in sim.nodes.items() if n != gateway and node.clock_sync.synced()]
+        mean = f"{sum(errors) / len(errors):.1f}" if errors else "-"
+        drift_text = f"±{sum(drift_error) / len(drift_error):.1f} ppm" if samples is None and drift_error else "-"
+        print(f"{label:<26}{synced / total:>14.0%}{mean:>18}{percentile(errors, 0.9):>10.0f}{max(errors or [0]):>10}{drift_text:>17}")
+
+
+# Consumo del SX1276 a 3.3 V (datasheet): TX a +17 dBm con PA_BOOST, RX con LNA boost y sleep
+RADIO_VOLTS = 3.3
+RADIO_TX_MA = 87.0
+RADIO_RX_MA = 11.5
+RADIO_SLEEP_MA = 0.0002
+
+
+def run_tdma(args):
+    links = build_topology("grid", args.size)
+    gateway = "N0_0"
+    period = args.sample_ms // 1000
+    sensors = [node for node in links if node != gateway]
+    print(f"Grilla de {args.size}x{args.size} con colisiones: {len(sensors)} esclavos empujan una lectura cada "
+          f"{args.sample_ms} ms al gateway {gateway}, {args.minutes} min")
+    print(f"{'modo':<10}{'entregadas':>16}{'lecturas/min':>14}{'colisiones':>12}{'radio dormida':>15}"
+          f"{'corriente media (mA)':>22}{'mJ/lectura':>12}")
+
+    for label, slotted, api in (("ALOHA", False, False), ("TDMA", True, False), ("TDMA API", True, True)):
+        schedulers = {}
+
+        def configure(node):
+            if node.node_id == gateway:
+                node.role = "master"
+                if api:
+                    # Como master_api: FragmentLink debajo del cronograma
+                    node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+            if slotted:
+                schedulers[node.node_id] = SlotScheduler(node, args.frame_ms, args.slot_ms, args.contention_ms)
+
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, configure=configure,
+                             verbose=args.verbose, collisions=True)
+
+        def slots(scheduler):
+            sim.clock.schedule(scheduler.process(), slots, scheduler)
+
+        def owner_step(owner):
+            owner.step()
+            sim.clock.schedule(owner.POLL_MS, owner_step, owner)
+
+        for node_id, scheduler in schedulers.items():
+            if api and node_id == gateway:
+                # El cronograma del gateway lo atiende el hilo dueño en cada pasada, como en master_api
+                owner = NodeOwner(sim.nodes[gateway], cache=ReadingCache(sim.nodes[gateway]), scheduler=scheduler)
+                sim.clock.schedule(0, owner_step, owner)
+            else:
+                sim.clock.schedule(0, slots, scheduler)
+        sim.run(args.warmup * 1000)
+        for node_id in sensors:
+            with sim.output():
+                sim.nodes[node_id].start_push(gateway, interval=period)
+        # Las lecturas nuevas de cada esclavo; la primera pasada de push aprende la ruta al gateway
+        rng = random.Random(args.seed)
+
+        def sample(node):
+            node.update_sensor(f"-65.{rng.randint(0, 999999):06d}/-26.808285/24.5")
+            sim.clock.schedule(args.sample_ms, sample, node)
+
+        for node_id in sensors:
+            sim.clock.schedule(rng.randint(0, args.sample_ms), sample, sim.nodes[node_id])
+        sim.run(args.settle * 1000)
+        received_before = {n: len(sim.nodes[gateway].readings.get(n, [])) for n in sensors}
+        collided_before = sim.medium.collided
+        times_before = {n: sim.medium.radios[n].radio_times() for n in sensors}
+        window_ms = args.minutes * 60000
+        sim.run(window_ms)
+        delivered = sum(len(sim.nodes[gateway].readings.get(n, [])) - received_before[n] for n in sensors)
+        offered = len(sensors) * window_ms // args.sample_ms
+        tx_ms = sleep_ms = 0.0
+        for node_id in sensors:
+            tx, sleep = sim.medium.radios[node_id].radio_times()
+            tx_ms += tx - times_before[node_id][0]
+            sleep_ms += sleep - times_before[node_id][1]
+        rx_ms = window_ms * len(sensors) - tx_ms - sleep_ms
+        charge = RADIO_TX_MA * tx_ms + RADIO_RX_MA * rx_ms + RADIO_SLEEP_MA * sleep_ms   # mA·ms
+        current = charge / (window_ms * len(sensors))
+        energy = f"{charge * RADIO_VOLTS / 1000 / delivered:.0f}" if delivered else "-"
+        print(f"{label:<10}{delivered:>9}/{offered:<6}{delivered / args.minutes:>14.1f}"
+              f"{sim.medium.collided - collided_before:>12}{sleep_ms / (window_ms * len(sensors)):>15.0%}"
+              f"{current:>22.2f}{energy:>12}")
+        if slotted:
+            gateway_slots = schedulers[gateway]
+            print(f"    trama de {gateway_slots.frame_ms} ms: {gateway_slots.contention_ms} ms de contienda y "
+                  f"{len(gateway_slots.slots)} slots de {gateway_slots.slot_ms} ms; {gateway_slots.stats}")
+
+
+def run_anycast(args):
+    links = build_topology("grid", args.size)
+    last = args.size - 1
+    corners = ["N0_0", f"N{last}_{last}", f"N0_{last}", f"N{last}_0"]
+    # Los mismos esclavos en todos los modos: las esquinas que no son gateway sólo reenvían
+    sensors = [node for node in links if node not in corners]
+    period = args.sample_ms // 1000
+    print(f"Grilla de {args.size}x{args.size} con colisiones: {len(sensors)} esclavos empujan (con TACK) una lectura "
+          f"cada {args.sample_ms} ms al gateway más cercano, {args.minutes} min; marcas entre gateways cada {args.marks_ms} ms")
+    print(f"{'modo':<24}{'entregadas':>14}{'lecturas/min':>14}{'saltos':>8}{'aire/lectura (ms)':>19}"
+          f"{'anuncios':>10}{'dup. guardadas':>16}{'dup. filtradas':>16}")
+
+    modes = (
+        ("1 gateway", 1, False, True),
+        ("2 gateways", 2, False, True),
+        ("4 gateways", 4, False, True),
+        ("2 gateways, cae uno", 2, True, True),
+        ("  sin marcas", 2, True, False),
+    )
+    for label, count, failure, marks in modes:
+        gateways = corners[:count]
+
+        def configure(node):
+            # Como el firmware: fragmentación y lotes compactos (con TACK lo no confirmado se acumula)
+            node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+            node.sensor_schema = "G"
+            if node.node_id in gateways:
+                node.role = "master"
+
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, configure=configure,
+                             verbose=args.verbose, collisions=True)
+        stored = {gateway: set() for gateway in gateways}   # gateway -> {(esclavo, secuencia)}
+        hops = []
+        arrivals = []   # [(ms, gateway, esclavo)] de cada TELE que guardó lecturas nuevas
+
+        def watcher(gateway):
+            node = sim.nodes[gateway]
+
+            def on_tele(message):
+                if message.destination != gateway:
+                    return
+                hops.append(len(message.route) + 1)
+                for sample in node.readings.get(message.source, []):
+                    if (message.source, sample[0]) not in stored[gateway]:
+                        stored[gateway].add((message.source, sample[0]))
+                        arrivals.append((sim.clock.now_ms, gateway, message.source))
+            return on_tele
+
+        for gateway in gateways:
+            sim.nodes[gateway].subscribe("sim", ("TELE",), watcher(gateway))
+            with sim.output():
+                sim.nodes[gateway].start_advertising(args.advert_s)
+
+        def exchange():
+            # Enlace de los gateways fuera de la mesh (MQTT): cada uno recibe las marcas de los demás
+            alive = [g for g in gateways if g not in sim.medium.down]
+            for gateway in alive:
+                for other in alive:
+                    if other != gateway:
+                        sim.nodes[gateway].merge_marks(sim.nodes[other].reading_marks())
+            sim.clock.schedule(args.marks_ms, exchange)
+
+        if marks:
+            sim.clock.schedule(args.marks_ms, exchange)
+        sim.run(args.warmup * 1000)
+        for node_id in sensors:
+            with sim.output():
+                sim.nodes[node_id].start_push(dsr_module.DSRNode.ANY_GATEWAY, interval=period, ack=True)
+        rng = random.Random(args.seed)
+        readings = gps_readings(args.minutes * 60000 // args.sample_ms + 100, args.seed)
+        sampling = [True]
+
+        def sample(node):
+            if sampling[0]:
+                node.update_sensor(readings[node.sample_seq % len(readings)])
+                sim.clock.schedule(args.sample_ms, sample, node)
+
+        for node_id in sensors:
+            sim.clock.schedule(rng.randint(0, args.sample_ms), sample, sim.nodes[node_id])
+        sim.run(args.settle * 1000)
+        first = {n: sim.nodes[n].sample_seq for n in sensors}
+        hops.clear()
+        adverts_before = sim.medium.tx_counts.get("GATE", 0)
+        air_before = dict(sim.medium.airtime_by_kind)
+        filtered_before = sum(sim.nodes[g].duplicate_readings for g in gateways)
+        window_ms = args.minutes * 60000
+        orphans, failed_at = [], None
+        if failure:
+            sim.run(window_ms // 2)
+            failed_at = sim.clock.now_ms
+            failed = gateways[-1]
+            orphans = [n for n in sensors if sim.nodes[n].push_target == failed]
+            sim.fail(failed)
+            sim.run(window_ms - window_ms // 2)
+        else:
+            sim.run(window_ms)
+        last_seq = {n: sim.nodes[n].sample_seq for n in sensors}
+        # Sin lecturas nuevas: lo pendiente de TACK termina de llegar
+        sampling[0] = False
+        sim.run(args.drain * 1000)
+        counted = [(n, seq) for g in gateways for n, seq in stored[g] if first[n] < seq <= last_seq[n]]
+        delivered = len(set(counted))
+        offered = sum(last_seq[n] - first[n] for n in sensors)
+        airtime = sum(ms - air_before.get(kind, 0.0) for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        adverts = sim.medium.tx_counts.get("GATE", 0) - adverts_before
+        filtered = sum(sim.nodes[g].duplicate_readings for g in gateways) - filtered_before
+        mean_hops = f"{sum(hops) / len(hops):.2f}" if hops else "-"
+        per_reading = f"{airtime / delivered:.0f}" if delivered else "-"
+        print(f"{label:<24}{delivered:>8}/{offered:<5}{delivered / args.minutes:>14.1f}{mean_hops:>8}{per_reading:>19}"
+              f"{adverts:>10}{len(counted) - delivered:>16}{filtered:>16}")
+        if failure and marks:
+            survivor = gateways[0]
+            recovery = []
+            for orphan in orphans:
+                times = [ms for ms, g, n in arrivals if g == survivor and n == orphan and ms > failed_at]
+                if times:
+                    recovery.append((times[0] - failed_at) / 1000)
+            if recovery:
+                print(f"    cae {gateways[-1]} a los {args.minutes // 2} min: {len(recovery)}/{len(orphans)} esclavos pasan a "
+                      f"{survivor}, recuperación mediana {percentile(recovery, 0.5):.0f} s, máx {max(recovery):.0f} s")
+            else:
+                print(f"    cae {gateways[-1]}: ninguno de sus {len(orphans)} esclavos llegó a {survivor}")
+
+
+def bridged_grids(size, seed):
+    """Dos grillas de size x size (L y R) unidas sólo a través del nodo P, con RSSI al azar por enlace."""
+    rng = random.Random(seed)
+    links = {}
+
+    def connect(a, b):
+        rssi = rng.randint(-78, -55)
+        links.setdefault(a, {})[b] = rssi
+        links.setdefault(b, {})[a] = rssi
+
+    for side in "LR":
+        for row in range(size):
+            for col in range(size):
+                node = f"{side}{row}_{col}"
+                links.setdefault(node, {})
+                if col + 1 < size:
+                    connect(node, f"{side}{row}_{col + 1}")
+                if row + 1 < size:
+                    connect(node, f"{side}{row + 1}_{col}")
+    middle = size // 2
+    connect(f"L{middle}_{size - 1}", "P")
+    connect("P", f"R{middle}_0")
+    return links
+
+
+def run_topology(args):
+    links = bridged_grids(args.size, args.seed)
+    gateway = "L0_0"
+    sensors = [node for node in links if node != gateway]
+    real = {(a, b) for a in links for b in links[a] if a < b}
+    period = args.sample_ms // 1000
+    print(f"Dos grillas de {args.size}x{args.size} unidas por el puente P ({len(links)} nodos, {len(real)} enlaces); "
+          f"gateway {gateway}, lectura cada {args.sample_ms} ms, informe de vecinos al menos cada {args.report_s} s")
+    print(f"{'modo':<22}{'enlaces':>10}{'de más':>8}{'TOPO':>6}{'aire TOPO (ms)':>16}{'en TELE':>9}"
+          f"{'aire sin HELLO (ms)':>21}{'cuellos de botella':>40}")
+
+    for label, piggyback in (("TOPO propio", False), ("dentro del TELE", True)):
+        graphs = {}
+
+        def configure(node):
+            node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+            node.sensor_schema = "G"
+            node.report_piggyback = piggyback
+            if node.node_id == gateway:
+                node.role = "master"
+                graphs[gateway] = TopologyGraph(node)
+
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, configure=configure, verbose=args.verbose)
+        graph = graphs[gateway]
+        readings = gps_readings(args.minutes * 60000 // args.sample_ms + 100, args.seed)
+        rng = random.Random(args.seed)
+
+        def sample(node):
+            if node.node_id not in sim.medium.down:
+                node.update_sensor(readings[node.sample_seq % len(readings)])
+                sim.clock.schedule(args.sample_ms, sample, node)
+
+        with sim.output():
+            for node_id in sensors:
+                sim.nodes[node_id].start_push(gateway, interval=period, ack=True)
+                sim.nodes[node_id].start_reports(gateway, args.report_s)
+        for node_id in sensors:
+            sim.clock.schedule(rng.randint(0, args.sample_ms), sample, sim.nodes[node_id])
+        sim.run(args.minutes * 60000)
+        known = set(graph.edges())
+        air = sum(ms for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        bottlenecks = ", ".join(f"{node} {value:.2f}" for node, value in graph.bottlenecks(3))
+        print(f"{label:<22}{len(known & real):>6}/{len(real):<3}{len(known - real):>8}{sim.medium.tx_counts.get('TOPO', 0):>6}"
+              f"{sim.medium.airtime_by_kind.get('TOPO', 0.0):>16.0f}{graph.stats['piggybacked']:>9}{air:>21.0f}{bottlenecks:>40}")
+
+        # Cae el puente: la mitad R queda aislada y el grafo tiene que partirse en dos
+        sim.fail("P")
+        detected = sim.run_until(lambda: len(graph.partitions()) > 1, args.timeout * 1000, step_ms=1000)
+        if detected is None:
+            print(f"    cae P: el gateway no detectó la partición en {args.timeout} s")
+        else:
+            parts = graph.partitions()
+            print(f"    cae P: partición detectada a los {detected / 1000:.0f} s "
+                  f"({' | '.join(str(len(part)) + ' nodos' for part in parts)}); "
+                  f"camino {gateway}->R{args.size - 1}_{args.size - 1}: {graph.shortest_path(gateway, f'R{args.size - 1}_{args.size - 1}')}")
+
+
+def run_scale(args):
+    propagation = Propagation()
+    capture = None if args.no_capture else args.capture_db
+    period = args.sample_ms // 1000
+    print(f"Nodos al azar con {args.degree} vecinos medios a {propagation.LINK_MARGIN_DB} dB de margen "
+          f"({propagation.range_m(propagation.LINK_MARGIN_DB):.0f} m; sombra "
+          f"{propagation.SHADOWING_DB:.0f} dB, desvanecimiento {propagation.FADING_DB:.0f} dB), colisiones "
+          f"{'con captura de ' + str(capture) + ' dB' if capture is not None else 'sin captura'}; todos empujan "
+          f"(con TACK) una lectura cada {args.sample_ms} ms al gateway N0 del centro, {args.minutes} min")
+    print(f"{'nodos':>6}{'enlaces':>9}{'entregadas':>16}{'saltos':>8}{'aire/lectura (ms)':>19}{'colisiones':>12}"
+          f"{'desvanecidas':>14}{'eventos':>10}{'pared (s)':>11}{'x tiempo real':>15}")
+    for count in args.nodes:
+        links = random_geometric(count, args.degree, propagation, args.seed)
+        gateway = "N0"
+        sensors = [node for node in links if node != gateway]
+
+        def configure(node):
+            node.lora = fragment_module.FragmentLink(node.lora, node.node_id, node.send)
+            node.sensor_schema = "G"
+            node.quality_neighbor = args.qos
+            if node.node_id == gateway:
+                node.role = "master"
+
+        started = host_time.perf_counter()
+        sim = MeshSimulation(links, seed=args.seed, hello_ms=args.hello_ms, configure=configure, verbose=args.verbose,
+                             collisions=True, propagation=propagation, capture_db=capture)
+        stored = set()
+        hops = []
+
+        def on_tele(message):
+            if message.destination != gateway:
+                return
+            hops.append(len(message.route) + 1)
+            for sample in sim.nodes[gateway].readings.get(message.source, []):
+                stored.add((message.source, sample[0]))
+
+        sim.nodes[gateway].subscribe("sim", ("TELE",), on_tele)
+        sim.run(args.warmup * 1000)
+        readings = gps_readings(args.minutes * 60000 // args.sample_ms + 100, args.seed)
+        rng = random.Random(args.seed)
+        sampling = [True]
+
+        def sample(node):
+            if sampling[0]:
+                node.update_sensor(readings[node.sample_seq % len(readings)])
+                sim.clock.schedule(args.sample_ms, sample, node)
+
+        with sim.output():
+            for node_id in sensors:
+                sim.nodes[node_id].start_push(gateway, interval=period, ack=True)
+        for node_id in sensors:
+            sim.clock.schedule(rng.randint(0, args.sample_ms), sample, sim.nodes[node_id])
+        sim.run(args.settle * 1000)
+        first = {n: sim.nodes[n].sample_seq for n in sensors}
+        hops.clear()
+        air_before = sum(ms for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO")
+        collided_before, faded_before = sim.medium.collided, sim.medium.faded
+        sim.run(args.minutes * 60000)
+        last_seq = {n: sim.nodes[n].sample_seq for n in sensors}
+        sampling[0] = False
+        sim.run(args.drain * 1000)
+        wall = host_time.perf_counter() - started
+        virtual_s = (args.warmup + args.settle + args.minutes * 60 + args.drain)
+        delivered = sum(1 for n, seq in stored if first[n] < seq <= last_seq[n])
+        offered = sum(last_seq[n] - first[n] for n in sensors)
+        airtime = sum(ms for kind, ms in sim.medium.airtime_by_kind.items() if kind != "HELLO") - air_before
+        edges = sum(len(neighbors) for neighbors in links.values()) // 2
+        mean_hops = f"{sum(hops) / len(hops):.2f}" if hops else "-"
+        per_reading = f"{airtime / delivered:.0f}" if delivered else "-"
+        print(f"{count:>6}{edges:>9}{delivered:>9}/{offered:<6}{mean_hops:>8}{per_reading:>19}"
+              f"{sim.medium.collided - collided_before:>12}{sim.medium.faded - faded_before:>14}"
+              f"{sim.clock._sequence:>10}{wall:>11.1f}{virtual_s / wall:>15.0f}")
+
+
+def run_fragment(args):
+    links = build_topology("line", 2)
+    filler = "0123456789abcdef" * (args.bytes // 16 + 1)
+    print(f"{args.messages} tramas de {args.bytes} bytes de N0 a N1, pérdida {args.loss:.0%}")
+    print(f"{'modo':<22}{'entregadas':>12}{'lat. media (ms)':>18}{'paquetes tx':>14}{'aire (s)':>10}")
+    for mode in ("none", "frag", "fnack"):
+        clock = VirtualClock()
+        fragment_module.ticks_ms = clock.ticks_ms
+        medium = Medium(clock, links, args.loss, args.seed)
+        sender, receiver = medium.attach("N0"), medium.attach("N1")
+        if mode != "none":
+            sender, receiver = fragment_module.FragmentLink(sender, "N0"), fragment_module.FragmentLink(receiver, "N1")
+            if mode == "frag":
+                sender.FRAG_NACK_RETRIES = receiver.FRAG_NACK_RETRIES = 0
+        sent_at, latencies = {}, []
+
+        def poll():
+            for link in (sender, receiver):
+                while link.is_packet_received():
+                    payload = link.get_packet()["payload"]
+                    index = int(payload.split(":")[2])
+                    if link is receiver and index in sent_at:
+                        latencies.append(clock.now_ms - sent_at.pop(index))
+            clock.schedule(args.poll_ms, poll)
+
+        def send(index):
+            header = f"LOG:N0:{index}:"
+            sent_at[index] = clock.now_ms
+            sender.send(header + filler[:args.bytes - len(header)])
+
+        clock.schedule(0, poll)
+        for index in range(args.messages):
+            clock.schedule(index * args.interval_ms, send, index)
+        with contextlib.redirect_stdout(io.StringIO()):
+            clock.run_until(args.messages * args.interval_ms + 10000)
+        labels = {"none": "sin fragmentar", "frag": "fragmentos", "fnack": "fragmentos + FNACK"}
+        mean = f"{sum(latencies) / len(latencies):.0f}" if latencies else "-"
+        packets = sum(medium.tx_counts.values())
+        print(f"{labels[mode]:<22}{len(latencies):>9}/{args.messages:<2}{mean:>18}{packets:>14}{medium.airtime_ms / 1000:>10.1f}")
+
+
+async def poll_loop(node, poll_ms):
+    """Bucle del firmware de los esclavos: atiende la radio y duerme poll_ms."""
+    while True:
+        node.waiting_for_response()
+        node.receive_message()
+        await asyncio.sleep(poll_ms / 1000)
+
+
+async def hello_loop(node, hello_ms):
+    await asyncio.sleep(random.randint(0, hello_ms) / 1000)
+    while True:
+        node.send_hello()
+        await asyncio.sleep(hello_ms / 1000)
+
+
+async def timed_requests(links, mode, args):
+    """Levanta la red en tiempo real y devuelve las latencias (s) de las solicitudes del primer al último nodo."""
+    loop = asyncio.get_running_loop()
+    clock = AsyncioClock(loop)
+    machine.CLOCK = clock
+    dsr_module.time = VirtualTime(clock)
+    dsr_module.ticks_ms = clock.ticks_ms
+    random.seed(args.seed)
+    medium = Medium(clock, links)
+    nodes, runtimes, tasks = {}, [], []
+    for node_id in links:
+        if mode == "runtime":
+            node = dsr_module.DSRNode(node_id, medium.attach(node_id), machine.RTC(), None)
+            runtime = NodeRuntime(node, hello_ms=args.hello_ms)
+            runtime.start()
+            runtimes.append(runtime)
+        else:
+            node = dsr_module.DSRNode(node_id, medium.attach(node_id), machine.RTC(), machine.Timer())
+            tasks.append(asyncio.create_task(poll_loop(node, args.poll_ms)))
+            tasks.append(asyncio.create_task(hello_loop(node, args.hello_ms)))
+        nodes[node_id] = node
+    await asyncio.sleep(args.warmup)
+
+    names = sorted(links, key=lambda name: int(name[1:]))
+    source, destination = nodes[names[0]], names[-1]
+    latencies = []
+    for _ in range(args.requests):
+        previous = source.latest.get(destination)
+        start = last_request = loop.time()
+        source.request_data(destination)
+        while loop.time() - start < args.timeout:
+            await asyncio.sleep(0.01)
+            if source.latest.get(destination) is not previous:
+                latencies.append(loop.time() - start)
+                break
+            if not source.waiting_response and loop.time() - last_request >= 2:
+                # Sin ruta todavía: se repite la solicitud cuando termina el descubrimiento
+                last_request = loop.time()
+                source.request_data(destination)
+        await asyncio.sleep(0.5)
+
+    for runtime in runtimes:
+        runtime.stop()
+    for task in tasks:
+        task.cancel()
+    return latencies
+
+
+def run_runtime(args):
+    links = build_topology("line", args.size)
+    print(f"Línea de {args.size} nodos en tiempo real, {args.requests} solicitudes extremo a extremo")
+    print(f"{'modo':<26}{'entregadas':>12}{'primera (s)':>14}{'siguientes (s)':>16}")
+    for mode in ("poll", "runtime"):
+        silence = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with silence:
+            latencies = asyncio.run(timed_requests(links, mode, args))
+        label = f"sondeo cada {args.poll_ms} ms" if mode == "poll" else "NodeRuntime (IRQ)"
+        first = f"{latencies[0]:.2f}" if latencies else "-"
+        rest = f"{sum(latencies[1:]) / len(latencies[1:]):.2f}" if len(latencies) > 1 else "-"
+        print(f"{label:<26}{len(latencies):>9}/{args.requests:<2}{first:>14}{rest:>16}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador de la red mesh LoRa con DSRNode")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    discovery = subparsers.add_parser("discovery", help="latencia y RREQ por descubrimiento de ruta")
+    discovery.add_argument("--topology", choices=("line", "grid", "random"), default="grid")
+    discovery.add_argument("--size", type=int, default=5, help="lado de la grilla, largo de la línea o nodos al azar")
+    discovery.add_argument("--queries", type=int, default=30)
+    discovery.add_argument("--warmup", type=int, default=30, help="segundos de HELLO antes de empezar")
+    discovery.add_argument("--seed", type=int, default=1)
+    discovery.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    discovery.set_defaults(handler=run_discovery)
+
+    reliability = subparsers.add_parser("reliability", help="entrega DATA/RESP con pérdidas y caída de un relay")
+    reliability.add_argument("--size", type=int, default=4)
+    reliability.add_argument("--loss", type=float, default=0.1, help="probabilidad de perder cada recepción")
+    reliability.add_argument("--requests", type=int, default=20)
+    reliability.add_argument("--timeout", type=int, default=10, help="segundos de espera por solicitud")
+    reliability.add_argument("--warmup", type=int, default=30, help="segundos de HELLO antes de empezar")
+    reliability.add_argument("--seed", type=int, default=1)
+    reliability.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    reliability.set_defaults(handler=run_reliability)
+
+    batch = subparsers.add_parser("batch", help="lecturas una por solicitud vs pedidos por lote")
+    batch.add_argument("--size", type=int, default=4)
+    batch.add_argument("--samples", type=int, default=60)
+    batch.add_argument("--sample-ms", type=int, default=10000)
+    batch.add_argument("--batch", type=int, default=10, help="lecturas entre pedidos por lote")
+    batch.add_argument("--hello-ms", type=int, default=10000)
+    batch.add_argument("--warmup", type=int, default=30, help="segundos de HELLO antes de empezar")
+    batch.add_argument("--seed", type=int, default=1)
+    batch.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    batch.set_defaults(handler=run_batch)
+
+    push = subparsers.add_parser("push", help="sondeo DATA/RESP vs telemetría push")
+    push.add_argument("--size", type=int, default=4)
+    push.add_argument("--samples", type=int, default=60)
+    push.add_argument("--sample-ms", type=int, default=10000)
+    push.add_argument("--batch", type=int, default=6, help="lecturas por envío en el modo por lotes")
+    push.add_argument("--loss", type=float, default=0.05)
+    push.add_argument("--hello-ms", type=int, default=10000)
+    push.add_argument("--warmup", type=int, default=30, help="segundos de HELLO antes de empezar")
+    push.add_argument("--seed", type=int, default=1)
+    push.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    push.set_defaults(handler=run_push)
+
+    cache = subparsers.add_parser("cache", help="pedidos de lectura al gateway: sin caché, coalescencia y TTL")
+    cache.add_argument("--size", type=int, default=3)
+    cache.add_argument("--requests", type=int, default=120)
+    cache.add_argument("--interval-ms", type=int, default=3000, help="tiempo medio entre pedidos")
+    cache.add_argument("--hot", type=int, default=3, help="nodos que se consultan")
+    cache.add_argument("--ttl", type=int, default=30)
+    cache.add_argument("--hello-ms", type=int, default=10000)
+    cache.add_argument("--warmup", type=int, default=30, help="segundos de HELLO antes de empezar")
+    cache.add_argument("--seed", type=int, default=1)
+    cache.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    cache.set_defaults(handler=run_cache)
+
+    timesync = subparsers.add_parser("timesync", help="error de la hora de red: demora y deriva")
+    timesync.add_argument("--size", type=int, default=4)
+    timesync.add_argument("--minutes", type=int, default=10)
+    timesync.add_argument("--drift-ppm", type=float, default=40)
+    timesync.add_argument("--hello-ms", type=int, default=10000)
+    timesync.add_argument("--warmup", type=int, default=120, help="segundos de balizas antes de medir")
+    timesync.add_argument("--seed", type=int, default=1)
+    timesync.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    timesync.set_defaults(handler=run_timesync)
+
+    tdma = subparsers.add_parser("tdma", help="telemetría de toda la grilla: ALOHA vs slots TDMA")
+    tdma.add_argument("--size", type=int, default=4)
+    tdma.add_argument("--minutes", type=int, default=20)
+    tdma.add_argument("--sample-ms", type=int, default=20000, help="período de lectura y envío de cada esclavo")
+    tdma.add_argument("--frame-ms", type=int, default=SlotScheduler.FRAME_MS)
+    tdma.add_argument("--slot-ms", type=int, default=SlotScheduler.SLOT_MS)
+    tdma.add_argument("--contention-ms", type=int, default=SlotScheduler.CONTENTION_MS)
+    tdma.add_argument("--hello-ms", type=int, default=10000)
+    tdma.add_argument("--warmup", type=int, default=180, help="segundos de balizas y JOIN antes de empezar")
+    tdma.add_argument("--settle", type=int, default=120, help="segundos de push antes de medir (rutas al gateway)")
+    tdma.add_argument("--seed", type=int, default=1)
+    tdma.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    tdma.set_defaults(handler=run_tdma)
+
+    anycast = subparsers.add_parser("anycast", help="telemetría al gateway más cercano con 1, 2 y 4 gateways")
+    anycast.add_argument("--size", type=int, default=5)
+    anycast.add_argument("--minutes", type=int, default=20)
+    anycast.add_argument("--sample-ms", type=int, default=10000, help="período de lectura y envío de cada esclavo")
+    anycast.add_argument("--advert-s", type=int, default=60, help="período de los anuncios GATE")
+    anycast.add_argument("--marks-ms", type=int, default=10000, help="intercambio de marcas entre gateways")
+    anycast.add_argument("--hello-ms", type=int, default=10000)
+    anycast.add_argument("--warmup", type=int, default=120, help="segundos de HELLO y anuncios antes de empezar")
+    anycast.add_argument("--settle", type=int, default=120, help="segundos de push antes de medir")
+    anycast.add_argument("--drain", type=int, default=120, help="segundos tras la ventana para lo pendiente de TACK")
+    anycast.add_argument("--seed", type=int, default=1)
+    anycast.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    anycast.set_defaults(handler=run_anycast)
+
+    topology = subparsers.add_parser("topology", help="tablas de vecinos en el gateway: enlaces, cuellos y particiones")
+    topology.add_argument("--size", type=int, default=3, help="lado de cada una de las dos grillas")
+    topology.add_argument("--minutes", type=int, default=20)
+    topology.add_argument("--sample-ms", type=int, default=30000, help="período de lectura y envío de cada esclavo")
+    topology.add_argument("--report-s", type=int, default=600, help="intervalo máximo entre informes de vecinos")
+    topology.add_argument("--hello-ms", type=int, default=10000)
+    topology.add_argument("--timeout", type=int, default=300, help="segundos de espera para detectar la partición")
+    topology.add_argument("--seed", type=int, default=1)
+    topology.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    topology.set_defaults(handler=run_topology)
+
+    scale = subparsers.add_parser("scale", help="cientos de nodos al azar con propagación, desvanecimiento y colisiones")
+    scale.add_argument("--nodes", type=int, nargs="+", default=[50, 100, 200])
+    scale.add_argument("--degree", type=int, default=8, help="vecinos medios de cada nodo")
+    scale.add_argument("--minutes", type=int, default=10)
+    scale.add_argument("--sample-ms", type=int, default=60000, help="período de lectura y envío de cada esclavo")
+    scale.add_argument("--qos", type=int, default=Propagation.NEIGHBOR_QOS, help="RSSI mínimo de un vecino (quality_neighbor)")
+    scale.add_argument("--capture-db", type=int, default=6, help="ventaja que sobrevive a una colisión")
+    scale.add_argument("--no-capture", action="store_true", help="toda colisión pierde ambas tramas")
+    scale.add_argument("--hello-ms", type=int, default=10000)
+    scale.add_argument("--warmup", type=int, default=60, help="segundos de HELLO antes de empezar")
+    scale.add_argument("--settle", type=int, default=120, help="segundos de push antes de medir (rutas al gateway)")
+    scale.add_argument("--drain", type=int, default=120, help="segundos tras la ventana para lo pendiente de TACK")
+    scale.add_argument("--seed", type=int, default=1)
+    scale.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    scale.set_defaults(handler=run_scale)
+
+    fragment = subparsers.add_parser("fragment", help="tramas largas: sin fragmentar, fragmentos y FNACK")
+    fragment.add_argument("--bytes", type=int, default=1000)
+    fragment.add_argument("--messages", type=int, default=20)
+    fragment.add_argument("--loss", type=float, default=0.1)
+    fragment.add_argument("--interval-ms", type=int, default=8000)
+    fragment.add_argument("--poll-ms", type=int, default=100)
+    fragment.add_argument("--seed", type=int, default=1)
+    fragment.set_defaults(handler=run_fragment)
+
+    runtime = subparsers.add_parser("runtime", help="latencia en tiempo real: sondeo del firmware vs NodeRuntime")
+    runtime.add_argument("--size", type=int, default=4)
+    runtime.add_argument("--requests", type=int, default=3)
+    runtime.add_argument("--poll-ms", type=int, default=1000, help="sleep del bucle de sondeo")
+    runtime.add_argument("--hello-ms", type=int, default=2000)
+    runtime.add_argument("--warmup", type=float, default=5, help="segundos de HELLO antes de empezar")
+    runtime.add_argument("--timeout", type=float, default=20, help="segundos de espera por solicitud")
+    runtime.add_argument("--seed", type=int, default=1)
+    runtime.add_argument("--verbose", action="store_true", help="muestra los print de los nodos")
+    runtime.set_defaults(handler=run_runtime)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()